@@ -2,9 +2,15 @@
 # (add, edit, list, etc) and saves it the tracker
 
 
+import itertools
 import logging
+from contextlib import contextmanager
 from datetime import datetime, timedelta, UTC
-from typing import Optional
+from typing import Any, Callable, Iterator, Optional
+
+import metrics
+import report_cache
+from repository import DEFAULT_SAVE_DIR
 
 
 from maintenance_tracker import (
@@ -14,37 +20,129 @@ from maintenance_tracker import (
     TaskLister,
     ActionRecordResults,
     TaskRecordResults,
+    TaskStatus,
     ActionLister,
+    OverdueRank,
+    OverdueStatus,
+    ComplianceStats,
+    ActivityCount,
+    ActivityPeriod,
+    DeletedActions,
 )
 
 # log config
 logger = logging.getLogger(__name__)
 
 
-tracker: MaintenanceTracker = MaintenanceTracker()
-logger.debug(f"{tracker}")
+# The tracker is created on first use by get_tracker(), with the options given to
+# configure_tracker() (main wires these from the loaded configuration). Nothing is
+# built at import time, so commands that never touch the data do not pay for it.
+tracker: MaintenanceTracker | None = None
+_tracker_options: dict = {}
 
 
-def register_task(new_task, save=True) -> None:
+def configure_tracker(**options) -> None:
+    """Sets the MaintenanceTracker options used when the tracker is first needed.
+
+    Drops any tracker created with previous options, so the next call to
+    get_tracker() builds a new one.
+    """
+    global tracker, _tracker_options
+    logger.debug(f"configuring tracker with {options = }")
+    _tracker_options = options
+    tracker = None
+
+
+def get_tracker() -> MaintenanceTracker:
+    """Returns the current tracker, creating it from the configured options if needed."""
+    global tracker
+    if tracker is None:
+        logger.debug(f"creating tracker with {_tracker_options = }")
+        tracker = MaintenanceTracker(**_tracker_options)
+    return tracker
+
+
+def _report_cache() -> report_cache.ReportCache | None:
+    """The on-disk report cache, used only while the tracker has not been loaded.
+
+    Once the tracker is in memory, computing a report is cheaper than reading the cache.
+    """
+    if tracker is not None or not _tracker_options.get("load"):
+        return None
+    if "task_repo" in _tracker_options or "action_repo" in _tracker_options:
+        return None
+    return report_cache.ReportCache(
+        _tracker_options.get("save_dir") or DEFAULT_SAVE_DIR,
+        _tracker_options.get("save_task_file"),
+        _tracker_options.get("save_actions_file"),
+    )
+
+
+def _cached_report(
+    report: str, at: datetime | None, compute: Callable[[], Any], **params
+) -> Any:
+    """Returns a report result from the report cache, computing and storing it on a miss."""
+    cache = _report_cache()
+    if cache is None:
+        return compute()
+
+    key = cache.key(report, at, **params)
+    fingerprint = cache.fingerprint()
+    result = cache.get(key, fingerprint)
+    if result is report_cache.MISS:
+        result = compute()
+        cache.put(key, fingerprint, result)
+    return result
+
+
+@contextmanager
+def use_tracker(other: MaintenanceTracker) -> Iterator[MaintenanceTracker]:
+    """Temporarily routes the app operations to another tracker.
+
+    Allows hosting several trackers in one process; the previous tracker is
+    restored on exit.
+    """
     global tracker
+    previous = tracker
+    tracker = other
+    try:
+        yield other
+    finally:
+        tracker = previous
+
+
+@contextmanager
+def batch() -> Iterator[MaintenanceTracker]:
+    """Runs many operations against one tracker in a single transaction.
+
+    The data files are written once on exit, and not at all if an exception
+    escapes the block (the changes are then rolled back in memory).
+    """
+    tracker = get_tracker()
+    with tracker.transaction():
+        yield tracker
+
+
+def register_task(new_task, save=True) -> None:
+    tracker = get_tracker()
     logger.debug(tracker)
     logger.info(f"Adding task {new_task}")
-    tracker.register_task(new_task)
     saver_path = getattr(tracker.task_list_saver, "dirname", None)
     if saver_path:
         logger.info(f"Saving tracker to {saver_path}")
-    tracker.save()
+    with tracker.transaction():
+        tracker.register_task(new_task)
 
 
 def get_task_by_name(task_name: str | None) -> Task | None:
-    global tracker
+    tracker = get_tracker()
     logger.debug(tracker)
     logger.info(f"getting task named {task_name}")
     return tracker.task_list.get_task_by_name(task_name)
 
 
 def get_tasks_by_name(search_string: str) -> TaskLister:
-    global tracker
+    tracker = get_tracker()
     ret_list = TaskLister()
     logger.info(f"getting task named {search_string}")
     for task in tracker.task_list:
@@ -56,12 +154,12 @@ def get_tasks_by_name(search_string: str) -> TaskLister:
 def get_tasks_by_time(
     start_time: datetime, end_time: datetime | None = None
 ) -> TaskLister:
-    global tracker
+    tracker = get_tracker()
     return tracker.get_tasks_by_time(start_time, end_time)
 
 
 def get_all_tasks() -> TaskLister:
-    global tracker
+    tracker = get_tracker()
     logger.debug(tracker)
     logger.debug(tracker.task_list)
     logger.info(f"getting all tasks")
@@ -70,7 +168,7 @@ def get_all_tasks() -> TaskLister:
 
 
 def get_all_actions() -> ActionLister:
-    global tracker
+    tracker = get_tracker()
     logger.debug(tracker)
     logger.info(f"getting all actions")
     logger.info(f"found {len(tracker.action_list)} actions")
@@ -81,13 +179,16 @@ def edit_task(
     old_task: Task | None,
     changes: dict,
 ) -> Task | None:
-    """Delegate task replacement to the tracker and persist on success."""
-    global tracker
+    """Delegate task replacement to the tracker and persist on success.
+
+    All the internal steps (new task, moved actions, old task removal) are written
+    in a single save, or rolled back together on failure.
+    """
+    tracker = get_tracker()
     if old_task is None:
         raise ValueError("old_task must be provided")
-    new_task = tracker.edit_task(old_task, changes)
-    if new_task:
-        tracker.save()
+    with tracker.transaction():
+        new_task = tracker.edit_task(old_task, changes)
     return new_task
 
 
@@ -97,7 +198,7 @@ def get_actions_for_task_filtered(
     end_time: datetime | None = None,
     action_name: str | None = None,
 ) -> ActionLister:
-    global tracker
+    tracker = get_tracker()
     return tracker.get_actions_for_task_filtered(
         task_name, start_time, end_time, action_name
     )
@@ -114,7 +215,7 @@ def record_run(
     Raises TaskNotFoundError when the provided task_name does not exist.
     Returns an ActionRecordResults enum indicating success or mismatch.
     """
-    global tracker
+    tracker = get_tracker()
     task = get_task_by_name(task_name)
     if task is None:
         # Prefer exceptions for missing resources
@@ -126,27 +227,95 @@ def record_run(
         timestamp = datetime.now(UTC)
 
     action = Action(ref_task=task, timestamp=timestamp, name=action_name, actor=actor)
-    result = tracker.record_run(action)
-    if result == ActionRecordResults.SUCCESS:
-        tracker.save()
+    with tracker.transaction():
+        result = tracker.record_run(action)
     return result
 
 
 def get_overdue_tasks(at: datetime | None = None) -> TaskLister:
     """Returns a list of overdue tasks at a specific time."""
-    global tracker
-    overdue_tasks = TaskLister()
-    for task in tracker.task_list:
-        if tracker.check_overdue(task, at):
-            overdue_tasks.append(task)
-    return overdue_tasks
+    return TaskLister([s.task for s in get_dashboard(at) if s.overdue])
+
+
+def get_overdue_ranking(
+    at: datetime | None = None,
+    top: int | None = None,
+    by: OverdueRank = OverdueRank.LATENESS,
+) -> list[OverdueStatus]:
+    """Returns the overdue tasks at a specific time, most overdue first."""
+    return _cached_report(
+        "overdue_ranking",
+        at,
+        lambda: get_tracker().rank_overdue(at, top, by),
+        top=top,
+        by=OverdueRank(by).value,
+    )
+
+
+def get_compliance(
+    start: datetime,
+    end: datetime | None = None,
+    grace: timedelta | None = None,
+    task_name: str | None = None,
+) -> list[ComplianceStats]:
+    """Returns how well each task (or only task_name) kept to its schedule over a period."""
+    tracker = get_tracker()
+    tasks = None
+    if task_name:
+        task = tracker.task_list.get_task_by_name(task_name)
+        if task is None:
+            from errors import TaskNotFoundError
+
+            raise TaskNotFoundError(f"Task '{task_name}' not found")
+        tasks = [task]
+    return tracker.compliance(start, end, grace, tasks)
+
+
+def get_overdue_history(
+    start: datetime, end: datetime, step: timedelta
+) -> list[tuple[datetime, TaskLister]]:
+    """Returns the overdue tasks at each step from start to end."""
+    tracker = get_tracker()
+    return tracker.overdue_history(start, end, step)
+
+
+def get_activity(
+    by: ActivityPeriod = ActivityPeriod.DAY,
+    by_actor: bool = False,
+    by_task: bool = False,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> list[ActivityCount]:
+    """Returns the number of actions per period, optionally per actor and/or task."""
+    tracker = get_tracker()
+    actions = None
+    if start is not None or end is not None:
+        # archived actions included
+        actions = tracker.get_actions_by_time(
+            start or datetime.min.replace(tzinfo=UTC), end
+        )
+    return tracker.activity(by, by_actor, by_task, actions)
+
+
+def get_dashboard(at: datetime | None = None) -> list[TaskStatus]:
+    """Returns the status (last run, next run, overdue) of every task at a specific time."""
+    return _cached_report("dashboard", at, lambda: get_tracker().dashboard(at))
 
 
 def get_next_runs(
     for_task: str | None = None, at: datetime | None = None
 ) -> list[tuple[Task, datetime]]:
     """Gets next runs for tasks"""
-    global tracker
+    next_runs = _cached_report(
+        "next_runs", at, lambda: _get_next_runs(for_task, at), for_task=for_task
+    )
+    return [tuple(run) for run in next_runs]
+
+
+def _get_next_runs(
+    for_task: str | None, at: datetime | None
+) -> list[tuple[Task, datetime]]:
+    tracker = get_tracker()
     next_runs = []
 
     if for_task:
@@ -164,11 +333,19 @@ def get_next_runs(
     return next_runs
 
 
+def get_agenda(
+    start: datetime, end: datetime | None = None, limit: int | None = None
+) -> Iterator[tuple[Task, datetime]]:
+    """Lazily gets every programmed task run between start and end, in chronological order"""
+    tracker = get_tracker()
+    return itertools.islice(tracker.task_list.iter_agenda(start, end), limit)
+
+
 def get_actions_by_time(
     start_time: datetime, end_time: datetime, task_name: str | None = None
 ) -> ActionLister:
     """Gets actions within a time range, optionally filtered by task"""
-    global tracker
+    tracker = get_tracker()
     if task_name:
         task = tracker.task_list.get_task_by_name(task_name)
         if not task:
@@ -178,22 +355,60 @@ def get_actions_by_time(
         return tracker.get_actions_by_time(start_time, end_time)
 
 
+def count_actions_by_time(
+    start_time: datetime, end_time: datetime, task_name: str | None = None
+) -> int:
+    """Counts the actions within a time range, optionally for one task"""
+    tracker = get_tracker()
+    task = None
+    if task_name:
+        task = tracker.task_list.get_task_by_name(task_name)
+        if not task:
+            return 0
+    return tracker.count_actions_by_time(start_time, end_time, task)
+
+
+def get_stats() -> dict:
+    """Counters and latency summaries recorded by the current metrics sink (empty
+    unless one that keeps them is installed), after loading the data"""
+    get_tracker()
+    return metrics.get_sink().snapshot()
+
+
+def compact_actions() -> int:
+    """Folds the journal of action changes into the action file, returning the number
+    of journal entries folded"""
+    return get_tracker().compact()
+
+
+def archive_actions(
+    older_than: timedelta | None = None, compression: str | None = None
+) -> int:
+    """Moves the actions older than older_than (by default, the configured retention,
+    archive_after) to the archive, returning the number of actions moved"""
+    tracker = get_tracker()
+    if older_than is None:
+        older_than = tracker.archive_after
+    if older_than is None:
+        raise ValueError("no retention given: pass --older-than or set archive_after")
+    return tracker.archive(older_than, compression=compression)
+
+
 def delete_task(task_name: str) -> TaskRecordResults:
     """Deletes a task.
 
     Raises TaskNotFoundError if task does not exist, or propagates DanglingActionsError from tracker.
     Returns TaskRecordResults.SUCCESS on success.
     """
-    global tracker
+    tracker = get_tracker()
     task = get_task_by_name(task_name)
     if task is None:
         from errors import TaskNotFoundError
 
         raise TaskNotFoundError(f"Task '{task_name}' not found")
 
-    result = tracker.delete_task(task)
-    if result == TaskRecordResults.SUCCESS:
-        tracker.save()
+    with tracker.transaction():
+        result = tracker.delete_task(task)
     return result
 
 
@@ -202,27 +417,25 @@ def delete_action(
     start_time: datetime | None = None,
     end_time: datetime | None = None,
     action_name: str | None = None,
-) -> int:
-    global tracker
+) -> DeletedActions:
+    """Deletes the actions of a task matching the criteria. Archived actions cannot
+    be deleted: they are skipped, and counted in the result."""
+    tracker = get_tracker()
 
     actions_to_delete = get_actions_for_task_filtered(
         task_name, start_time, end_time, action_name
     )
+    hot, archived = tracker.split_archived(actions_to_delete)
 
-    deleted_count = 0
-    for action in actions_to_delete:
-        tracker.delete_run(action)
-        deleted_count += 1
-
-    if deleted_count > 0:
-        tracker.save()
+    with tracker.transaction():
+        deleted_count = tracker.delete_runs(hot)
 
-    return deleted_count
+    return DeletedActions(deleted_count, len(archived))
 
 
 def get_action(task_name: str, timestamp: datetime) -> Action | None:
     """Gets an action by task name and timestamp."""
-    global tracker
+    tracker = get_tracker()
     task = get_task_by_name(task_name)
     if task is None:
         return None
@@ -243,15 +456,14 @@ def edit_action(
     new_task_name: str | None = None,
 ) -> Action | None:
     """Delegate action editing to the tracker and persist on success."""
-    global tracker
-    new_action = tracker.edit_action(
-        task_name,
-        action_ref,
-        new_actor=new_actor,
-        new_timestamp=new_timestamp,
-        new_action_name=new_action_name,
-        new_task_name=new_task_name,
-    )
-    if new_action:
-        tracker.save()
+    tracker = get_tracker()
+    with tracker.transaction():
+        new_action = tracker.edit_action(
+            task_name,
+            action_ref,
+            new_actor=new_actor,
+            new_timestamp=new_timestamp,
+            new_action_name=new_action_name,
+            new_task_name=new_task_name,
+        )
     return new_action
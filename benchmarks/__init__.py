@@ -0,0 +1,9 @@
+"""Benchmarks for the maintenance tracker at realistic and large scales.
+
+generate.py writes deterministic task_list.json and action_list.json files of any
+size, run.py times the main operations against them and emits the results as JSON.
+
+    python -m benchmarks.generate --scale medium ./bench-data
+    python -m benchmarks.run --scale small --output results.json
+    python -m benchmarks.run --data-dir ./bench-data --compare results.json
+"""
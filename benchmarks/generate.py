@@ -0,0 +1,121 @@
+"""Deterministic synthetic data for the benchmarks.
+
+The same (tasks, actions, seed) always produces the same files, written with the
+app's own repositories so they load exactly like real data.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+from datetime import UTC, datetime, timedelta
+
+from core import Action, ActionLister, Task, TaskLister
+from repository import FileActionRepository, FileTaskRepository
+
+# all generated times are before NOW, so results do not depend on when they run
+NOW = datetime(2025, 1, 1, tzinfo=UTC)
+HISTORY = timedelta(days=730)
+INTERVALS = [
+    timedelta(hours=1),
+    timedelta(hours=12),
+    timedelta(days=1),
+    timedelta(days=7),
+    timedelta(days=30),
+    None,  # one-off tasks
+]
+ACTORS = ["alex", "sam", "kim", "robin", "jo"]
+ACTION_NAMES = ["", "cleaned", "checked", "replaced", "refilled"]
+
+# (tasks, actions)
+SCALES = {
+    "tiny": (20, 1_000),
+    "small": (100, 10_000),
+    "medium": (1_000, 500_000),
+    "large": (10_000, 5_000_000),
+}
+
+
+def generate_tasks(n_tasks: int, rng: random.Random) -> list[Task]:
+    """Tasks starting in the first year of the history, with mixed intervals"""
+    tasks = []
+    for i in range(n_tasks):
+        start = NOW - HISTORY + timedelta(seconds=rng.randrange(365 * 86400))
+        tasks.append(
+            Task(
+                name=f"task-{i:05d}",
+                description=f"generated task {i}",
+                start_time=start,
+                interval=rng.choice(INTERVALS),
+            )
+        )
+    return tasks
+
+
+def generate_actions(
+    tasks: list[Task], n_actions: int, rng: random.Random
+) -> list[Action]:
+    """Actions on random tasks, between the task start and NOW, in chronological order"""
+    actions = []
+    for _ in range(n_actions):
+        task = tasks[rng.randrange(len(tasks))]
+        assert task.start_time is not None
+        span = int((NOW - task.start_time).total_seconds())
+        actions.append(
+            Action(
+                timestamp=task.start_time + timedelta(seconds=rng.randrange(span)),
+                ref_task=task,
+                name=rng.choice(ACTION_NAMES),
+                actor=rng.choice(ACTORS),
+            )
+        )
+    actions.sort(key=lambda a: a.timestamp)
+    return actions
+
+
+def generate(data_dir: str, n_tasks: int, n_actions: int, seed: int = 0) -> None:
+    """Writes task_list.json and action_list.json with the given number of tasks and
+    actions to data_dir"""
+    if n_tasks < 1:
+        raise ValueError("at least one task is needed to generate actions")
+    rng = random.Random(seed)
+    tasks = generate_tasks(n_tasks, rng)
+    actions = generate_actions(tasks, n_actions, rng)
+    FileTaskRepository(TaskLister(tasks), dirname=data_dir).save()
+    FileActionRepository(ActionLister(actions), dirname=data_dir).save()
+
+
+def add_scale_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--scale",
+        choices=SCALES,
+        default="small",
+        help="preset number of tasks and actions",
+    )
+    parser.add_argument("--tasks", type=int, help="number of tasks (overrides --scale)")
+    parser.add_argument(
+        "--actions", type=int, help="number of actions (overrides --scale)"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+
+
+def scale_from_arguments(args: argparse.Namespace) -> tuple[int, int]:
+    n_tasks, n_actions = SCALES[args.scale]
+    if args.tasks is not None:
+        n_tasks = args.tasks
+    if args.actions is not None:
+        n_actions = args.actions
+    return n_tasks, n_actions
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("data_dir", help="folder to write the data files to")
+    add_scale_arguments(parser)
+    args = parser.parse_args(argv)
+    n_tasks, n_actions = scale_from_arguments(args)
+    generate(args.data_dir, n_tasks, n_actions, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Times the main tracker operations on generated data and emits the results as JSON.
+
+Operations that change data are timed in memory, on a tracker loaded from a scratch
+copy of the data; writing the files is timed on its own by "save". Each operation
+runs --repeat times, and the results hold every time plus their min and median, in
+seconds.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Callable
+
+import app
+from core import Action
+from maintenance_tracker import MaintenanceTracker
+
+from benchmarks.generate import (
+    NOW,
+    add_scale_arguments,
+    generate,
+    scale_from_arguments,
+)
+
+RESULTS_VERSION = 1
+RANGE = timedelta(days=30)  # period used by the range queries and deletions
+
+
+def _time(repeat: int, operation: Callable[[int], object]) -> dict:
+    """Runs operation(i) for i in range(repeat), timing each run"""
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        operation(i)
+        times.append(time.perf_counter() - start)
+    return {
+        "repeat": repeat,
+        "times": times,
+        "min": min(times),
+        "median": statistics.median(times),
+    }
+
+
+def run_benchmarks(data_dir: str, repeat: int = 3) -> dict[str, dict]:
+    """Times each operation against a scratch copy of the data files in data_dir, so
+    data_dir is left untouched (not even the lock file is created there)"""
+    results: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        shutil.copytree(data_dir, work_dir, dirs_exist_ok=True)
+        results["load"] = _time(
+            repeat, lambda i: MaintenanceTracker(load=True, save_dir=work_dir)
+        )
+        tracker = MaintenanceTracker(load=True, save_dir=work_dir)
+        tasks = tracker.task_list
+        if not tasks:
+            raise ValueError(f"no tasks to benchmark in {data_dir}")
+
+        results["save"] = _time(repeat, lambda i: tracker.save())
+
+        with app.use_tracker(tracker):
+            results["get_overdue_tasks"] = _time(
+                repeat, lambda i: app.get_overdue_tasks(NOW)
+            )
+            results["get_next_runs"] = _time(
+                repeat, lambda i: app.get_next_runs(at=NOW)
+            )
+            results["get_actions_by_time"] = _time(
+                repeat, lambda i: app.get_actions_by_time(NOW - RANGE, NOW)
+            )
+
+        def record_run(i: int) -> None:
+            task = tasks[i % len(tasks)]
+            tracker.record_run(Action(NOW + timedelta(minutes=i), task, actor="bench"))
+
+        def rename_task(i: int) -> None:
+            # renamed tasks move to the end of the list
+            task = tasks[i % len(tasks)]
+            tracker.edit_task(task, {"name": f"{task.name}-renamed"})
+
+        def delete_action_range(i: int) -> None:
+            # what app.delete_action does, without writing the files
+            name = tasks[-(i % len(tasks)) - 1].name
+            actions = tracker.get_actions_for_task_filtered(
+                name, NOW - 2 * RANGE, NOW - RANGE
+            )
+            hot, _ = tracker.split_archived(actions)
+            tracker.delete_runs(hot)
+
+        results["record_run"] = _time(repeat, record_run)
+        results["edit_task_rename"] = _time(repeat, rename_task)
+        results["delete_action_range"] = _time(repeat, delete_action_range)
+
+    return results
+
+
+def compare(baseline: dict, current: dict) -> dict[str, float]:
+    """Ratio of the current to the baseline median time of each operation in both"""
+    return {
+        name: result["median"] / baseline["results"][name]["median"]
+        for name, result in current["results"].items()
+        if name in baseline["results"] and baseline["results"][name]["median"] > 0
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--data-dir",
+        help="folder with the data files to benchmark; generated in a temporary "
+        "folder from --scale, --tasks, --actions and --seed when not given",
+    )
+    add_scale_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per operation")
+    parser.add_argument(
+        "--output", "-o", help="file to write the results to (stdout otherwise)"
+    )
+    parser.add_argument(
+        "--compare", help="results file of a previous run, to print the time ratios"
+    )
+    args = parser.parse_args(argv)
+
+    n_tasks, n_actions = scale_from_arguments(args)
+    output = {
+        "version": RESULTS_VERSION,
+        "started_at": datetime.now(UTC).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+    if args.data_dir:
+        output["data_dir"] = str(Path(args.data_dir).resolve())
+        output["results"] = run_benchmarks(args.data_dir, args.repeat)
+    else:
+        output["scale"] = {"tasks": n_tasks, "actions": n_actions, "seed": args.seed}
+        with tempfile.TemporaryDirectory() as data_dir:
+            generate(data_dir, n_tasks, n_actions, args.seed)
+            output["results"] = run_benchmarks(data_dir, args.repeat)
+
+    text = json.dumps(output, indent=4)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf8")
+    else:
+        print(text)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf8"))
+        for name, ratio in compare(baseline, output).items():
+            print(f"{name:<22} {ratio:6.2f}x", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
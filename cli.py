@@ -3,32 +3,58 @@
 import csv
 import json
 import logging
+import shlex
 import sys
 from enum import Enum
 from typing import Optional
 
 import rich
-from rich.table import Table
-from rich.console import Console
 import typer
 from typing_extensions import Annotated
 
 import app
+import daemon
+import metrics
 import utils
+from config import config
 from core import *
 from maintenance_tracker import *
 
 logger = logging.getLogger(__name__)
 
 GENERIC_FAIL_CODE = 1
+DEFAULT_AGENDA_PERIOD = timedelta(weeks=1)
+DEFAULT_COMPLIANCE_PERIOD = timedelta(days=30)
 
 
 class OutputFormat(str, Enum):
     TABLE = "table"
     JSON = "json"
+    NDJSON = "ndjson"
     CSV = "csv"
 
 
+# paging options shared by the commands that list actions
+SortOption = Annotated[
+    Optional[ActionSort],
+    typer.Option("--sort", help="sort actions by timestamp, task, actor or name"),
+]
+ReverseOption = Annotated[
+    bool,
+    typer.Option(
+        "--reverse",
+        help="sort descending, or reverse the listed order when not sorting",
+    ),
+]
+OffsetOption = Annotated[
+    int, typer.Option("--offset", min=0, help="number of actions to skip")
+]
+LimitOption = Annotated[
+    Optional[int],
+    typer.Option("--limit", "-n", min=1, help="show at most this many actions"),
+]
+
+
 add_app = typer.Typer(
     no_args_is_help=True, help="adds a Task or an Action to the tracker"
 )
@@ -40,14 +66,35 @@ get_app = typer.Typer(no_args_is_help=True, help="gets details of a Task or Acti
 edit_app = typer.Typer(no_args_is_help=True, help="edits a Task or Action")
 delete_app = typer.Typer(no_args_is_help=True, help="deletes a Task or Action")
 report_app = typer.Typer(no_args_is_help=True, help="creates reports")
+dev_app = typer.Typer(no_args_is_help=True, help="tools to develop mtnt itself")
 
 from presenters import (
     _rich_task,
     _print_task_list_table,
     _print_action_list_table,
+    _print_next_runs_table,
+    _print_agenda_table,
+    _print_overdue_ranking_table,
+    _print_compliance_table,
+    _print_overdue_history_table,
+    _output_overdue_history_json,
+    _output_overdue_history_ndjson,
+    _output_overdue_history_csv,
+    _print_activity_table,
+    _output_activity_json,
+    _output_activity_ndjson,
+    _output_activity_csv,
+    _print_stats_tables,
+    _output_stats_json,
+    _output_stats_ndjson,
+    _output_stats_csv,
+    _print_footprint_tables,
+    _output_footprint_json,
     _output_task_list_json,
+    _output_task_list_ndjson,
     _output_task_list_csv,
     _output_action_list_json,
+    _output_action_list_ndjson,
     _output_action_list_csv,
 )
 
@@ -69,7 +116,7 @@ def add_task(
     interval: Annotated[str, typer.Argument()] = "",
     description: Annotated[str, typer.Argument()] = "",
     interactive: Annotated[
-        bool, typer.Option("-i", "--interactive",help="asks for each argument in turn")
+        bool, typer.Option("-i", "--interactive", help="asks for each argument in turn")
     ] = False,
 ):
     """Adds a task to the tracker"""
@@ -175,7 +222,9 @@ def list_tasks_cli(
     ] = False,
     output: Annotated[
         OutputFormat,
-        typer.Option("--output", "-o", help="output format: table, json, or csv"),
+        typer.Option(
+            "--output", "-o", help="output format: table, json, ndjson, or csv"
+        ),
     ] = OutputFormat.TABLE,
 ):
     if overdue:
@@ -187,6 +236,8 @@ def list_tasks_cli(
 
     if output == OutputFormat.JSON:
         _output_task_list_json(task_list)
+    elif output == OutputFormat.NDJSON:
+        _output_task_list_ndjson(task_list)
     elif output == OutputFormat.CSV:
         _output_task_list_csv(task_list)
     else:
@@ -200,16 +251,25 @@ def list_actions_cli(
     ] = None,
     output: Annotated[
         OutputFormat,
-        typer.Option("--output", "-o", help="output format: table, json, or csv"),
+        typer.Option(
+            "--output", "-o", help="output format: table, json, ndjson, or csv"
+        ),
     ] = OutputFormat.TABLE,
+    sort: SortOption = None,
+    reverse: ReverseOption = False,
+    offset: OffsetOption = 0,
+    limit: LimitOption = None,
 ):
     if task_name:
         action_list = app.get_actions_for_task_filtered(task_name)
     else:
         action_list = app.get_all_actions()
+    action_list = action_list.page(sort, reverse, offset, limit)
 
     if output == OutputFormat.JSON:
         _output_action_list_json(action_list)
+    elif output == OutputFormat.NDJSON:
+        _output_action_list_ndjson(action_list)
     elif output == OutputFormat.CSV:
         _output_action_list_csv(action_list)
     else:
@@ -267,11 +327,15 @@ def get_task(name: Annotated[str, typer.Argument()]):
 )
 def get_actions(
     task_name: Annotated[str, typer.Argument(help="name of the task")],
+    sort: SortOption = None,
+    reverse: ReverseOption = False,
+    offset: OffsetOption = 0,
+    limit: LimitOption = None,
 ):
     """get all actions for a task"""
     action_list = app.get_actions_for_task_filtered(task_name)
     if len(action_list) > 0:
-        _print_action_list_table(action_list)
+        _print_action_list_table(action_list.page(sort, reverse, offset, limit))
     else:
         rich.print(f"No actions found for task '{task_name}'")
 
@@ -546,16 +610,20 @@ def delete_action(
     start = utils.parse_date(start_time) if start_time else None
     end = utils.parse_date(end_time) if end_time else None
 
-    deleted_count = app.delete_action(task_name, start, end, action_name)
+    deleted = app.delete_action(task_name, start, end, action_name)
 
-    if deleted_count > 0:
+    if deleted.deleted > 0:
         rich.print(
-            f":heavy_check_mark: [green]Successfully deleted {deleted_count} action(s) for task '{task_name}'[/green]"
+            f":heavy_check_mark: [green]Successfully deleted {deleted.deleted} action(s) for task '{task_name}'[/green]"
         )
     else:
         rich.print(
             f":x: [red]No actions were deleted for task '{task_name}'. They might not exist or the provided criteria didn't match.[/red]"
         )
+    if deleted.archived:
+        rich.print(
+            f"[yellow]{deleted.archived} matching action(s) are archived and were kept[/yellow]"
+        )
 
 
 ########################################
@@ -569,11 +637,105 @@ def report_overdue(
         Optional[str],
         typer.Option("--at", help="check for overdues at the given timestamp"),
     ] = None,
+    top: Annotated[
+        Optional[int],
+        typer.Option(
+            "--top", min=1, help="rank the overdue tasks and show the N worst"
+        ),
+    ] = None,
+    by: Annotated[
+        Optional[OverdueRank],
+        typer.Option(
+            "--by", help="rank the overdue tasks by lateness or by missed runs"
+        ),
+    ] = None,
 ):
     """Lists overdue tasks"""
     when = utils.parse_date(at) if at else None
-    overdue_tasks = app.get_overdue_tasks(when)
-    _print_task_list_table(overdue_tasks, title="Overdue Tasks")
+    if top is None and by is None:
+        overdue_tasks = app.get_overdue_tasks(when)
+        _print_task_list_table(overdue_tasks, title="Overdue Tasks")
+        return
+
+    ranking = app.get_overdue_ranking(when, top, by or OverdueRank.LATENESS)
+    _print_overdue_ranking_table(ranking)
+
+
+@report_app.command("overdue-history")
+def report_overdue_history(
+    start: Annotated[
+        str, typer.Option("--from", help="first time to check for overdue tasks")
+    ],
+    end: Annotated[
+        Optional[str], typer.Option("--to", help="last time to check, defaults to now")
+    ] = None,
+    step: Annotated[
+        str, typer.Option("--step", help="interval between checks, eg: 1d, 12h, 1w")
+    ] = "1d",
+    output: Annotated[
+        OutputFormat,
+        typer.Option(
+            "--output", "-o", help="output format: table, json, ndjson, or csv"
+        ),
+    ] = OutputFormat.TABLE,
+):
+    """Lists how many and which tasks were overdue at regular steps over a period"""
+    start_time = utils.parse_date(start)
+    end_time = utils.parse_date(end) if end else datetime.now(UTC)
+    step_interval = utils.parse_interval(step)
+    if step_interval <= timedelta(0):
+        rich.print(":x: [red]--step must be a positive interval[/red]")
+        raise typer.Exit(code=GENERIC_FAIL_CODE)
+
+    history = app.get_overdue_history(start_time, end_time, step_interval)
+    if output == OutputFormat.JSON:
+        _output_overdue_history_json(history)
+    elif output == OutputFormat.NDJSON:
+        _output_overdue_history_ndjson(history)
+    elif output == OutputFormat.CSV:
+        _output_overdue_history_csv(history)
+    else:
+        _print_overdue_history_table(history)
+
+
+@report_app.command("activity")
+def report_activity(
+    by: Annotated[
+        ActivityPeriod,
+        typer.Option("--by", help="count actions per day, week or month"),
+    ] = ActivityPeriod.DAY,
+    actor: Annotated[
+        bool, typer.Option("--actor", help="count each actor separately")
+    ] = False,
+    task: Annotated[
+        bool, typer.Option("--task", help="count each task separately")
+    ] = False,
+    start: Annotated[
+        Optional[str], typer.Option("--from", help="count actions from this time")
+    ] = None,
+    end: Annotated[
+        Optional[str], typer.Option("--to", help="count actions up to this time")
+    ] = None,
+    output: Annotated[
+        OutputFormat,
+        typer.Option(
+            "--output", "-o", help="output format: table, json, ndjson, or csv"
+        ),
+    ] = OutputFormat.TABLE,
+):
+    """Counts actions per day, week or month, optionally per actor and/or task"""
+    start_time = utils.parse_date(start) if start else None
+    end_time = utils.parse_date(end) if end else None
+
+    counts = app.get_activity(by, actor, task, start_time, end_time)
+    if output == OutputFormat.JSON:
+        _output_activity_json(counts)
+    elif output == OutputFormat.NDJSON:
+        _output_activity_ndjson(counts)
+    elif output == OutputFormat.CSV:
+        _output_activity_csv(counts, actor, task)
+    else:
+        _print_activity_table(counts, actor, task, title=f"Activity by {by.value}")
 
 
 @report_app.command("next")
@@ -595,23 +757,80 @@ def report_next(
     next_runs = app.get_next_runs(target_task, when)
 
     title = "Next Scheduled Task" if target_task else "Next Scheduled Tasks"
-    table = Table(title=title)
-    table.add_column("Task", justify="left", no_wrap=True)
-    table.add_column("Next Run", justify="right", style="green")
-
-    for task, next_run in next_runs:
-        table.add_row(task.name, utils.human_date_str(next_run))
-
-    console = Console()
-    console.print(table)
+    _print_next_runs_table(next_runs, title=title)
 
 
 def show_dashboard() -> None:
     """Print the default overview for an existing tracker database."""
+    statuses = app.get_dashboard()
     rich.print("[bold]overdue tasks[/bold]")
-    list_tasks_cli(overdue=True)
+    _print_task_list_table(
+        TaskLister([s.task for s in statuses if s.overdue]), title="Overdue Tasks"
+    )
     rich.print("[bold]next expected tasks[/bold]")
-    report_next()
+    _print_next_runs_table(
+        [(s.task, s.next_run) for s in statuses if s.next_run],
+        title="Next Scheduled Tasks",
+    )
+
+
+@report_app.command("agenda")
+def report_agenda(
+    start: Annotated[
+        Optional[str],
+        typer.Option("--from", help="start of the agenda, defaults to now"),
+    ] = None,
+    end: Annotated[
+        Optional[str],
+        typer.Option(
+            "--to", help="end of the agenda, defaults to a week after the start"
+        ),
+    ] = None,
+    limit: Annotated[
+        Optional[int],
+        typer.Option("--limit", "-n", min=1, help="show at most this many task runs"),
+    ] = None,
+):
+    """Lists every programmed task run in a period, in chronological order"""
+    start_time = utils.parse_date(start) if start else datetime.now(UTC)
+    end_time = utils.parse_date(end) if end else start_time + DEFAULT_AGENDA_PERIOD
+    _print_agenda_table(app.get_agenda(start_time, end_time, limit))
+
+
+@report_app.command("compliance")
+def report_compliance(
+    start: Annotated[
+        Optional[str],
+        typer.Option(
+            "--from", help="start of the period, defaults to 30 days before its end"
+        ),
+    ] = None,
+    end: Annotated[
+        Optional[str], typer.Option("--to", help="end of the period, defaults to now")
+    ] = None,
+    grace: Annotated[
+        Optional[str],
+        typer.Option(
+            "--grace",
+            help="runs later than this after their programmed time count as late",
+        ),
+    ] = None,
+    for_task: Annotated[
+        Optional[str], typer.Option("--for", help="only analyse this task")
+    ] = None,
+):
+    """Shows how well tasks kept to their schedule: on-time rate, lateness and missed runs"""
+    end_time = utils.parse_date(end) if end else datetime.now(UTC)
+    start_time = (
+        utils.parse_date(start) if start else end_time - DEFAULT_COMPLIANCE_PERIOD
+    )
+    grace_period = utils.parse_interval(grace) if grace else None
+    try:
+        stats = app.get_compliance(start_time, end_time, grace_period, for_task)
+    except Exception as e:
+        rich.print(f":x: [red]{str(e)}[/red]")
+        raise typer.Exit(code=GENERIC_FAIL_CODE)
+    _print_compliance_table(stats)
 
 
 @report_app.command("tasks")
@@ -655,22 +874,255 @@ def report_actions(
     for_task: Annotated[
         Optional[str], typer.Option("--for", help="filter actions for a specific task")
     ] = None,
+    sort: SortOption = None,
+    reverse: ReverseOption = False,
+    offset: OffsetOption = 0,
+    limit: LimitOption = None,
+    count: Annotated[
+        bool, typer.Option("--count", help="only print the number of matching actions")
+    ] = False,
 ):
     """Lists actions based on criteria"""
     if at:
         start, end = utils.parse_partial_timestamp(at)
-        actions = app.get_actions_by_time(start, end, for_task)
-        _print_action_list_table(actions)
     elif between and len(between) == 2:
         start = utils.parse_date(between[0])
         end = utils.parse_date(between[1])
-        actions = app.get_actions_by_time(start, end, for_task)
-        _print_action_list_table(actions)
     else:
         start = datetime.min.replace(tzinfo=UTC)
         end = datetime.max.replace(tzinfo=UTC)
-        actions = app.get_actions_by_time(start, end, for_task)
-        _print_action_list_table(actions)
+    if count:
+        rich.print(app.count_actions_by_time(start, end, for_task))
+        return
+    actions = app.get_actions_by_time(start, end, for_task)
+    _print_action_list_table(actions.page(sort, reverse, offset, limit))
+
+
+########################################
+# batch
+########################################
+
+# command groups that can be used in a batch file, keyed by their mtnt name
+BATCH_COMMAND_GROUPS = {
+    "add": add_app,
+    "record": record_app,
+    "list": list_app,
+    "get": get_app,
+    "edit": edit_app,
+    "delete": delete_app,
+    "report": report_app,
+}
+
+
+def _parse_batch_line(line: str) -> list[str]:
+    """Splits a batch line into mtnt arguments.
+
+    A line is either a shell-like command (`record run "Water plants" Alex`) or a
+    JSON list of arguments (`["record", "run", "Water plants", "Alex"]`).
+    """
+    if line.startswith("["):
+        args = json.loads(line)
+        if not isinstance(args, list) or not all(isinstance(a, str) for a in args):
+            raise ValueError("a JSON batch line must be a list of strings")
+        return args
+    return shlex.split(line)
+
+
+def _run_batch_command(args: list[str]) -> int:
+    """Runs one mtnt command in this process and returns its exit code."""
+    if not args or args[0] not in BATCH_COMMAND_GROUPS:
+        raise ValueError(
+            f"unknown command '{args[0] if args else ''}', expected one of: "
+            + ", ".join(BATCH_COMMAND_GROUPS)
+        )
+    group = typer.main.get_group(BATCH_COMMAND_GROUPS[args[0]])
+    try:
+        exit_code = group.main(
+            args[1:], prog_name=f"mtnt {args[0]}", standalone_mode=False
+        )
+    except typer.Abort:
+        return GENERIC_FAIL_CODE
+    return exit_code or 0
+
+
+def batch_cli(
+    file: Annotated[
+        Optional[typer.FileText],
+        typer.Argument(help="file with one command per line, defaults to stdin"),
+    ] = None,
+):
+    """Runs many mtnt commands against one loaded tracker, saving once at the end"""
+    lines = file if file is not None else sys.stdin
+    failed = 0
+    total = 0
+
+    with app.batch():
+        for line_number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            total += 1
+            try:
+                exit_code = _run_batch_command(_parse_batch_line(line))
+                error = f"exit code {exit_code}"
+            except Exception as e:
+                # usage errors (typer.BadParameter and co.), bad dates, unparseable lines
+                exit_code = GENERIC_FAIL_CODE
+                error = getattr(e, "format_message", lambda: str(e))()
+
+            if exit_code:
+                failed += 1
+                rich.print(f":x: [red]line {line_number} failed: {error}[/red]")
+            else:
+                rich.print(f"[green]line {line_number} ok[/green]")
+
+    rich.print(f"ran {total} command(s), {failed} failed")
+    if failed:
+        raise typer.Exit(code=GENERIC_FAIL_CODE)
+
+
+########################################
+# compact
+########################################
+
+
+def compact_cli():
+    """Folds the journal of action changes into the action file"""
+    folded = app.compact_actions()
+    rich.print(f"folded {folded} journal entries into the action file")
+
+
+########################################
+# archive
+########################################
+
+
+class ArchiveCompression(str, Enum):
+    GZIP = "gzip"
+    LZMA = "lzma"
+
+
+def archive_cli(
+    older_than: Annotated[
+        Optional[str],
+        typer.Option(
+            "--older-than",
+            help="archive the actions older than this (eg: 2y, 18 months); "
+            "defaults to the archive_after config",
+        ),
+    ] = None,
+    compression: Annotated[
+        Optional[ArchiveCompression],
+        typer.Option(
+            "--compression",
+            help="compression of the new segment; defaults to the "
+            "archive_compression config",
+        ),
+    ] = None,
+):
+    """Moves old actions to compressed archive segments, keeping the latest run of
+    each task. Range queries still include them"""
+    try:
+        moved = app.archive_actions(
+            utils.parse_interval(older_than) if older_than else None,
+            compression.value if compression else None,
+        )
+    except ValueError as e:
+        rich.print(f":x: [red]{str(e)}[/red]")
+        raise typer.Exit(code=GENERIC_FAIL_CODE)
+    rich.print(f"archived {moved} action(s)")
+
+
+########################################
+# stats
+########################################
+
+
+def stats_cli(
+    output: Annotated[
+        OutputFormat,
+        typer.Option(
+            "--output", "-o", help="output format: table, json, ndjson, or csv"
+        ),
+    ] = OutputFormat.TABLE,
+):
+    """Shows the repository counters and latencies: those of the running daemon, or
+    of loading the data otherwise"""
+    if metrics.get_sink() is metrics.NULL_SINK:
+        metrics.set_sink(metrics.InMemorySink())
+    stats = app.get_stats()
+    if output == OutputFormat.JSON:
+        _output_stats_json(stats)
+    elif output == OutputFormat.NDJSON:
+        _output_stats_ndjson(stats)
+    elif output == OutputFormat.CSV:
+        _output_stats_csv(stats)
+    else:
+        _print_stats_tables(stats)
+
+
+########################################
+# dev app
+########################################
+
+
+@dev_app.command("memory")
+def dev_memory(
+    data_dir: Annotated[
+        Optional[str],
+        typer.Option("--data-dir", help="folder with the data files to load"),
+    ] = None,
+    top: Annotated[
+        int, typer.Option("--top", min=0, help="number of allocating lines to show")
+    ] = 10,
+    output: Annotated[
+        OutputFormat,
+        typer.Option("--output", "-o", help="output format: table or json"),
+    ] = OutputFormat.TABLE,
+):
+    """Loads the data files under tracemalloc and shows the memory per task and action"""
+    import footprint
+
+    if output in (OutputFormat.NDJSON, OutputFormat.CSV):
+        raise typer.BadParameter("only table and json are supported", param_hint="-o")
+    try:
+        measured = footprint.measure_load(data_dir or str(config.data_dir), top)
+    except FileNotFoundError as e:
+        rich.print(f":x: [red]{str(e)}[/red]")
+        raise typer.Exit(code=GENERIC_FAIL_CODE)
+    if output == OutputFormat.JSON:
+        _output_footprint_json(measured)
+    else:
+        _print_footprint_tables(measured)
+
+
+########################################
+# daemon
+########################################
+
+
+def serve_cli(
+    socket_path: Annotated[
+        Optional[str],
+        typer.Option(
+            "--socket", help="socket file to listen on, defaults to one in the data dir"
+        ),
+    ] = None,
+):
+    """Keeps the tracker loaded and answers mtnt commands over a local socket"""
+    path = socket_path or daemon.default_socket_path(config.data_dir)
+
+    if not daemon.unix_sockets_supported():
+        rich.print(":x: [red]this platform does not support the mtnt daemon[/red]")
+        raise typer.Exit(code=GENERIC_FAIL_CODE)
+
+    if (client := daemon.connect(path)) is not None:
+        client.close()
+        rich.print(f":x: [red]a daemon is already serving on {path}[/red]")
+        raise typer.Exit(code=GENERIC_FAIL_CODE)
+
+    rich.print(f"serving {config.data_dir} on {path} (Ctrl-C to stop)")
+    daemon.serve(path)
 
 
 ########################################
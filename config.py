@@ -10,7 +10,14 @@ logger = logging.getLogger(__name__)
 
 APP_NAME = "mtnt"
 CONFIG_FILE_NAME = "mtnt_config.json"
-DEFAULT_CONFIG_ENTRIES = {"data_dir": ".", "debug_logging": False}
+DEFAULT_CONFIG_ENTRIES = {
+    "data_dir": ".",
+    "debug_logging": False,
+    "keep_backups": 0,
+    "journal_actions": False,
+    "archive_after": "",
+    "archive_compression": "gzip",
+}
 
 
 class Configuration:
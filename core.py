@@ -19,16 +19,18 @@
 from __future__ import annotations
 
 import dataclasses
+import heapq
+import itertools
 import json
 import logging  # debug(), info(), warning(), error() and critical()
 from abc import ABC, abstractmethod
 from collections import UserList
 from copy import deepcopy
 from dataclasses import asdict, dataclass, is_dataclass
-from datetime import UTC, datetime, timedelta, timezone
+from datetime import UTC, date, datetime, timedelta, timezone
 from enum import Enum
 from pathlib import Path
-from typing import Any, Optional, Sequence, Iterable
+from typing import Any, Optional, Sequence, Iterable, Iterator
 
 import utils
 
@@ -40,6 +42,53 @@ class Ordering(Enum):
     DESC = 2
 
 
+class ActionSort(str, Enum):
+    """Fields actions can be sorted by"""
+
+    TIMESTAMP = "timestamp"
+    TASK = "task"
+    ACTOR = "actor"
+    NAME = "name"
+
+
+class OverdueRank(str, Enum):
+    """How overdue tasks are ranked"""
+
+    LATENESS = "lateness"  # time since the first missed run
+    MISSED = "missed"  # number of missed runs
+
+
+class ActivityPeriod(str, Enum):
+    """Periods actions can be counted by (UTC, weeks start on Monday)"""
+
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+    def start_of(self, day: date) -> date:
+        """First day of the period containing day"""
+        if self is ActivityPeriod.WEEK:
+            return day - timedelta(days=day.weekday())
+        elif self is ActivityPeriod.MONTH:
+            return day.replace(day=1)
+        return day
+
+    def label(self, start: date) -> str:
+        if self is ActivityPeriod.WEEK:
+            return start.strftime("%G-W%V")
+        elif self is ActivityPeriod.MONTH:
+            return start.strftime("%Y-%m")
+        return start.isoformat()
+
+
+_ACTION_SORT_KEYS = {
+    ActionSort.TIMESTAMP: lambda a: a.timestamp,
+    ActionSort.TASK: lambda a: (a.ref_task.name, a.timestamp),
+    ActionSort.ACTOR: lambda a: (a.actor, a.timestamp),
+    ActionSort.NAME: lambda a: (a.name, a.timestamp),
+}
+
+
 @dataclass(frozen=True)
 class Task:
     name: Optional[str] = "default_task"
@@ -145,6 +194,38 @@ class Task:
 
         return ret_list
 
+    def iter_programmed_times(
+        self, start: datetime, end: datetime | None = None
+    ) -> Iterator[datetime]:
+        """Lazily yields the programmed times of the task from start to end (both
+        inclusive), in chronological order.
+
+        Args:
+            start (datetime): beginning of the period
+            end (datetime | None, optional): end of the period. Defaults to None, in which
+                case a repeating task yields programmed times forever.
+
+        Yields:
+            datetime: the next programmed time
+        """
+        if self.start_time is None:
+            return
+
+        if not self.interval:
+            if start <= self.start_time and (end is None or self.start_time <= end):
+                yield self.start_time
+            return
+
+        # index of the first programmed time at or after start (a ceiling division)
+        n = 0
+        if start > self.start_time:
+            n = -((self.start_time - start) // self.interval)
+        prog_time = self.start_time + self.interval * n
+        while end is None or prog_time <= end:
+            yield prog_time
+            n += 1
+            prog_time = self.start_time + self.interval * n
+
     def __str__(self) -> str:
         ret_str = f"Task: {self.name}\n"
         if self.description:
@@ -170,11 +251,79 @@ class Action:
         return dataclasses.replace(self, **changes)
 
 
+@dataclass(frozen=True)
+class TaskStatus:
+    """Where a task stands at a given time"""
+
+    task: Task
+    last_run: Action | None  # latest action recorded at or before that time
+    last_programmed: datetime | None  # latest programmed time at or before that time
+    next_run: datetime | None  # next programmed time after that time
+    overdue: bool
+
+
+@dataclass(frozen=True)
+class OverdueStatus:
+    """How late an overdue task is at a given time"""
+
+    task: Task
+    first_missed: datetime  # first programmed time without a run since
+    lateness: timedelta  # time elapsed since first_missed
+    missed_runs: int  # programmed times without a run since, including first_missed
+
+
+@dataclass(frozen=True)
+class ComplianceStats:
+    """How well a task kept to its schedule over a period"""
+
+    task: Task
+    due: int  # programmed times in the period whose slot has ended or that were run
+    on_time: int  # run before the next programmed time, or within the grace period
+    late: int  # run, but after the grace period
+    missed: int  # not run before the next programmed time
+    mean_lateness: timedelta | None  # of the runs, None without runs
+    p95_lateness: timedelta | None
+
+    @property
+    def on_time_rate(self) -> float | None:
+        return self.on_time / self.due if self.due else None
+
+
+@dataclass(frozen=True)
+class DeletedActions:
+    """Outcome of deleting the actions matching some criteria"""
+
+    deleted: int
+    archived: int = 0  # matching actions kept because they are archived
+
+
+@dataclass(frozen=True)
+class ActivityCount:
+    """Number of actions in a period, optionally for one actor and/or task"""
+
+    period: ActivityPeriod
+    start: date  # first day of the period (UTC)
+    count: int
+    actor: str | None = None  # None when not counting by actor
+    task: str | None = None  # None when not counting by task
+
+    @property
+    def label(self) -> str:
+        return ActivityPeriod(self.period).label(self.start)
+
+
 class TaskWithSameNameError(KeyError):
     pass
 
 
 class TaskLister(UserList):
+    """List of tasks with unique names.
+
+    Keeps an index of the tasks by name, so name checks and lookups do not scan the
+    list. Every list method that adds or removes tasks updates it, and assigning
+    `data` rebuilds it.
+    """
+
     def __init__(self, task_list: Sequence[Task] = []):
         names = [t.name for t in task_list]
         if len(names) > len(set(names)):
@@ -183,6 +332,22 @@ class TaskLister(UserList):
             raise TaskWithSameNameError(error_msg)
 
         super().__init__(task_list)
+        # UserList fills the list in place, without going through the data setter
+        self._reindex()
+
+    @property
+    def data(self) -> list[Task]:
+        return self._data
+
+    @data.setter
+    def data(self, tasks: list[Task]) -> None:
+        self._data = tasks
+        self._reindex()
+
+    def _reindex(self) -> None:
+        self._by_name: dict[Optional[str], Task] = {}
+        for t in self._data:
+            self._by_name.setdefault(t.name, t)
 
     def _check_task_name_available(self, target_task_name: Optional[str]) -> bool:
         if target_task_name is None:
@@ -191,10 +356,7 @@ class TaskLister(UserList):
                     "Task name passed as None, should not have arrived to this point in the program"
                 )
             )
-        for t in self.data:
-            if t.name == target_task_name:
-                return False
-        return True
+        return target_task_name not in self._by_name
 
     def add(self, new_task: Task) -> None:
         self.append(new_task)
@@ -206,18 +368,51 @@ class TaskLister(UserList):
 
     def append(self, item: Task) -> None:
         # conform to UserList.append signature (item)
-        if self._check_task_name_available(item.name):
-            super().append(item)
-        else:
+        self._claim_name(item)
+        super().append(item)
+
+    def insert(self, i: int, item: Task) -> None:
+        self._claim_name(item)
+        super().insert(i, item)
+
+    def _claim_name(self, item: Task) -> None:
+        if not self._check_task_name_available(item.name):
             error_msg = f"Error adding a task to the list: cannot have two tasks with the same name. '{item.name}' already exist."
             logger.debug(error_msg)
             raise (TaskWithSameNameError(error_msg))
+        self._by_name[item.name] = item
+
+    def remove(self, item: Task) -> None:
+        super().remove(item)
+        # names are unique, so the removed task was the only one with its name
+        self._by_name.pop(item.name, None)
+
+    def pop(self, i: int = -1) -> Task:
+        item = super().pop(i)
+        self._by_name.pop(item.name, None)
+        return item
+
+    def clear(self) -> None:
+        super().clear()
+        self._by_name.clear()
+
+    def __setitem__(self, i, item) -> None:
+        super().__setitem__(i, item)
+        self._reindex()
+
+    def __delitem__(self, i) -> None:
+        super().__delitem__(i)
+        self._reindex()
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def __copy__(self) -> TaskLister:
+        return self.__class__(self._data)
 
     def get_task_by_name(self, target_name: Optional[str]) -> Task | None:
-        for t in self.data:
-            if t.name == target_name:
-                return t
-        return None
+        return self._by_name.get(target_name)
 
     def get_next_tasks_due_period(
         self, period: timedelta, when: datetime | None = None
@@ -286,11 +481,80 @@ class TaskLister(UserList):
 
         return list(zip(return_task_list, return_task_times))
 
+    def iter_agenda(
+        self, start: datetime, end: datetime | None = None
+    ) -> Iterator[tuple[Task, datetime]]:
+        """Lazily yields every programmed time of every task in a period, in chronological
+        order.
+
+        The per-task streams of programmed times are merged through a heap, so only one
+        pending time per task is held at once, and the caller can stop at any point.
+        Programmed times at the same instant come in task list order.
+
+        Args:
+            start (datetime): beginning of the period (inclusive)
+            end (datetime | None, optional): end of the period (inclusive). Defaults to
+                None, in which case the agenda doesn't end while there are repeating tasks.
+
+        Yields:
+            tuple[Task, datetime]: a task and one of its programmed times
+        """
+        streams = [_task_occurrences(t, start, end) for t in self.data]
+        return heapq.merge(*streams, key=lambda occurrence: occurrence[1])
+
+
+def _task_occurrences(
+    task: Task, start: datetime, end: datetime | None
+) -> Iterator[tuple[Task, datetime]]:
+    for prog_time in task.iter_programmed_times(start, end):
+        yield task, prog_time
+
 
 class ActionLister(UserList):
     def __init__(self, action_list: Sequence[Action] = []):
         super().__init__(action_list)
 
+    def page(
+        self,
+        sort: ActionSort | None = None,
+        reverse: bool = False,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> ActionLister:
+        """Returns one page of the actions, optionally sorted.
+
+        With a limit, only the top offset + limit actions are selected (heap selection),
+        so the whole list is never sorted to show a page.
+
+        Args:
+            sort (ActionSort | None, optional): field to sort by. Defaults to None, which
+                keeps the list order.
+            reverse (bool, optional): sort descending, or walk the list from the end when
+                not sorting (storage order, not chronological). Defaults to False.
+            offset (int, optional): number of actions to skip. Defaults to 0.
+            limit (int | None, optional): maximum number of actions to return. Defaults to
+                None (no limit).
+
+        Returns:
+            ActionLister: the selected actions
+        """
+        if sort is None and not reverse and not offset and limit is None:
+            return self
+
+        stop = None if limit is None else offset + limit
+        if sort is None:
+            ordered = reversed(self.data) if reverse else iter(self.data)
+            return ActionLister(list(itertools.islice(ordered, offset, stop)))
+
+        key = _ACTION_SORT_KEYS[ActionSort(sort)]
+        if stop is None:
+            selected = sorted(self.data, key=key, reverse=reverse)
+        elif reverse:
+            selected = heapq.nlargest(stop, self.data, key=key)
+        else:
+            selected = heapq.nsmallest(stop, self.data, key=key)
+        return ActionLister(selected[offset:])
+
     def __eq__(self, other):
         if not isinstance(other, ActionLister):
             return False
@@ -0,0 +1,295 @@
+"""Long-running tracker daemon and the thin client the CLI uses to talk to it.
+
+`mtnt serve` keeps one loaded MaintenanceTracker resident and answers the app.py
+operations over a local Unix-domain socket, so commands skip loading and decoding
+the JSON stores. The protocol is one JSON object per line, encoded with the result
+encoder (result_json), an extension of the one used for the data files:
+
+    request:  {"op": "record_run", "args": [...], "kwargs": {...}}
+    response: {"ok": true, "result": ...}
+              {"ok": false, "error": "TaskNotFoundError", "message": "..."}
+"""
+
+from __future__ import annotations
+
+import builtins
+import logging
+import socket
+import socketserver
+import threading
+from pathlib import Path
+from typing import Any, Callable
+
+import app
+import core
+import errors
+import maintenance_tracker
+import metrics
+import profiling
+import report_cache
+import result_json
+from errors import DaemonError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET_FILE = "mtnt.sock"
+PING_TIMEOUT = 0.5  # seconds to wait when probing for a running daemon
+REQUEST_TIMEOUT = 60.0  # seconds to wait for the answer to an operation
+
+# app.py operations that can be called through the daemon
+OPERATIONS = (
+    "register_task",
+    "get_task_by_name",
+    "get_tasks_by_name",
+    "get_tasks_by_time",
+    "get_all_tasks",
+    "get_all_actions",
+    "edit_task",
+    "get_actions_for_task_filtered",
+    "record_run",
+    "get_overdue_tasks",
+    "get_dashboard",
+    "get_overdue_ranking",
+    "get_compliance",
+    "get_overdue_history",
+    "get_activity",
+    "get_next_runs",
+    "get_agenda",
+    "get_actions_by_time",
+    "count_actions_by_time",
+    "get_stats",
+    "compact_actions",
+    "archive_actions",
+    "delete_task",
+    "delete_action",
+    "get_action",
+    "edit_action",
+)
+
+
+def default_socket_path(data_dir: str | Path) -> Path:
+    """Returns the socket path used by the daemon serving data_dir."""
+    return Path(data_dir) / DEFAULT_SOCKET_FILE
+
+
+def unix_sockets_supported() -> bool:
+    return hasattr(socket, "AF_UNIX")
+
+
+def _encode(message: dict) -> bytes:
+    return (result_json.dumps(message) + "\n").encode("utf8")
+
+
+def _decode(line: bytes) -> dict:
+    return result_json.loads(line.decode("utf8"))
+
+
+def _data_fingerprint(tracker: maintenance_tracker.MaintenanceTracker) -> tuple:
+    """(mtime, size) of the tracker data files, journals and archive manifest, used to notice changes made by other processes."""
+    archive = getattr(tracker.action_repo, "archive", None)
+    return report_cache.files_fingerprint(
+        [
+            getattr(saver, attribute, None)
+            for saver in (tracker.task_list_saver, tracker.action_list_saver)
+            for attribute in ("save_path", "journal_path")
+        ]
+        + [getattr(archive, "manifest_path", None)]
+    )
+
+
+def handle_request(request: dict) -> dict:
+    """Executes one request against the app layer and builds its response."""
+    op = request.get("op")
+    if op == "ping":
+        return {"ok": True, "result": "pong"}
+    if op not in OPERATIONS:
+        return {
+            "ok": False,
+            "error": "DaemonError",
+            "message": f"unknown operation '{op}'",
+        }
+
+    operation: Callable = getattr(app, op)
+    try:
+        result = operation(*request.get("args", []), **request.get("kwargs", {}))
+    except Exception as e:
+        logger.info(f"operation {op} failed: {e!r}")
+        return {"ok": False, "error": type(e).__name__, "message": str(e)}
+    return {"ok": True, "result": result}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        server: TrackerServer = self.server  # type: ignore[assignment]
+        # a connection can carry any number of requests, one per line; each
+        # connection has its own thread, so an idle client does not block the others
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = _decode(line)
+            except ValueError as e:
+                response = {"ok": False, "error": "DaemonError", "message": str(e)}
+            else:
+                with server.lock:
+                    server.refresh_if_changed()
+                    response = handle_request(request)
+                    server.remember_fingerprint()
+            self.wfile.write(_encode(response))
+            self.wfile.flush()
+
+
+if unix_sockets_supported():
+    _ServerBase = socketserver.UnixStreamServer
+else:  # pragma: no cover - platforms without AF_UNIX
+    _ServerBase = socketserver.TCPServer
+
+
+class TrackerServer(socketserver.ThreadingMixIn, _ServerBase):
+    """Socket server with one thread per connection. The requests themselves are
+    executed one at a time under `lock`, so the resident tracker is never used by two
+    threads at once."""
+
+    # connections still open at shutdown do not keep the process alive
+    daemon_threads = True
+
+    def __init__(self, socket_path: str | Path):
+        if not unix_sockets_supported():
+            raise DaemonError("this platform does not support Unix-domain sockets")
+        self.socket_path = Path(socket_path)
+        if self.socket_path.exists():
+            # left behind by a daemon that did not shut down cleanly
+            self.socket_path.unlink()
+        self._previous_sink = None
+        if metrics.get_sink() is metrics.NULL_SINK:
+            # keep the stats of the resident tracker for `mtnt stats`
+            self._previous_sink = metrics.set_sink(metrics.InMemorySink())
+        self.tracker = app.get_tracker()
+        self._fingerprint = _data_fingerprint(self.tracker)
+        self.lock = threading.Lock()
+        super().__init__(str(self.socket_path), _RequestHandler)
+
+    def refresh_if_changed(self) -> None:
+        """Reloads the data files if another process wrote them since our last request."""
+        if self.tracker is not app.get_tracker():
+            # the app was pointed at a different tracker (eg: tests)
+            self.tracker = app.get_tracker()
+        elif _data_fingerprint(self.tracker) != self._fingerprint:
+            logger.info("data files changed on disk, reloading tracker")
+            self.tracker.reload()
+
+    def remember_fingerprint(self) -> None:
+        self._fingerprint = _data_fingerprint(self.tracker)
+
+    def server_close(self) -> None:
+        super().server_close()
+        if self._previous_sink is not None:
+            metrics.set_sink(self._previous_sink)
+        try:
+            self.socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def serve(socket_path: str | Path) -> None:
+    """Runs the daemon in the foreground until interrupted."""
+    with TrackerServer(socket_path) as server:
+        logger.info(f"serving tracker on {socket_path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("daemon interrupted, shutting down")
+
+
+class DaemonClient:
+    """Stand-in for the app module that forwards every operation to a running daemon.
+
+    Attribute access mirrors app.py (eg: client.record_run(...)), so the CLI can use
+    it in place of the app module.
+    """
+
+    def __init__(self, socket_path: str | Path, timeout: float = REQUEST_TIMEOUT):
+        self.socket_path = Path(socket_path)
+        self.timeout = timeout
+        self._sock: socket.socket | None = None
+        self._reader = None
+
+    def _connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(str(self.socket_path))
+        self._sock = sock
+        self._reader = sock.makefile("rb")
+
+    def close(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+        if self._sock is not None:
+            self._sock.close()
+        self._sock = None
+        self._reader = None
+
+    def call(self, op: str, *args, **kwargs) -> Any:
+        """Executes an app operation on the daemon and returns its result.
+
+        Raises:
+            DaemonError: if the daemon cannot be reached or the operation is unknown
+            any exception raised by the operation itself, re-created by name
+        """
+        with profiling.span("daemon request"):
+            line = self._send(op, args, kwargs)
+        with profiling.span("json decode"):
+            response = _decode(line)
+        if response["ok"]:
+            return response["result"]
+        raise _rebuild_exception(response["error"], response["message"])
+
+    def _send(self, op: str, args: tuple, kwargs: dict) -> bytes:
+        """Sends one request, returns the encoded response line"""
+        if self._sock is None:
+            self._connect()
+        assert self._sock is not None and self._reader is not None
+        try:
+            self._sock.sendall(_encode({"op": op, "args": args, "kwargs": kwargs}))
+            line = self._reader.readline()
+        except OSError as e:
+            self.close()
+            raise DaemonError(f"lost connection to the daemon: {e}") from e
+        if not line:
+            self.close()
+            raise DaemonError("the daemon closed the connection")
+        return line
+
+    def __getattr__(self, name: str) -> Callable:
+        if name not in OPERATIONS:
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+
+
+def _rebuild_exception(name: str, message: str) -> Exception:
+    """Re-creates an exception raised in the daemon, falling back to DaemonError."""
+    exc_type = (
+        getattr(errors, name, None)
+        or getattr(core, name, None)
+        or getattr(builtins, name, None)
+    )
+    if isinstance(exc_type, type) and issubclass(exc_type, Exception):
+        return exc_type(message)
+    return DaemonError(f"{name}: {message}")
+
+
+def connect(socket_path: str | Path) -> DaemonClient | None:
+    """Returns a client for the daemon on socket_path, or None when no daemon answers."""
+    if not unix_sockets_supported() or not Path(socket_path).exists():
+        return None
+    client = DaemonClient(socket_path, timeout=PING_TIMEOUT)
+    try:
+        client.call("ping")
+    except (OSError, DaemonError):
+        client.close()
+        logger.debug(f"no daemon answering on {socket_path}")
+        return None
+    client.timeout = REQUEST_TIMEOUT
+    if client._sock is not None:
+        client._sock.settimeout(REQUEST_TIMEOUT)
+    return client
@@ -22,3 +22,15 @@ class ActionNotFoundError(MaintenanceTrackerError):
 
 class DanglingActionsError(MaintenanceTrackerError):
     """Raised when attempting to delete/replace a task that still has actions attached."""
+
+
+class DaemonError(MaintenanceTrackerError):
+    """Raised when the tracker daemon cannot be started, reached or understood."""
+
+
+class ConcurrentModificationError(MaintenanceTrackerError):
+    """Raised when changes made by another process cannot be merged with ours."""
+
+
+class ArchivedActionError(MaintenanceTrackerError):
+    """Raised when attempting to change or delete an action moved to the archive."""
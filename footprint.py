@@ -0,0 +1,88 @@
+"""Memory taken by the loaded data (mtnt dev memory).
+
+The data files are loaded under tracemalloc, tasks first and then actions, the same
+way MaintenanceTracker(load=True) does. The memory still allocated after each step is
+what the tracker keeps for those objects (including the indexes built while loading),
+so it gives the bytes per Task and per Action, while the peak includes the JSON text
+and the objects only alive while decoding.
+"""
+
+from __future__ import annotations
+
+import gc
+import tracemalloc
+from dataclasses import dataclass, field
+
+from maintenance_tracker import MaintenanceTracker
+
+
+@dataclass(frozen=True)
+class Footprint:
+    """Memory kept by the loaded tasks and actions, in bytes"""
+
+    tasks: int
+    actions: int
+    task_bytes: int
+    action_bytes: int
+    peak_bytes: int  # highest traced memory while loading
+    # source lines that allocated the most kept memory: (file:line, bytes, blocks)
+    top: list[tuple[str, int, int]] = field(default_factory=list)
+
+    @property
+    def bytes_per_task(self) -> float:
+        return self.task_bytes / self.tasks if self.tasks else 0.0
+
+    @property
+    def bytes_per_action(self) -> float:
+        return self.action_bytes / self.actions if self.actions else 0.0
+
+
+def _traced() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def measure_load(data_dir: str, top: int = 10) -> Footprint:
+    """Loads the data files in data_dir and measures the memory they take
+
+    Raises:
+        FileNotFoundError: if data_dir does not hold both data files (loading would
+            create them)
+    """
+    tracker = MaintenanceTracker(save_dir=data_dir)
+    missing = [
+        str(saver.save_path)
+        for saver in (tracker.task_list_saver, tracker.action_list_saver)
+        if not saver.save_path.is_file()
+    ]
+    if missing:
+        raise FileNotFoundError(f"no data files to load: {', '.join(missing)}")
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before = _traced()
+        tracker.task_repo.load()
+        after_tasks = _traced()
+        tracker.action_repo.load()
+        after_actions = _traced()
+        peak = tracemalloc.get_traced_memory()[1] - before
+
+        statistics = tracemalloc.take_snapshot().statistics("lineno")[:top]
+        top_lines = [
+            (f"{s.traceback[0].filename}:{s.traceback[0].lineno}", s.size, s.count)
+            for s in statistics
+        ]
+        return Footprint(
+            tasks=len(tracker.task_list),
+            actions=len(tracker.action_list),
+            task_bytes=after_tasks - before,
+            action_bytes=after_actions - after_tasks,
+            peak_bytes=peak,
+            top=top_lines,
+        )
+    finally:
+        if started:
+            tracemalloc.stop()
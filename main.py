@@ -1,5 +1,9 @@
 # main creates logging, configures and starts the typer app
 
+import time
+
+_STARTED = time.perf_counter()  # mtnt --profile times the imports from here
+
 import os
 import sys
 from pathlib import Path
@@ -14,9 +18,12 @@ logging.basicConfig(
 import typer
 from typing_extensions import Annotated
 
+import cli
+import daemon
+import profiling
+import utils
 from cli import *
 from config import config, APP_NAME
-from app import tracker
 from repository import DEFAULT_TASK_LIST_FILE
 
 logger = logging.getLogger(__name__)
@@ -36,6 +43,12 @@ typer_app.add_typer(get_app, name="get")
 typer_app.add_typer(edit_app, name="edit")
 typer_app.add_typer(delete_app, name="delete")
 typer_app.add_typer(report_app, name="report")
+typer_app.add_typer(dev_app, name="dev")
+typer_app.command("batch")(batch_cli)
+typer_app.command("stats")(stats_cli)
+typer_app.command("compact")(compact_cli)
+typer_app.command("archive")(archive_cli)
+typer_app.command("serve")(serve_cli)
 
 
 @typer_app.callback()
@@ -45,11 +58,31 @@ def main(
     config_dir: Annotated[
         Optional[str], typer.Option(help="directory to store configs")
     ] = typer.get_app_dir(APP_NAME),
+    no_daemon: Annotated[
+        bool,
+        typer.Option("--no-daemon", help="do not use a running mtnt daemon"),
+    ] = False,
+    profile: Annotated[
+        bool,
+        typer.Option("--profile", help="print how long each phase took to stderr"),
+    ] = False,
+    profile_output: Annotated[
+        Optional[str],
+        typer.Option(
+            "--profile-output",
+            help="also run the command under cProfile and dump its stats to this "
+            ".prof file (implies --profile)",
+        ),
+    ] = None,
 ):
     "mtnt: a simple cli maintenance tracker for your repetitive tasks"
     global config
 
-    config.init_config(config_dir=config_dir, verbose=verbose)
+    if profile or profile_output:
+        _start_profiling(ctx, profile_output)
+
+    with profiling.span("config"):
+        config.init_config(config_dir=config_dir, verbose=verbose)
 
     if config.verbose:
         logging.basicConfig(level=max(logging.INFO, logger.level))
@@ -63,13 +96,35 @@ def main(
 
     logger.info(f"config directory: {dir_path}")
 
-    logger.info(f"loading tracker from path: {Path(config.data_dir)}")
+    logger.info(f"tracker data path: {Path(config.data_dir)}")
     # Check before loading: loading a tracker initializes its JSON files when they
     # do not yet exist.  This preserves the first-run help behavior.
     database_exists = (Path(config.data_dir) / DEFAULT_TASK_LIST_FILE).is_file()
 
-    app.tracker = MaintenanceTracker(load=True, save_dir=config.data_dir)
-    logger.debug(f"{tracker}")
+    # the tracker itself is only created when a command first needs it
+    app.configure_tracker(
+        load=True,
+        save_dir=config.data_dir,
+        keep_backups=config.keep_backups or 0,
+        journal_actions=bool(config.journal_actions),
+        archive_after=(
+            utils.parse_interval(config.archive_after) if config.archive_after else None
+        ),
+        archive_compression=config.archive_compression or None,
+    )
+
+    # when a daemon is serving this data dir, route the commands through it instead
+    # of loading the data files in this process
+    if isinstance(cli.app, daemon.DaemonClient):
+        cli.app.close()
+        cli.app = app
+    # (a batch is meant to run against one tracker loaded in this process, and the
+    # dev tools measure this process)
+    if not no_daemon and ctx.invoked_subcommand not in ("serve", "batch", "dev"):
+        client = daemon.connect(daemon.default_socket_path(config.data_dir))
+        if client is not None:
+            logger.info(f"using the daemon on {client.socket_path}")
+            cli.app = client
 
     if ctx.invoked_subcommand is None:
         if database_exists:
@@ -78,5 +133,22 @@ def main(
             typer.echo(ctx.get_help())
 
 
+def _start_profiling(ctx: typer.Context, profile_output: str | None) -> None:
+    """Times the rest of the invocation, and prints the breakdown when it ends."""
+    profiler = profiling.enable(start=_STARTED)
+    profiler.record("startup", time.perf_counter() - _STARTED)
+    # closed in reverse order: the command span, then cProfile, then the report
+    ctx.call_on_close(_report_profile)
+    if profile_output:
+        ctx.with_resource(profiling.cprofile_to(profile_output))
+    ctx.with_resource(profiling.span("command"))
+
+
+def _report_profile() -> None:
+    profiler = profiling.disable()
+    if profiler is not None:
+        profiler.report(sys.stderr)
+
+
 if __name__ == "__main__":
     typer_app()
@@ -1,19 +1,45 @@
+import heapq
+import itertools
 import logging
+import math
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
 import utils
 from core import *
 from repository import (
+    ARCHIVE_MIN_ACTIONS,
     TaskListPersister,
     ActionListPersister,
     FileTaskRepository,
     FileActionRepository,
+    data_lock,
 )
 from enum import Enum
-from datetime import datetime, timedelta, UTC
-from errors import DuplicateTaskError, DanglingActionsError
-from typing import Optional
+from datetime import date, datetime, timedelta, UTC
+from errors import (
+    ArchivedActionError,
+    ConcurrentModificationError,
+    DuplicateTaskError,
+    DanglingActionsError,
+)
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+
+try:  # optional, speeds up counting actions by day on large histories
+    import numpy
+except ImportError:  # pragma: no cover - depends on the environment
+    numpy = None
 
 logger = logging.getLogger(__name__)
 
+NUMPY_MIN_ACTIONS = 5000  # below this, counting in Python is as fast
+_SECONDS_PER_DAY = 86400
+_EPOCH_DAY = date(1970, 1, 1)
+# bounds of the time ranges read from the action repository when a report looks
+# at the whole history
+_BEGINNING = datetime.min.replace(tzinfo=UTC)
+_END_OF_TIME = datetime.max.replace(tzinfo=UTC)
+
 
 class ActionRecordResults(Enum):
     SUCCESS = 1  # all good, and task of this action matches the task already registered
@@ -30,6 +56,157 @@ class TaskRecordResults(Enum):
     )
 
 
+def _is_overdue(
+    last_programmed_time: datetime, last_run: Action | None, when: datetime
+) -> bool:
+    """A task is overdue when it was programmed before when and has not run since"""
+    if last_run is None:
+        return last_programmed_time < when
+
+    return last_programmed_time < when and last_run.timestamp < last_programmed_time
+
+
+def _overdue_status(status: TaskStatus, when: datetime) -> OverdueStatus:
+    """Works out how late an overdue task is from its status"""
+    task = status.task
+    assert status.last_programmed is not None
+    if status.last_run is None or status.last_run.timestamp < task.start_time:
+        first_missed = task.start_time
+    else:
+        first_missed = task.get_programmed_time(1, when=status.last_run.timestamp)
+    assert first_missed is not None
+
+    missed_runs = 1
+    if task.interval:
+        missed_runs += (status.last_programmed - first_missed) // task.interval
+
+    return OverdueStatus(
+        task=task,
+        first_missed=first_missed,
+        lateness=when - first_missed,
+        missed_runs=missed_runs,
+    )
+
+
+def _task_compliance(
+    task: Task,
+    run_times: Sequence[datetime],
+    start: datetime,
+    end: datetime,
+    grace: timedelta | None,
+) -> ComplianceStats:
+    """Matches the programmed times of a task in [start, end] with its sorted run times.
+
+    Each programmed time owns the slot up to the next programmed time, and is satisfied
+    by the first run in that slot. Both sequences are walked once, in order (a two-pointer
+    merge). Programmed times whose slot is still open at end and that were not run yet
+    are not counted, except for tasks that don't repeat, whose slot never closes.
+    """
+    delays: list[timedelta] = []
+    missed = 0
+    j = 0
+    prog_times = task.iter_programmed_times(start, end)
+    prog_time = next(prog_times, None)
+    while prog_time is not None:
+        following = next(prog_times, None)
+        slot_end = following or task.get_programmed_time(1, when=prog_time)
+
+        # runs before this programmed time belong to earlier slots
+        while j < len(run_times) and run_times[j] < prog_time:
+            j += 1
+        if j < len(run_times) and (slot_end is None or run_times[j] < slot_end):
+            delays.append(run_times[j] - prog_time)
+        elif slot_end is None or slot_end <= end:
+            missed += 1
+
+        prog_time = following
+
+    late = sum(1 for d in delays if grace is not None and d > grace)
+    mean_lateness = p95_lateness = None
+    if delays:
+        mean_lateness = timedelta(
+            seconds=round(sum(d.total_seconds() for d in delays) / len(delays))
+        )
+        # nearest-rank percentile
+        p95_lateness = sorted(delays)[math.ceil(0.95 * len(delays)) - 1]
+
+    return ComplianceStats(
+        task=task,
+        due=len(delays) + missed,
+        on_time=len(delays) - late,
+        late=late,
+        missed=missed,
+        mean_lateness=mean_lateness,
+        p95_lateness=p95_lateness,
+    )
+
+
+def _count_by_day(
+    actions: Sequence[Action], by_actor: bool, by_task: bool
+) -> Counter[tuple[date, str | None, str | None]]:
+    """Counts actions per (UTC day, actor, task) in a single pass"""
+    counts: Counter = Counter()
+    for a in actions:
+        counts[
+            (
+                a.timestamp.astimezone(UTC).date(),
+                a.actor if by_actor else None,
+                a.ref_task.name if by_task else None,
+            )
+        ] += 1
+    return counts
+
+
+def _count_by_day_numpy(
+    actions: Sequence[Action], by_actor: bool, by_task: bool
+) -> Counter[tuple[date, str | None, str | None]]:
+    """Same as _count_by_day, with numpy.bincount over epoch days"""
+    assert numpy is not None
+    groups: dict[tuple[str | None, str | None], int] = {}
+    codes = numpy.fromiter(
+        (
+            groups.setdefault(
+                (a.actor if by_actor else None, a.ref_task.name if by_task else None),
+                len(groups),
+            )
+            for a in actions
+        ),
+        dtype=numpy.int64,
+        count=len(actions),
+    )
+    seconds = numpy.fromiter(
+        (a.timestamp.timestamp() for a in actions),
+        dtype=numpy.float64,
+        count=len(actions),
+    )
+    days = numpy.floor_divide(seconds, _SECONDS_PER_DAY).astype(numpy.int64)
+    first_day = int(days.min())
+    span = int(days.max()) - first_day + 1
+    bins = numpy.bincount(codes * span + (days - first_day))
+
+    group_keys = list(groups)
+    counts: Counter = Counter()
+    for index in numpy.flatnonzero(bins):
+        group, day = divmod(int(index), span)
+        actor, task = group_keys[group]
+        day_date = _EPOCH_DAY + timedelta(days=first_day + day)
+        counts[(day_date, actor, task)] = int(bins[index])
+    return counts
+
+
+# kinds of events swept by overdue_history, in the order they apply at the same instant
+_PROGRAMMED, _RUN, _STEP = 0, 1, 2
+
+
+def _programmed_events(
+    task: Task, start: datetime, end: datetime
+) -> Iterator[tuple[datetime, int, str]]:
+    """The programmed times of a task after start and up to end, as sweep events"""
+    for prog_time in task.iter_programmed_times(start, end):
+        if prog_time > start:
+            yield prog_time, _PROGRAMMED, task.name
+
+
 class MaintenanceTracker:
     """maintenance_tracker sets up lists of tasks and actions related to those tasks.
 
@@ -50,22 +227,41 @@ class MaintenanceTracker:
         save_task_file=None,
         task_repo=None,
         action_repo=None,
+        keep_backups=None,
+        journal_actions=None,
+        archive_after: timedelta | None = None,
+        archive_compression=None,
     ):
         logger.debug(
-            f"Initializing tracker: {load =}, {save_dir = }, {save_actions_file = }, {save_task_file = }, {task_repo = }, {action_repo = }"
+            f"Initializing tracker: {load =}, {save_dir = }, {save_actions_file = }, {save_task_file = }, {task_repo = }, {action_repo = }, {keep_backups = }, {journal_actions = }, {archive_after = }, {archive_compression = }"
         )
 
         # If repositories were provided, use them; otherwise create file-backed repos.
         if task_repo is None:
             task_repo = FileTaskRepository(
-                task_list=TaskLister([]), dirname=save_dir, filename=save_task_file
+                task_list=TaskLister([]),
+                dirname=save_dir,
+                filename=save_task_file,
+                keep_backups=keep_backups,
             )
         if action_repo is None:
             action_repo = FileActionRepository(
                 action_list=ActionLister([]),
                 dirname=save_dir,
                 filename=save_actions_file,
+                keep_backups=keep_backups,
+                journal=journal_actions,
+                archive_compression=archive_compression,
             )
+        # retention policy: actions older than this are archived when saving
+        self.archive_after = archive_after
+
+        # transaction state, see transaction()
+        self._undo_log: list[Callable[[], None]] = []
+        self._savepoint_depth = 0
+        self._transaction_depth = 0
+        self._save_requested = False
+        self._changes = 0  # incremented by every mutation
 
         # expose repo objects
         self.task_repo = task_repo
@@ -92,12 +288,11 @@ class MaintenanceTracker:
             ),
         )
 
+        # folder locked while loading and saving the data files
+        self.data_dir: Path = self.task_list_saver.save_path.parent
+
         if load:
-            # load via repositories
-            if hasattr(self.task_repo, "load"):
-                self.task_repo.load()
-            if hasattr(self.action_repo, "load"):
-                self.action_repo.load()
+            self.reload()
 
             # Log loaded paths if persisters are available
             if self.task_list_saver is not None:
@@ -115,17 +310,103 @@ class MaintenanceTracker:
                 f"num tasks: {len(self.task_list)}, num actions: {len(self.action_list)}"
             )
 
+    def reload(self) -> None:
+        """Loads the tasks and actions from their repositories, both in one shared
+        section of the data folder lock"""
+        with data_lock(self.data_dir):
+            if hasattr(self.task_repo, "load"):
+                self.task_repo.load()
+            if hasattr(self.action_repo, "load"):
+                self.action_repo.load()
+
+    def compact(self) -> int:
+        """Folds the journal of action changes into the action file (see
+        repository.Persister), returning the number of journal entries folded"""
+        if not hasattr(self.action_repo, "compact"):
+            return 0
+        return self.action_repo.compact()
+
+    def archive(
+        self,
+        older_than: timedelta,
+        min_actions: int = 1,
+        compression: str | None = None,
+    ) -> int:
+        """Moves the actions recorded more than older_than ago to the archive (see
+        repository.ActionArchive), except the latest run of each task, so due dates
+        are unchanged. Nothing is moved when fewer than min_actions are due.
+
+        Returns:
+            int: number of actions moved
+        """
+        if not hasattr(self.action_repo, "archive_before"):
+            return 0
+        return self.action_repo.archive_before(
+            datetime.now(UTC) - older_than, min_actions, compression
+        )
+
+    @contextmanager
+    def transaction(self) -> Iterator["MaintenanceTracker"]:
+        """Groups several operations into one unit of work.
+
+        Calls to save() inside the block are deferred, and the data files are written
+        once when the outermost transaction ends, if anything changed. If an exception
+        escapes the block, every change made inside it is rolled back in memory and
+        nothing is written. Transactions can be nested: an inner one that fails only
+        rolls back its own changes.
+        """
+        outermost = self._transaction_depth == 0
+        if outermost:
+            self._save_requested = False
+        changes_at_start = self._changes
+
+        self._transaction_depth += 1
+        try:
+            with self._savepoint():
+                yield self
+        finally:
+            self._transaction_depth -= 1
+
+        if outermost and (self._save_requested or self._changes != changes_at_start):
+            self._save_requested = False
+            self.save()
+
+    @contextmanager
+    def _savepoint(self) -> Iterator[None]:
+        """Rolls back the in-memory changes made in the block if an exception escapes it."""
+        mark = len(self._undo_log)
+        self._savepoint_depth += 1
+        try:
+            yield
+        except BaseException:
+            logger.info(f"rolling back {len(self._undo_log) - mark} change(s)")
+            while len(self._undo_log) > mark:
+                self._undo_log.pop()()
+            raise
+        finally:
+            self._savepoint_depth -= 1
+            if self._savepoint_depth == 0:
+                self._undo_log.clear()
+
+    def _changed(self, undo: Callable[[], None]) -> None:
+        """Records a mutation, and how to revert it while a savepoint is active."""
+        self._changes += 1
+        if self._savepoint_depth:
+            self._undo_log.append(undo)
+
+    def _removal_undo(self, lister, item) -> Callable[[], None]:
+        """Undo for removing item from lister: put it back where it was."""
+        index = lister.index(item)
+        return lambda: lister.insert(index, item)
+
     def register_task(self, new_task: Task) -> TaskRecordResults:
         """Register a new task.
 
         Raises DuplicateTaskError if a task with the same name already exists.
         Returns TaskRecordResults.SUCCESS on success.
         """
-        try:
-            self.task_list.append(new_task)
-        except Exception as e:
-            # Normalize TaskWithSameNameError from core.TaskLister to DuplicateTaskError
-            raise DuplicateTaskError(str(e)) from e
+        self.task_repo.add(new_task)
+        self._changed(lambda: self.task_repo.remove(new_task))
         return TaskRecordResults.SUCCESS
 
     def record_run(self, new_action: Action) -> ActionRecordResults:
@@ -155,6 +436,7 @@ class MaintenanceTracker:
             self.register_task(new_action.ref_task)
             try:
                 self.action_repo.add(new_action)
+                self._changed(lambda: self.action_repo.remove(new_action))
                 ret_code = ActionRecordResults.SUCCESS
             except Exception:
                 # keep original failure semantics if add fails
@@ -162,6 +444,7 @@ class MaintenanceTracker:
         else:
             # task is already registered, add action via repository
             self.action_repo.add(new_action)
+            self._changed(lambda: self.action_repo.remove(new_action))
 
             # warn the user if ref_task is different from the one in the repo
             registered_task = self.task_repo.get_by_name(new_action.ref_task.name)
@@ -259,10 +542,263 @@ class MaintenanceTracker:
             return False
 
         last_run = self.get_latest_task_run(task, when)
-        if last_run is None:
-            return last_programmed_time < when
+        return _is_overdue(last_programmed_time, last_run, when)
+
+    def get_latest_runs(self, when: datetime | None = None) -> dict[str, Action]:
+        """Returns the most recent run of every task, in a single pass over the actions
+        (archived runs included, see repository.FileActionRepository.get_latest_by_task)
+
+        Args:
+            when (datetime | None, optional): the time considered as "now", later
+                actions are ignored. Defaults to None.
+
+        Returns:
+            dict[str, Action]: latest action at or before when, by task name. Tasks
+            without runs are not included
+        """
+        if when is None:
+            when = datetime.now(UTC)
+
+        return self.action_repo.get_latest_by_task(when)
+
+    def dashboard(self, when: datetime | None = None) -> list[TaskStatus]:
+        """Computes the status of every task at a given time in one pass.
+
+        The actions are scanned once for the latest run of every task, and each task's
+        schedule is evaluated once, instead of once for the overdue check and again for
+        the next run.
+
+        Args:
+            when (datetime | None, optional): the time considered as "now". Defaults to None.
+
+        Returns:
+            list[TaskStatus]: the status of every task, in task list order
+        """
+        if when is None:
+            when = datetime.now(UTC)
+
+        latest_runs = self.get_latest_runs(when)
+        statuses = []
+        for task in self.task_list:
+            last_run = latest_runs.get(task.name)
+            last_programmed = task.get_programmed_time(-1, when)
+            statuses.append(
+                TaskStatus(
+                    task=task,
+                    last_run=last_run,
+                    last_programmed=last_programmed,
+                    next_run=task.get_programmed_time(1, when),
+                    overdue=last_programmed is not None
+                    and _is_overdue(last_programmed, last_run, when),
+                )
+            )
+        return statuses
+
+    def rank_overdue(
+        self,
+        when: datetime | None = None,
+        top: int | None = None,
+        by: OverdueRank = OverdueRank.LATENESS,
+    ) -> list[OverdueStatus]:
+        """Ranks the overdue tasks, most overdue first.
 
-        return last_programmed_time < when and last_run.timestamp < last_programmed_time
+        Builds on dashboard(), so the actions are scanned once, and uses heap selection
+        when only the top tasks are requested.
+
+        Args:
+            when (datetime | None, optional): the time considered as "now". Defaults to None.
+            top (int | None, optional): only return this many tasks. Defaults to None (all).
+            by (OverdueRank, optional): ranking criteria, ties are broken by the other
+                one. Defaults to OverdueRank.LATENESS.
+
+        Returns:
+            list[OverdueStatus]: the overdue tasks, most overdue first
+        """
+        if when is None:
+            when = datetime.now(UTC)
+
+        overdue = (
+            _overdue_status(status, when)
+            for status in self.dashboard(when)
+            if status.overdue
+        )
+        if OverdueRank(by) == OverdueRank.MISSED:
+            key: Callable = lambda o: (o.missed_runs, o.lateness)
+        else:
+            key = lambda o: (o.lateness, o.missed_runs)
+
+        if top is None:
+            return sorted(overdue, key=key, reverse=True)
+        return heapq.nlargest(top, overdue, key=key)
+
+    def compliance(
+        self,
+        start: datetime,
+        end: datetime | None = None,
+        grace: timedelta | None = None,
+        tasks: Iterable[Task] | None = None,
+    ) -> list[ComplianceStats]:
+        """Computes how well each task kept to its schedule over a period.
+
+        Every programmed time in the period is matched with the first run recorded
+        before the next programmed time. The actions are grouped by task in one pass,
+        and each task's programmed times and sorted runs are then merged linearly.
+
+        Args:
+            start (datetime): beginning of the period
+            end (datetime | None, optional): end of the period, capped to now. Defaults
+                to None (now).
+            grace (timedelta | None, optional): runs later than this after their programmed
+                time count as late. Defaults to None, where any run before the next
+                programmed time is on time.
+            tasks (Iterable[Task] | None, optional): tasks to analyse. Defaults to None
+                (all tasks).
+
+        Returns:
+            list[ComplianceStats]: statistics for every task with programmed times in the
+            period
+        """
+        now = datetime.now(UTC)
+        end = now if end is None else min(end, now)
+        if tasks is None:
+            tasks = self.task_list
+
+        # runs before start never satisfy a programmed time in the period, but a
+        # late run of the last one may be after end
+        run_times: dict[str, list[datetime]] = {}
+        for a in self.action_repo.get_by_time(start, _END_OF_TIME):
+            run_times.setdefault(a.ref_task.name, []).append(a.timestamp)
+
+        stats = []
+        for task in tasks:
+            task_stats = _task_compliance(
+                task, sorted(run_times.get(task.name, [])), start, end, grace
+            )
+            if task_stats.due:
+                stats.append(task_stats)
+        return stats
+
+    def overdue_history(
+        self, start: datetime, end: datetime, step: timedelta
+    ) -> list[tuple[datetime, TaskLister]]:
+        """Lists the overdue tasks at regular steps over a period.
+
+        Instead of checking every task at every step, the programmed times and runs of
+        all tasks in the period are merged into one time-ordered stream of events and
+        swept once, keeping the last programmed time and last run of each task (and so
+        whether it is overdue) up to date as time advances.
+
+        Args:
+            start (datetime): first step
+            end (datetime): no steps after this time
+            step (timedelta): time between steps
+
+        Raises:
+            ValueError: if step is not positive
+
+        Returns:
+            list[tuple[datetime, TaskLister]]: each step with the tasks overdue at that
+            time, in task list order
+        """
+        if step <= timedelta(0):
+            raise ValueError("step must be a positive interval")
+
+        tasks = {t.name: t for t in self.task_list}
+        position = {name: i for i, name in enumerate(tasks)}
+
+        # state at start
+        latest_runs = self.get_latest_runs(start)
+        last_programmed = {
+            n: t.get_programmed_time(-1, start) for n, t in tasks.items()
+        }
+        last_run = {n: a.timestamp for n, a in latest_runs.items()}
+        overdue: set[str] = set()
+
+        def update(name: str) -> None:
+            prog_time, run_time = last_programmed[name], last_run.get(name)
+            if prog_time is not None and (run_time is None or run_time < prog_time):
+                overdue.add(name)
+            else:
+                overdue.discard(name)
+
+        for name in tasks:
+            update(name)
+
+        # events after start, as (time, kind, task name). At the same instant, the
+        # programmed times and runs come before the step
+        runs = sorted(
+            (a.timestamp, _RUN, a.ref_task.name)
+            for a in self.action_repo.get_by_time(start, end)
+            if start < a.timestamp and a.ref_task.name in tasks
+        )
+        steps = ((start + step * i, _STEP, "") for i in itertools.count())
+        events = heapq.merge(
+            runs,
+            *(_programmed_events(t, start, end) for t in tasks.values()),
+            itertools.takewhile(lambda e: e[0] <= end, steps),
+        )
+
+        history = []
+        for time, kind, name in events:
+            if kind == _PROGRAMMED:
+                last_programmed[name] = time
+                update(name)
+            elif kind == _RUN:
+                last_run[name] = time
+                update(name)
+            else:
+                # a task is not overdue yet at its own programmed time
+                names = [n for n in overdue if last_programmed[n] < time]  # type: ignore
+                names.sort(key=position.__getitem__)
+                history.append((time, TaskLister([tasks[n] for n in names])))
+        return history
+
+    def activity(
+        self,
+        by: ActivityPeriod = ActivityPeriod.DAY,
+        by_actor: bool = False,
+        by_task: bool = False,
+        actions: Sequence[Action] | None = None,
+    ) -> list[ActivityCount]:
+        """Counts actions per period, optionally split by actor and/or task.
+
+        The actions are counted per UTC day in a single pass (with numpy.bincount on
+        large histories when numpy is installed), and the days are then folded into
+        weeks or months, which only touches each distinct day once.
+
+        Args:
+            by (ActivityPeriod, optional): period to count by. Defaults to days.
+            by_actor (bool, optional): count each actor separately. Defaults to False.
+            by_task (bool, optional): count each task separately. Defaults to False.
+            actions (Sequence[Action] | None, optional): actions to count. Defaults to
+                None (all actions, archived ones included).
+
+        Returns:
+            list[ActivityCount]: counts of the periods with actions, ordered by period,
+            actor and task
+        """
+        by = ActivityPeriod(by)
+        if actions is None:
+            actions = self.action_repo.get_by_time(_BEGINNING, _END_OF_TIME)
+        if not actions:
+            return []
+
+        if numpy is not None and len(actions) >= NUMPY_MIN_ACTIONS:
+            day_counts = _count_by_day_numpy(actions, by_actor, by_task)
+        else:
+            day_counts = _count_by_day(actions, by_actor, by_task)
+
+        period_counts: Counter = Counter()
+        for (day, actor, task), count in day_counts.items():
+            period_counts[(by.start_of(day), actor, task)] += count
+
+        return [
+            ActivityCount(by, start, count, actor, task)
+            for (start, actor, task), count in sorted(
+                period_counts.items(),
+                key=lambda item: (item[0][0], item[0][1] or "", item[0][2] or ""),
+            )
+        ]
 
     def time_since_last_exec(
         self, task: Task, when: datetime | None = None
@@ -309,7 +845,9 @@ class MaintenanceTracker:
             )
 
         # Remove via repository
+        undo = self._removal_undo(self.task_list, task)
         self.task_repo.remove(task)
+        self._changed(undo)
         return TaskRecordResults.SUCCESS
 
     def delete_run(self, action: Action) -> ActionRecordResults:
@@ -323,21 +861,69 @@ class MaintenanceTracker:
         """
         logger.debug(f"deleting action {action.ref_task.name}: {action.timestamp}")
 
-        # Delegate delete to action repository
+        # Delegate delete to action repository, which also puts it back on rollback
+        try:
+            index = self.action_list.index(action)
+        except ValueError:
+            is_archived = getattr(self.action_repo, "is_archived", None)
+            if is_archived is not None and is_archived(action):
+                raise ArchivedActionError(
+                    "the action is archived and cannot be changed"
+                ) from None
+            raise
         self.action_repo.remove(action)
+        self._changed(lambda: self.action_repo.insert(index, action))
         return ActionRecordResults.SUCCESS
 
+    def delete_runs(self, actions: Iterable[Action]) -> int:
+        """Deletes several actions from the tracker in a single pass over the actions
+
+        Args:
+            actions (Iterable[Action]): actions of the tracker to be deleted
+
+        Returns:
+            int: number of deleted actions
+        """
+        removed = self.action_repo.remove_many(actions)
+        logger.debug(f"deleted {len(removed)} actions")
+        if removed:
+            self._changed(lambda: self.action_repo.restore_many(removed))
+        return len(removed)
+
     # --- Business helper methods moved from app.py ---
     def get_tasks_by_time(
         self, start_time: datetime, end_time: datetime | None = None
     ) -> TaskLister:
-        """Returns tasks that have actions in a given time range."""
-        actions = self.get_actions_by_time(start_time, end_time)
-        tasks = TaskLister()
+        """Returns tasks that have actions in a given time range, in task list order."""
+        if end_time is None:
+            end_time = datetime.now(UTC)
+        names = self.action_repo.task_names_by_time(start_time, end_time)
+        return TaskLister([t for t in self.task_list if t.name in names])
+
+    def count_actions_by_time(
+        self,
+        start_time: datetime,
+        end_time: datetime | None = None,
+        task: Task | None = None,
+    ) -> int:
+        """Returns the number of actions (of a task, or of all) in a given time range."""
+        if end_time is None:
+            end_time = datetime.now(UTC)
+        return self.action_repo.count_by_time(
+            start_time, end_time, task.name if task else None
+        )
+
+    def split_archived(
+        self, actions: Iterable[Action]
+    ) -> tuple[list[Action], list[Action]]:
+        """Splits actions of the tracker into the ones in the action list, which can be
+        changed, and the archived ones, which cannot"""
+        hot_ids = {id(a) for a in self.action_list}
+        hot: list[Action] = []
+        archived: list[Action] = []
         for action in actions:
-            if action.ref_task not in tasks:
-                tasks.append(action.ref_task)
-        return tasks
+            (hot if id(action) in hot_ids else archived).append(action)
+        return hot, archived
 
     def get_actions_for_task_filtered(
         self,
@@ -384,33 +970,40 @@ class MaintenanceTracker:
     def edit_task(self, old_task: Task, changes: dict) -> Task | None:
         """Replace a task and move existing actions to the new task.
 
-        Returns the new task on success, or None on failure.
+        Archived actions are never rewritten: the archive records that they now
+        point to the new task (see repository.ActionArchive).
+
+        Returns the new task on success, or None on failure. If any step fails, the
+        partial changes (new task, moved actions) are rolled back.
         """
         logger.debug(f"replacing old task: {old_task.name} (id: {id(old_task)})")
         new_task = old_task.replace(changes)
         logger.debug(f"with new task: {new_task.name} (id: {id(new_task)})")
 
-        # register the new task
-        self.register_task(new_task)
-
-        # move actions to the new task
-        actions = self.get_actions_for_task(old_task)
-        logger.debug(f"updating {len(actions)} actions to point to new task")
-        for action in actions:
-            new_action = action.replace({"ref_task": new_task})
-            self.record_run(new_action)
-            self.delete_run(action)
-            logger.debug(f"updated {new_action.timestamp}")
+        with self._savepoint():
+            # register the new task
+            self.register_task(new_task)
 
-        logger.debug("deleting old task")
-        # delete_task will raise DanglingActionsError if it cannot be deleted
-        try:
-            self.delete_task(old_task)
-        except DanglingActionsError:
-            logger.fatal(
-                "error editing (replacing) task - could not move the old actions to the new task"
-            )
-            raise
+            # move actions to the new task
+            actions = [a for a in self.action_list if a.ref_task.name == old_task.name]
+            logger.debug(f"updating {len(actions)} actions to point to new task")
+            for action in actions:
+                self.record_run(action.replace({"ref_task": new_task}))
+            self.delete_runs(actions)
+            replace_task = getattr(self.action_repo, "replace_task", None)
+            if replace_task is not None and replace_task(old_task, new_task):
+                logger.debug("pointing archived actions to new task")
+                self._changed(self.action_repo.undo_replace_task)
+
+            logger.debug("deleting old task")
+            # delete_task will raise DanglingActionsError if it cannot be deleted
+            try:
+                self.delete_task(old_task)
+            except DanglingActionsError:
+                logger.fatal(
+                    "error editing (replacing) task - could not move the old actions to the new task"
+                )
+                raise
 
         return new_task
 
@@ -471,16 +1064,60 @@ class MaintenanceTracker:
         new_action = old_action.replace(updated_fields)
 
         # Delete old action and add new one
-        self.delete_run(old_action)
-        result = self.record_run(new_action)
+        with self._savepoint():
+            self.delete_run(old_action)
+            result = self.record_run(new_action)
 
         if result in [ActionRecordResults.SUCCESS, ActionRecordResults.TASK_MISMATCH]:
             return new_action
 
         return None
 
+    def _merge_concurrent_changes(self) -> None:
+        """Applies the changes made here on top of the data files other processes
+        replaced since they were loaded (see repository.Persister).
+
+        Each file is merged on its own, so the merged actions are checked against the
+        merged tasks: if another process deleted or renamed the task of an action
+        recorded here (or the other way around), nothing is saved.
+
+        Raises:
+            ConcurrentModificationError: when merged actions refer to missing tasks
+        """
+        merged = False
+        for saver in (self.task_list_saver, self.action_list_saver):
+            merge = getattr(saver, "merge_if_changed", None)
+            if merge is not None:
+                merged = merge() or merged
+        if not merged:
+            return
+        names = {t.name for t in self.task_list}
+        orphans = sorted(
+            {a.ref_task.name for a in self.action_list if a.ref_task.name not in names}
+        )
+        if orphans:
+            raise ConcurrentModificationError(
+                f"task(s) {', '.join(repr(n) for n in orphans)} of recorded actions "
+                "were deleted or renamed by another process"
+            )
+
     def save(self) -> None:
-        if self.task_list_saver is not None:
-            self.task_list_saver.save()
-        if self.action_list_saver is not None:
-            self.action_list_saver.save()
+        """Writes the task and action lists. Inside a transaction, the write is
+        deferred until the outermost transaction ends."""
+        if self._transaction_depth:
+            self._save_requested = True
+            return
+        # one exclusive section, so other processes never read one file new and the
+        # other old
+        with data_lock(self.data_dir, exclusive=True):
+            self._merge_concurrent_changes()
+            if self.task_list_saver is not None:
+                self.task_list_saver.save()
+            if self.action_list_saver is not None:
+                self.action_list_saver.save()
+            # task replacements recorded for archived actions (see edit_task)
+            archive = getattr(self.action_repo, "archive", None)
+            if archive is not None:
+                archive.save()
+            if self.archive_after is not None:
+                self.archive(self.archive_after, ARCHIVE_MIN_ACTIONS)
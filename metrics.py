@@ -0,0 +1,154 @@
+"""Operation counters and latency histograms for the persistence layer.
+
+The repositories and persisters report to the current sink: counts (operations,
+bytes read and written, objects decoded) and latencies (load, save, get_for_task,
+get_by_time). The default sink drops everything. Installing an InMemorySink (the
+daemon does, and `mtnt stats` does for its own run) keeps them queryable in-process
+through snapshot().
+
+    metrics.set_sink(metrics.InMemorySink())
+    ...
+    metrics.get_sink().snapshot()
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+# upper bounds of the latency histogram buckets, in seconds (the last bucket is
+# everything slower)
+LATENCY_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+)
+
+
+class MetricsSink:
+    """Receives the metrics; this base sink ignores them"""
+
+    def count(self, name: str, value: int = 1) -> None:
+        pass
+
+    def observe(self, name: str, seconds: float) -> None:
+        pass
+
+    def snapshot(self) -> dict:
+        return {"counters": {}, "latencies": {}}
+
+
+class Histogram:
+    """Latency distribution over LATENCY_BUCKETS"""
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th fraction of the observations
+        (the max for the slowest bucket)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(LATENCY_BUCKETS, self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "max": self.max,
+            "buckets": list(self.buckets),
+        }
+
+
+class InMemorySink(MetricsSink):
+    """Keeps every counter and latency histogram in memory, safe to share between
+    threads"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counters: dict[str, int] = {}
+        self.latencies: dict[str, Histogram] = {}
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.latencies.get(name)
+            if histogram is None:
+                histogram = self.latencies[name] = Histogram()
+            histogram.observe(seconds)
+
+    def snapshot(self) -> dict:
+        """The counters, and a summary of each latency histogram, as plain data"""
+        with self._lock:
+            return {
+                "counters": dict(sorted(self.counters.items())),
+                "latencies": {
+                    name: histogram.summary()
+                    for name, histogram in sorted(self.latencies.items())
+                },
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.latencies.clear()
+
+
+NULL_SINK = MetricsSink()
+_sink: MetricsSink = NULL_SINK
+
+
+def get_sink() -> MetricsSink:
+    return _sink
+
+
+def set_sink(sink: MetricsSink | None) -> MetricsSink:
+    """Installs a sink (None for the no-op one), returns the previous sink"""
+    global _sink
+    previous, _sink = _sink, sink or NULL_SINK
+    return previous
+
+
+def count(name: str, value: int = 1) -> None:
+    _sink.count(name, value)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Observes the duration of the block in the name histogram"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _sink.observe(name, time.perf_counter() - start)
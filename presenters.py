@@ -1,21 +1,40 @@
-"""Presentation helpers for CLI output (tables, JSON, CSV, rich formatting).
+"""Presentation helpers for CLI output (tables, JSON, NDJSON, CSV, rich formatting).
 
 This module centralizes formatting so business logic and app code remain presentation-free.
+The JSON, NDJSON and CSV writers stream one record at a time from any iterable.
+
+Tables are drawn with rich on a terminal. When stdout is not a terminal, or the table
+has more than PLAIN_TABLE_ROW_THRESHOLD rows, a plain fixed-width renderer writes the
+rows as they are produced instead, since rich lays out the whole table in memory first.
 """
 
 from __future__ import annotations
 
 import csv
+import itertools
 import json
 import sys
-from typing import Optional
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+    TextIO,
+)
 
 from rich.table import Table
 from rich.console import Console
 
+import profiling
 import utils
 from core import *
 
+if TYPE_CHECKING:
+    from footprint import Footprint
+
 
 def _rich_task(t: Task) -> str:
     ret_str = f"Task: [bold]{t.name}[/bold]\n"
@@ -26,62 +45,433 @@ def _rich_task(t: Task) -> str:
     return ret_str
 
 
-def _print_task_list_table(task_list: TaskLister, title: str = "Task List") -> None:
-    table = Table(title=title)
+PLAIN_TABLE_ROW_THRESHOLD = 1000  # above this many rows, tables are always plain
+WIDTH_SAMPLE_ROWS = 200  # rows used to size the columns of a plain table
+COLUMN_SEPARATOR = "  "
 
-    table.add_column("Name", justify="left", no_wrap=True)
-    table.add_column("Description")
-    table.add_column("Start Time", justify="right", style="green")
-    table.add_column("Interval", justify="right", style="green")
+_console: Console | None = None
 
-    for t in task_list:
-        table.add_row(
-            t.name,
-            t.description,
-            utils.human_date_str(t.start_time),
-            utils.human_interval_str(t.interval),
+
+def _get_console() -> Console:
+    """Returns the console shared by every rich table (it writes to the current sys.stdout)."""
+    global _console
+    if _console is None:
+        _console = Console()
+    return _console
+
+
+def _use_plain_table(rows: Iterable, out: TextIO) -> bool:
+    """Plain tables for pipes and files, and for tables too large for rich to lay out quickly."""
+    isatty = getattr(out, "isatty", None)
+    if isatty is None or not isatty():
+        return True
+    try:
+        return len(rows) > PLAIN_TABLE_ROW_THRESHOLD  # type: ignore[arg-type]
+    except TypeError:  # an iterator, we can't tell how big it is
+        return True
+
+
+def _write_plain_table(
+    title: str,
+    headers: Sequence[str],
+    right_aligned: Sequence[bool],
+    rows: Iterable[Sequence[str]],
+    out: TextIO,
+) -> None:
+    """Writes a fixed-width table one row at a time.
+
+    Column widths are computed from the headers and the first WIDTH_SAMPLE_ROWS rows;
+    longer cells further down are written in full and push the rest of their row right.
+    """
+    rows = iter(rows)
+    sample = list(itertools.islice(rows, WIDTH_SAMPLE_ROWS))
+    widths = [len(h) for h in headers]
+    for row in sample:
+        for i, cell in enumerate(row):
+            widths[i] = max(widths[i], len(cell))
+
+    def format_row(row: Sequence[str]) -> str:
+        cells = (
+            cell.rjust(width) if right else cell.ljust(width)
+            for cell, width, right in zip(row, widths, right_aligned)
         )
+        return COLUMN_SEPARATOR.join(cells).rstrip() + "\n"
 
-    console = Console()
-    console.print(table)
+    out.write(title + "\n")
+    out.write(format_row(headers))
+    out.write(COLUMN_SEPARATOR.join("-" * w for w in widths) + "\n")
+    for row in itertools.chain(sample, rows):
+        out.write(format_row(row))
 
 
-def _print_action_list_table(action_list: ActionLister) -> None:
-    table = Table(title="Action List")
+def _print_table(
+    title: str,
+    columns: Sequence[tuple[str, dict]],
+    rows: Iterable,
+    row_cells: Callable[[Any, utils.HumanDateRenderer], Sequence[str]],
+) -> None:
+    """Prints rows as a rich table on a terminal, or as a plain table otherwise.
 
-    table.add_column("Task", justify="left", no_wrap=True)
-    table.add_column("Actor", justify="left", style="blue")
-    table.add_column("Timestamp", justify="right", style="green")
-    table.add_column("Action Name")
+    Args:
+        title (str): table title
+        columns (Sequence[tuple[str, dict]]): column headers, each with its rich
+            add_column keyword arguments
+        rows (Iterable): the objects to show, one per row
+        row_cells (Callable): turns one object into the cell strings of its row, given
+            the date renderer shared by the whole table
+    """
+    with profiling.span("render"):
+        _render_table(title, columns, rows, row_cells)
 
-    for a in action_list:
-        table.add_row(
-            a.ref_task.name,
-            a.actor,
-            utils.human_date_str(a.timestamp),
-            a.name,
+
+def _render_table(
+    title: str,
+    columns: Sequence[tuple[str, dict]],
+    rows: Iterable,
+    row_cells: Callable[[Any, utils.HumanDateRenderer], Sequence[str]],
+) -> None:
+    out = sys.stdout
+    dates = utils.HumanDateRenderer()
+    if _use_plain_table(rows, out):
+        _write_plain_table(
+            title,
+            [header for header, _ in columns],
+            [options.get("justify") == "right" for _, options in columns],
+            (row_cells(row, dates) for row in rows),
+            out,
         )
+        return
+
+    table = Table(title=title)
+    for header, options in columns:
+        table.add_column(header, **options)
+    for row in rows:
+        table.add_row(*row_cells(row, dates))
+    _get_console().print(table)
+
+
+_TASK_COLUMNS = (
+    ("Name", {"justify": "left", "no_wrap": True}),
+    ("Description", {}),
+    ("Start Time", {"justify": "right", "style": "green"}),
+    ("Interval", {"justify": "right", "style": "green"}),
+)
+_ACTION_COLUMNS = (
+    ("Task", {"justify": "left", "no_wrap": True}),
+    ("Actor", {"justify": "left", "style": "blue"}),
+    ("Timestamp", {"justify": "right", "style": "green"}),
+    ("Action Name", {}),
+)
+_NEXT_RUN_COLUMNS = (
+    ("Task", {"justify": "left", "no_wrap": True}),
+    ("Next Run", {"justify": "right", "style": "green"}),
+)
+
+_OVERDUE_COLUMNS = (
+    ("Task", {"justify": "left", "no_wrap": True}),
+    ("Due Since", {"justify": "right", "style": "red"}),
+    ("Late By", {"justify": "right", "style": "red"}),
+    ("Missed Runs", {"justify": "right"}),
+)
+_COMPLIANCE_COLUMNS = (
+    ("Task", {"justify": "left", "no_wrap": True}),
+    ("Due", {"justify": "right"}),
+    ("On Time", {"justify": "right", "style": "green"}),
+    ("Late", {"justify": "right", "style": "yellow"}),
+    ("Missed", {"justify": "right", "style": "red"}),
+    ("On-time Rate", {"justify": "right"}),
+    ("Mean Lateness", {"justify": "right"}),
+    ("P95 Lateness", {"justify": "right"}),
+)
+_OVERDUE_HISTORY_COLUMNS = (
+    ("At", {"justify": "right", "style": "green"}),
+    ("Overdue", {"justify": "right", "style": "red"}),
+    ("Tasks", {}),
+)
+_ACTIVITY_PERIOD_COLUMN = ("Period", {"justify": "left", "style": "green"})
+_ACTIVITY_ACTOR_COLUMN = ("Actor", {"justify": "left"})
+_ACTIVITY_TASK_COLUMN = ("Task", {"justify": "left", "no_wrap": True})
+_ACTIVITY_COUNT_COLUMN = ("Actions", {"justify": "right"})
+_STATS_COUNTER_COLUMNS = (
+    ("Metric", {"justify": "left", "no_wrap": True}),
+    ("Value", {"justify": "right"}),
+)
+_STATS_LATENCY_COLUMNS = (
+    ("Operation", {"justify": "left", "no_wrap": True}),
+    ("Calls", {"justify": "right"}),
+    ("Mean", {"justify": "right"}),
+    ("P50", {"justify": "right"}),
+    ("P95", {"justify": "right"}),
+    ("Max", {"justify": "right"}),
+    ("Total", {"justify": "right", "style": "green"}),
+)
+_STATS_FIELDS = [
+    "metric",
+    "type",
+    "value",
+    "count",
+    "total",
+    "mean",
+    "p50",
+    "p95",
+    "max",
+]
+_FOOTPRINT_COLUMNS = (
+    ("Measure", {"justify": "left"}),
+    ("Value", {"justify": "right"}),
+)
+_ALLOCATION_COLUMNS = (
+    ("Line", {"justify": "left", "no_wrap": True}),
+    ("Size", {"justify": "right", "style": "green"}),
+    ("Blocks", {"justify": "right"}),
+)
+_AGENDA_COLUMNS = (
+    ("Due", {"justify": "right", "style": "green"}),
+    ("Task", {"justify": "left", "no_wrap": True}),
+    ("When", {"justify": "right"}),
+)
+
+
+def _task_row(t: Task, dates: utils.HumanDateRenderer) -> list[str]:
+    return [
+        t.name,
+        t.description,
+        dates(t.start_time),
+        utils.human_interval_str(t.interval),
+    ]
+
+
+def _action_row(a: Action, dates: utils.HumanDateRenderer) -> list[str]:
+    return [a.ref_task.name, a.actor, dates(a.timestamp), a.name]
+
+
+def _next_run_row(
+    run: tuple[Task, datetime], dates: utils.HumanDateRenderer
+) -> list[str]:
+    return [run[0].name, dates(run[1])]
+
+
+def _overdue_row(o: OverdueStatus, dates: utils.HumanDateRenderer) -> list[str]:
+    return [
+        o.task.name,
+        dates(o.first_missed),
+        utils.human_interval_str(o.lateness),
+        str(o.missed_runs),
+    ]
+
+
+def _compliance_row(c: ComplianceStats, dates: utils.HumanDateRenderer) -> list[str]:
+    rate = c.on_time_rate
+    return [
+        c.task.name,
+        str(c.due),
+        str(c.on_time),
+        str(c.late),
+        str(c.missed),
+        f"{rate:.0%}" if rate is not None else "-",
+        _lateness_str(c.mean_lateness),
+        _lateness_str(c.p95_lateness),
+    ]
+
+
+def _lateness_str(lateness: timedelta | None) -> str:
+    return "-" if lateness is None else utils.human_interval_str(lateness)
+
+
+def _overdue_history_row(
+    entry: tuple[datetime, TaskLister], dates: utils.HumanDateRenderer
+) -> list[str]:
+    at, tasks = entry
+    return [
+        at.strftime("%Y-%m-%d %H:%M %Z").rstrip(),
+        str(len(tasks)),
+        ", ".join(t.name for t in tasks),
+    ]
+
+
+def _activity_columns(by_actor: bool, by_task: bool) -> tuple:
+    return (
+        (_ACTIVITY_PERIOD_COLUMN,)
+        + ((_ACTIVITY_ACTOR_COLUMN,) if by_actor else ())
+        + ((_ACTIVITY_TASK_COLUMN,) if by_task else ())
+        + (_ACTIVITY_COUNT_COLUMN,)
+    )
+
+
+def _activity_cells(c: ActivityCount, by_actor: bool, by_task: bool) -> list:
+    return (
+        [c.label]
+        + ([c.actor] if by_actor else [])
+        + ([c.task] if by_task else [])
+        + [c.count]
+    )
+
+
+def _ms_str(seconds: float) -> str:
+    return f"{seconds * 1000:.2f} ms"
+
+
+def _latency_row(entry: tuple[str, dict], dates: utils.HumanDateRenderer) -> list[str]:
+    name, latency = entry
+    return [name, str(latency["count"])] + [
+        _ms_str(latency[key]) for key in ("mean", "p50", "p95", "max", "total")
+    ]
+
+
+def _bytes_str(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def _agenda_row(
+    occurrence: tuple[Task, datetime], dates: utils.HumanDateRenderer
+) -> list[str]:
+    task, due = occurrence
+    return [due.strftime("%Y-%m-%d %H:%M %Z").rstrip(), task.name, dates(due)]
+
+
+def _print_task_list_table(task_list: Iterable[Task], title: str = "Task List") -> None:
+    _print_table(title, _TASK_COLUMNS, task_list, _task_row)
+
+
+def _print_action_list_table(
+    action_list: Iterable[Action], title: str = "Action List"
+) -> None:
+    _print_table(title, _ACTION_COLUMNS, action_list, _action_row)
+
+
+def _print_next_runs_table(
+    next_runs: Iterable[tuple[Task, datetime]], title: str = "Next Scheduled Tasks"
+) -> None:
+    _print_table(title, _NEXT_RUN_COLUMNS, next_runs, _next_run_row)
+
+
+def _print_overdue_ranking_table(
+    ranking: Iterable[OverdueStatus], title: str = "Most Overdue Tasks"
+) -> None:
+    _print_table(title, _OVERDUE_COLUMNS, ranking, _overdue_row)
+
+
+def _print_compliance_table(
+    stats: Iterable[ComplianceStats], title: str = "Compliance"
+) -> None:
+    _print_table(title, _COMPLIANCE_COLUMNS, stats, _compliance_row)
 
-    console = Console()
-    console.print(table)
 
+def _print_overdue_history_table(
+    history: Iterable[tuple[datetime, TaskLister]], title: str = "Overdue History"
+) -> None:
+    _print_table(title, _OVERDUE_HISTORY_COLUMNS, history, _overdue_history_row)
 
-def _output_task_list_json(task_list: TaskLister) -> None:
+
+def _print_activity_table(
+    counts: Iterable[ActivityCount],
+    by_actor: bool = False,
+    by_task: bool = False,
+    title: str = "Activity",
+) -> None:
+    _print_table(
+        title,
+        _activity_columns(by_actor, by_task),
+        counts,
+        lambda c, dates: [str(cell) for cell in _activity_cells(c, by_actor, by_task)],
+    )
+
+
+def _print_stats_tables(stats: dict) -> None:
+    """Prints the counters, then the latencies slowest (by total time) first"""
+    _print_table(
+        "Counters",
+        _STATS_COUNTER_COLUMNS,
+        stats["counters"].items(),
+        lambda c, dates: [c[0], str(c[1])],
+    )
+    latencies = sorted(
+        stats["latencies"].items(), key=lambda entry: entry[1]["total"], reverse=True
+    )
+    _print_table("Latencies", _STATS_LATENCY_COLUMNS, latencies, _latency_row)
+
+
+def _print_footprint_tables(footprint: Footprint) -> None:
+    """Prints the memory per object, then the lines that allocated the most of it"""
+    measures = [
+        ("tasks", str(footprint.tasks)),
+        ("actions", str(footprint.actions)),
+        ("bytes per task", f"{footprint.bytes_per_task:.0f}"),
+        ("bytes per action", f"{footprint.bytes_per_action:.0f}"),
+        ("tasks total", _bytes_str(footprint.task_bytes)),
+        ("actions total", _bytes_str(footprint.action_bytes)),
+        ("peak while loading", _bytes_str(footprint.peak_bytes)),
+    ]
+    _print_table("Memory", _FOOTPRINT_COLUMNS, measures, lambda m, dates: list(m))
+    _print_table(
+        "Top Allocations",
+        _ALLOCATION_COLUMNS,
+        footprint.top,
+        lambda t, dates: [t[0], _bytes_str(t[1]), str(t[2])],
+    )
+
+
+def _print_agenda_table(
+    agenda: Iterable[tuple[Task, datetime]], title: str = "Agenda"
+) -> None:
+    _print_table(title, _AGENDA_COLUMNS, agenda, _agenda_row)
+
+
+def _task_record(t: Task) -> dict:
+    return {
+        "name": t.name,
+        "description": t.description,
+        "start_time": t.start_time.isoformat() if t.start_time else None,
+        "interval": str(t.interval) if t.interval else None,
+    }
+
+
+def _action_record(a: Action) -> dict:
+    return {
+        "task": a.ref_task.name,
+        "actor": a.actor,
+        "timestamp": a.timestamp.isoformat() if a.timestamp else None,
+        "action_name": a.name,
+    }
+
+
+def _write_json_array(records: Iterable[dict], out: TextIO) -> None:
+    """Writes records as an indented JSON array, one record at a time.
+
+    The output is the same as json.dumps(list(records), indent=2), without ever
+    holding the whole list or string in memory.
+    """
+    with profiling.span("render"):
+        empty = True
+        for record in records:
+            out.write("[\n  " if empty else ",\n  ")
+            out.write(json.dumps(record, indent=2).replace("\n", "\n  "))
+            empty = False
+        out.write("[]\n" if empty else "\n]\n")
+
+
+def _write_ndjson(records: Iterable[dict], out: TextIO) -> None:
+    """Writes records as newline-delimited JSON, one compact object per line."""
+    with profiling.span("render"):
+        for record in records:
+            out.write(json.dumps(record) + "\n")
+
+
+def _output_task_list_json(task_list: Iterable[Task]) -> None:
     """Output task list in JSON format"""
-    tasks_data = []
-    for t in task_list:
-        tasks_data.append(
-            {
-                "name": t.name,
-                "description": t.description,
-                "start_time": t.start_time.isoformat() if t.start_time else None,
-                "interval": str(t.interval) if t.interval else None,
-            }
-        )
-    sys.stdout.write(json.dumps(tasks_data, indent=2) + "\n")
+    _write_json_array(map(_task_record, task_list), sys.stdout)
+
 
+def _output_task_list_ndjson(task_list: Iterable[Task]) -> None:
+    """Output task list as newline-delimited JSON"""
+    _write_ndjson(map(_task_record, task_list), sys.stdout)
 
-def _output_task_list_csv(task_list: TaskLister) -> None:
+
+def _output_task_list_csv(task_list: Iterable[Task]) -> None:
     """Output task list in CSV format"""
     writer = csv.writer(sys.stdout)
     writer.writerow(["Name", "Description", "Start Time", "Interval"])
@@ -96,22 +486,17 @@ def _output_task_list_csv(task_list: TaskLister) -> None:
         )
 
 
-def _output_action_list_json(action_list: ActionLister) -> None:
+def _output_action_list_json(action_list: Iterable[Action]) -> None:
     """Output action list in JSON format"""
-    actions_data = []
-    for a in action_list:
-        actions_data.append(
-            {
-                "task": a.ref_task.name,
-                "actor": a.actor,
-                "timestamp": a.timestamp.isoformat() if a.timestamp else None,
-                "action_name": a.name,
-            }
-        )
-    sys.stdout.write(json.dumps(actions_data, indent=2) + "\n")
+    _write_json_array(map(_action_record, action_list), sys.stdout)
 
 
-def _output_action_list_csv(action_list: ActionLister) -> None:
+def _output_action_list_ndjson(action_list: Iterable[Action]) -> None:
+    """Output action list as newline-delimited JSON"""
+    _write_ndjson(map(_action_record, action_list), sys.stdout)
+
+
+def _output_action_list_csv(action_list: Iterable[Action]) -> None:
     """Output action list in CSV format"""
     writer = csv.writer(sys.stdout)
     writer.writerow(["Task", "Actor", "Timestamp", "Action Name"])
@@ -124,3 +509,115 @@ def _output_action_list_csv(action_list: ActionLister) -> None:
                 a.name,
             ]
         )
+
+
+def _overdue_history_record(entry: tuple[datetime, TaskLister]) -> dict:
+    at, tasks = entry
+    return {
+        "at": at.isoformat(),
+        "overdue": len(tasks),
+        "tasks": [t.name for t in tasks],
+    }
+
+
+def _output_overdue_history_json(
+    history: Iterable[tuple[datetime, TaskLister]],
+) -> None:
+    """Output overdue history in JSON format"""
+    _write_json_array(map(_overdue_history_record, history), sys.stdout)
+
+
+def _output_overdue_history_ndjson(
+    history: Iterable[tuple[datetime, TaskLister]],
+) -> None:
+    """Output overdue history as newline-delimited JSON"""
+    _write_ndjson(map(_overdue_history_record, history), sys.stdout)
+
+
+def _output_overdue_history_csv(history: Iterable[tuple[datetime, TaskLister]]) -> None:
+    """Output overdue history in CSV format, task names separated by ';'"""
+    writer = csv.writer(sys.stdout)
+    writer.writerow(["At", "Overdue", "Tasks"])
+    for at, tasks in history:
+        writer.writerow([at.isoformat(), len(tasks), ";".join(t.name for t in tasks)])
+
+
+def _activity_record(c: ActivityCount) -> dict:
+    record: dict = {"period": c.label, "start": c.start.isoformat()}
+    if c.actor is not None:
+        record["actor"] = c.actor
+    if c.task is not None:
+        record["task"] = c.task
+    record["count"] = c.count
+    return record
+
+
+def _output_activity_json(counts: Iterable[ActivityCount]) -> None:
+    """Output activity counts in JSON format"""
+    _write_json_array(map(_activity_record, counts), sys.stdout)
+
+
+def _output_activity_ndjson(counts: Iterable[ActivityCount]) -> None:
+    """Output activity counts as newline-delimited JSON"""
+    _write_ndjson(map(_activity_record, counts), sys.stdout)
+
+
+def _output_activity_csv(
+    counts: Iterable[ActivityCount], by_actor: bool = False, by_task: bool = False
+) -> None:
+    """Output activity counts in CSV format"""
+    writer = csv.writer(sys.stdout)
+    writer.writerow([name for name, _ in _activity_columns(by_actor, by_task)])
+    for c in counts:
+        writer.writerow(_activity_cells(c, by_actor, by_task))
+
+
+def _stats_records(stats: dict) -> Iterator[dict]:
+    """One record per counter and per latency, latencies in seconds"""
+    for name, value in stats["counters"].items():
+        yield {"metric": name, "type": "counter", "value": value}
+    for name, latency in stats["latencies"].items():
+        yield {
+            "metric": name,
+            "type": "latency",
+            **{key: latency[key] for key in _STATS_FIELDS[3:]},
+        }
+
+
+def _output_stats_json(stats: dict) -> None:
+    """Output the metrics snapshot in JSON format, latencies in seconds"""
+    with profiling.span("render"):
+        json.dump(stats, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+
+def _output_stats_ndjson(stats: dict) -> None:
+    """Output the metrics as newline-delimited JSON, one record per metric"""
+    _write_ndjson(_stats_records(stats), sys.stdout)
+
+
+def _output_stats_csv(stats: dict) -> None:
+    """Output the metrics in CSV format, one row per metric"""
+    writer = csv.DictWriter(sys.stdout, fieldnames=_STATS_FIELDS)
+    writer.writeheader()
+    writer.writerows(_stats_records(stats))
+
+
+def _output_footprint_json(footprint: Footprint) -> None:
+    """Output the memory footprint in JSON format, sizes in bytes"""
+    record = {
+        "tasks": footprint.tasks,
+        "actions": footprint.actions,
+        "bytes_per_task": footprint.bytes_per_task,
+        "bytes_per_action": footprint.bytes_per_action,
+        "task_bytes": footprint.task_bytes,
+        "action_bytes": footprint.action_bytes,
+        "peak_bytes": footprint.peak_bytes,
+        "top": [
+            {"line": line, "size": size, "count": count}
+            for line, size, count in footprint.top
+        ],
+    }
+    with profiling.span("render"):
+        json.dump(record, sys.stdout, indent=2)
+        sys.stdout.write("\n")
@@ -0,0 +1,104 @@
+"""Per-phase timing of one mtnt invocation (mtnt --profile).
+
+Code marks its phases with `with profiling.span("name"):`. Spans can nest, and each
+phase is charged only its own time: a span's time minus the time of the spans inside
+it. When profiling is not enabled, span() returns a shared no-op context manager, so
+the marks cost next to nothing.
+
+The breakdown is printed to stderr once the command ends. Optionally, the whole
+command is also run under cProfile and its stats dumped to a .prof file (for
+`python -m pstats` or snakeviz).
+"""
+
+from __future__ import annotations
+
+import cProfile
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from typing import ContextManager, Iterator, TextIO
+
+_NO_SPAN = nullcontext()
+
+
+class Profiler:
+    """Accumulates the time spent in named phases since start"""
+
+    def __init__(self, start: float | None = None):
+        self.start = time.perf_counter() if start is None else start
+        # name -> [own seconds, calls], in the order the phases first ended
+        self.phases: dict[str, list] = {}
+        # open spans: [name, start, seconds spent in nested spans]
+        self._stack: list[list] = []
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        frame = [name, time.perf_counter(), 0.0]
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - frame[1]
+            self.record(name, elapsed - frame[2])
+            if self._stack:
+                self._stack[-1][2] += elapsed
+
+    def record(self, name: str, seconds: float) -> None:
+        """Charges seconds to a phase, as one more call"""
+        phase = self.phases.setdefault(name, [0.0, 0])
+        phase[0] += seconds
+        phase[1] += 1
+
+    def report(self, out: TextIO = sys.stderr) -> None:
+        """Prints the time of each phase, and the time not covered by any of them"""
+        total = time.perf_counter() - self.start
+        rows = [
+            (name, seconds, calls) for name, (seconds, calls) in self.phases.items()
+        ]
+        rows.append(("other", total - sum(seconds for _, seconds, _ in rows), 1))
+        width = max(len(name) for name, _, _ in rows + [("total", 0, 0)])
+
+        out.write(f"{'phase':<{width}}  {'time':>10}  {'share':>6}  calls\n")
+        for name, seconds, calls in rows:
+            share = seconds / total if total > 0 else 0
+            out.write(
+                f"{name:<{width}}  {seconds * 1000:>7.1f} ms  {share:>6.1%}  {calls}\n"
+            )
+        out.write(f"{'total':<{width}}  {total * 1000:>7.1f} ms\n")
+
+
+_profiler: Profiler | None = None
+
+
+def enable(start: float | None = None) -> Profiler:
+    """Starts recording spans; start is when the invocation began (defaults to now)"""
+    global _profiler
+    _profiler = Profiler(start)
+    return _profiler
+
+
+def disable() -> Profiler | None:
+    """Stops recording spans, and returns the profiler that recorded them"""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    return profiler
+
+
+def span(name: str) -> ContextManager[None]:
+    """Marks a phase, when profiling is enabled"""
+    if _profiler is None:
+        return _NO_SPAN
+    return _profiler.span(name)
+
+
+@contextmanager
+def cprofile_to(path: str) -> Iterator[cProfile.Profile]:
+    """Runs the block under cProfile and dumps the stats to path"""
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
@@ -0,0 +1,130 @@
+"""On-disk cache of report results, kept next to the data files.
+
+Reports such as the dashboard, `report overdue` and `report next` are re-run very
+often (shell prompts, status bars) while the data rarely changes. Their results are
+stored in REPORT_CACHE_FILE, keyed by report name, parameters and time bucket, together
+with the (mtime, size) fingerprint of the data files they were computed from. A cached
+result is only returned while the data files still have that fingerprint, and
+Persister.save deletes the cache file whenever it writes a data file.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from datetime import datetime, UTC
+from pathlib import Path
+from typing import Any, Iterable
+
+import result_json
+from repository import (
+    ARCHIVE_DIR,
+    ARCHIVE_MANIFEST,
+    DEFAULT_ACTION_LIST_FILE,
+    DEFAULT_TASK_LIST_FILE,
+    JOURNAL_SUFFIX,
+    REPORT_CACHE_FILE,
+    _write_atomic,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES = 64  # results kept per fingerprint, oldest are dropped first
+
+MISS = object()  # returned by ReportCache.get when there is no usable result
+
+
+def files_fingerprint(paths: Iterable[str | Path | None]) -> tuple:
+    """(mtime, size) of each file, or None for files that don't exist"""
+    fingerprint = []
+    for path in paths:
+        try:
+            stat = os.stat(path)  # type: ignore[arg-type]
+            fingerprint.append((stat.st_mtime_ns, stat.st_size))
+        except (TypeError, OSError):
+            fingerprint.append(None)
+    return tuple(fingerprint)
+
+
+def time_bucket(at: datetime | None) -> str:
+    """The time a report is computed for, as used in cache keys.
+
+    Reports for "now" are cached per UTC minute. Run timestamps recorded without an
+    explicit time are not rounded, so a task can become due within the minute: a
+    cached "now" report can be up to one minute stale (writing the data files still
+    invalidates it at once). Reports for an explicit time are cached for that exact
+    time.
+    """
+    if at is None:
+        return "now@" + datetime.now(UTC).strftime("%Y-%m-%dT%H:%M")
+    return at.isoformat()
+
+
+class ReportCache:
+    """Report results cached in a data directory"""
+
+    def __init__(
+        self,
+        data_dir: str | Path,
+        task_file: str | None = None,
+        action_file: str | None = None,
+    ):
+        data_dir = Path(data_dir)
+        self.path = data_dir / REPORT_CACHE_FILE
+        action_path = data_dir / (action_file or DEFAULT_ACTION_LIST_FILE)
+        self.data_files = (
+            data_dir / (task_file or DEFAULT_TASK_LIST_FILE),
+            action_path,
+            action_path.with_suffix(JOURNAL_SUFFIX),
+            data_dir / ARCHIVE_DIR / ARCHIVE_MANIFEST,
+        )
+
+    def fingerprint(self) -> list:
+        # lists, to compare equal to the fingerprint read back from JSON
+        return [list(f) if f else None for f in files_fingerprint(self.data_files)]
+
+    def key(self, report: str, at: datetime | None, **params: Any) -> str:
+        return json.dumps(
+            [report, time_bucket(at), params], sort_keys=True, default=str
+        )
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"ignoring unreadable report cache {self.path}: {e}")
+            return {}
+
+    def get(self, key: str, fingerprint: list) -> Any:
+        """Returns the cached result for key, or MISS"""
+        cached = self._read()
+        entries = cached.get("entries", {})
+        if cached.get("fingerprint") != fingerprint or key not in entries:
+            return MISS
+        logger.debug(f"report cache hit for {key}")
+        return result_json.loads(entries[key])
+
+    def put(self, key: str, fingerprint: list, result: Any) -> None:
+        """Stores a result computed from the data files with the given fingerprint"""
+        if self.fingerprint() != fingerprint:
+            # the data changed while the report was computed
+            return
+        cached = self._read()
+        entries = {}
+        if cached.get("fingerprint") == fingerprint:
+            entries = cached.get("entries", {})
+        entries.pop(key, None)
+        entries[key] = result_json.dumps(result)
+        while len(entries) > MAX_ENTRIES:
+            del entries[next(iter(entries))]
+
+        text = json.dumps({"fingerprint": fingerprint, "entries": entries})
+        try:
+            # each process writes its own temporary file, the last rename wins
+            _write_atomic(self.path, text.encode("utf8"))
+        except OSError as e:
+            logger.warning(f"could not write report cache {self.path}: {e}")
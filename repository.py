@@ -5,22 +5,60 @@ This module centralizes JSON encoding/decoding and file I/O so domain models rem
 
 from __future__ import annotations
 
+import gzip
+import itertools
 import json
 import logging
-from datetime import datetime, timedelta, timezone
+import lzma
+import os
+import shutil
+import threading
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta, timezone
 from pathlib import Path
-from dataclasses import asdict, is_dataclass
-from typing import Any, Optional
+from dataclasses import asdict, dataclass, field, is_dataclass, replace
+from typing import Any, Callable, Iterable, Iterator, Optional
 from abc import ABC, abstractmethod
 
 import core
-from errors import DuplicateTaskError
+import metrics
+import profiling
+from errors import ArchivedActionError, ConcurrentModificationError, DuplicateTaskError
+
+try:
+    import fcntl
+except ImportError:  # eg: Windows, saves stay atomic but writers are not serialized
+    fcntl = None
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_SAVE_DIR = "./data"
 DEFAULT_ACTION_LIST_FILE = "action_list.json"
 DEFAULT_TASK_LIST_FILE = "task_list.json"
+# report results derived from the data files, see report_cache.py
+REPORT_CACHE_FILE = "report_cache.json"
+# advisory lock serializing the processes that read and write a data folder
+LOCK_FILE = "mtnt.lock"
+# changes appended to a data file since it was last written whole, see Persister
+JOURNAL_SUFFIX = ".journal"
+# the journal is folded into its data file once it has more entries than this, or
+# than this fraction of the items, whichever is more
+JOURNAL_MIN_ENTRIES = 1000
+JOURNAL_MAX_RATIO = 0.5
+# old actions moved out of the action file, see ActionArchive
+ARCHIVE_DIR = "archive"
+ARCHIVE_MANIFEST = "manifest.json"
+# compression of the archive segments: (file suffix, compress, decompress)
+ARCHIVE_COMPRESSIONS: dict[str, tuple[str, Callable, Callable]] = {
+    "gzip": (".json.gz", gzip.compress, gzip.decompress),
+    "lzma": (".json.xz", lzma.compress, lzma.decompress),
+}
+DEFAULT_ARCHIVE_COMPRESSION = "gzip"
+# the retention policy (archive_after) waits until this many actions are due, so
+# that it writes a few large segments rather than one per save
+ARCHIVE_MIN_ACTIONS = 1000
 
 
 class MtnTrackerJSONEncoder(json.JSONEncoder):
@@ -57,11 +95,29 @@ class MtnTrackerJSONEncoder(json.JSONEncoder):
             return json.JSONEncoder.default(self, o)
 
 
+# timezones are immutable, so every datetime with the same offset can share one
+_TIMEZONES: dict[timedelta, timezone] = {timedelta(0): timezone.utc}
+
+
+def _timezone(offset: timedelta) -> timezone:
+    tz = _TIMEZONES.get(offset)
+    if tz is None:
+        tz = _TIMEZONES[offset] = timezone(offset)
+    return tz
+
+
 class MtnTrackerJSONDecoder(json.JSONDecoder):
-    """Decodes objects serialized by MtnTrackerJSONEncoder back into python objects."""
+    """Decodes objects serialized by MtnTrackerJSONEncoder back into python objects.
+
+    Every action file entry embeds a full copy of its task. Equal tasks, and equal
+    action names, descriptions and actors, are shared within one decoded document
+    instead of being kept once per action (all of them are immutable).
+    """
 
     def __init__(self):
         json.JSONDecoder.__init__(self, object_hook=self.dict_to_object)
+        self._tasks: dict[core.Task, core.Task] = {}
+        self._strings: dict[str, str] = {}
 
     def dict_to_object(self, d: dict) -> Any:
         if "__type__" not in d:
@@ -77,7 +133,7 @@ class MtnTrackerJSONDecoder(json.JSONDecoder):
                 minute=d["minute"],
                 second=d["second"],
                 microsecond=d["microsecond"],
-                tzinfo=timezone(d["utcoffset"]),
+                tzinfo=_timezone(d["utcoffset"]),
             )
         elif type_name == "timedelta":
             return timedelta(**d)
@@ -85,43 +141,407 @@ class MtnTrackerJSONDecoder(json.JSONDecoder):
             return core.Task(**d)
         elif type_name == "Action":
             if "ref_task" in d and isinstance(d["ref_task"], dict):
-                d["ref_task"] = core.Task(**d["ref_task"])
+                task = core.Task(**d["ref_task"])
+                d["ref_task"] = self._tasks.setdefault(task, task)
+            for field in ("name", "description", "actor"):
+                if field in d:
+                    d[field] = self._strings.setdefault(d[field], d[field])
             return core.Action(**d)
         else:
             d["__type__"] = type_name
             return d
 
 
+def _fsync_dir(path: Path) -> None:
+    """Flushes a directory entry change (a rename) to disk, where the OS allows it"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:  # eg: directories cannot be opened on Windows
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+# folder -> [open lock file, depth, exclusive], for the locks held by this process
+_held_locks: dict[Path, list] = {}
+_held_locks_guard = threading.RLock()
+
+
+@contextmanager
+def data_lock(dirname: str | Path, exclusive: bool = False) -> Iterator[None]:
+    """Holds the advisory lock of a data folder: shared to read the data files,
+    exclusive to write them.
+
+    The lock is reentrant within a process, and taking it exclusive inside a shared
+    one upgrades it until the exclusive block ends. Threads of one process take turns.
+    Without fcntl (eg: on Windows), or while the folder does not exist yet, nothing
+    is locked.
+    """
+    path = Path(dirname).resolve()
+    if fcntl is None or not path.is_dir():
+        yield
+        return
+    with _held_locks_guard:
+        held = _held_locks.get(path)
+        if held is None:
+            held = _held_locks[path] = [open(path / LOCK_FILE, "a+b"), 0, False]
+        lock_file, depth, held_exclusive = held
+        upgrade = exclusive and not held_exclusive
+        if depth == 0 or upgrade:
+            with profiling.span("lock wait"), metrics.timed("lock.wait"):
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            held[2] = exclusive
+        held[1] += 1
+        try:
+            yield
+        finally:
+            held[1] -= 1
+            if held[1] == 0:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
+                del _held_locks[path]
+            elif upgrade:
+                fcntl.flock(lock_file, fcntl.LOCK_SH)
+                held[2] = False
+
+
+def _write_atomic(
+    path: Path, raw: bytes, before_replace: Callable[[Path], None] | None = None
+) -> None:
+    """Replaces the file at path with raw in one step.
+
+    raw is written to a temporary file in the same folder and flushed to disk, then
+    renamed over the file (before_replace is called with the temporary path just
+    before). A crash or Ctrl-C at any point leaves either the previous file or the
+    new one, never a truncated one, and readers opening the file meanwhile still
+    read the previous version whole.
+    """
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        with open(fd, "wb") as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        if before_replace is not None:
+            before_replace(temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    _fsync_dir(path.parent)
+
+
+def _stat_version(path: Path) -> tuple | None:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _snapshot_id(raw: bytes) -> dict:
+    """Identifies the data file a journal applies to"""
+    return {"snapshot_size": len(raw), "snapshot_crc32": zlib.crc32(raw)}
+
+
+def _without(items: Iterable, removed: Counter) -> list:
+    """items without removed (a count of equal items to drop, earliest first)"""
+    kept = []
+    for item in items:
+        if removed[item] > 0:
+            removed[item] -= 1
+        else:
+            kept.append(item)
+    return kept
+
+
 class Persister:
+    """Reads and writes one data file.
+
+    The file version (inode, modification time, size) and the items are remembered
+    when the file is loaded or saved. If another process replaced the file since,
+    save() applies the changes made here (items added and removed since) on top of
+    the new version instead of overwriting it, under the exclusive lock.
+
+    With journal on, save() appends those changes to <file>.journal, one JSON line
+    per item added or removed (a tombstone), instead of rewriting the whole file.
+    Loading replays the journal on top of the file. Once the journal is too long (see
+    JOURNAL_MIN_ENTRIES and JOURNAL_MAX_RATIO), or on compact(), the live items are
+    written whole again and the journal is deleted, so loading stays proportional to
+    the live items rather than to their history. The journal starts with the size
+    and checksum of the file it applies to, so a journal left behind by a crash
+    after the file was rewritten is ignored, and a partly written last line is too.
+    """
+
     dirname: str = DEFAULT_SAVE_DIR
     filename: str
     save_path: Path
+    kind: str = "objects"  # prefix of the metrics names
+    keep_backups: int = 0  # previous versions kept as <filename>.1 (newest) to .N
+    journal: bool = False  # append the changes to <file>.journal when saving
 
-    def __init__(self, persisted_object):
+    def __init__(
+        self,
+        persisted_object,
+        keep_backups: int | None = None,
+        journal: bool | None = None,
+    ):
         self.obj = persisted_object
-
-    def save(self) -> Any:
-        """Persist the backing lister to disk and return the lister object."""
+        if keep_backups is not None:
+            self.keep_backups = keep_backups
+        if journal is not None:
+            self.journal = journal
+        self._version: tuple | None = None  # of the files when last loaded or saved
+        self._baseline: list = []  # the items when last loaded or saved
+        self._snapshot: dict | None = None  # _snapshot_id of the file, with journal
+        self._journal_size = 0  # bytes of valid journal, 0 when there is none
+        self._journal_entries = 0
+        # called after save() merged the changes of another process into obj
+        self.on_merge: Callable[[], None] | None = None
+
+    @property
+    def journal_path(self) -> Path:
+        return self.save_path.with_suffix(JOURNAL_SUFFIX)
+
+    @property
+    def journal_entries(self) -> int:
+        """Number of changes in the journal, not yet folded into the file"""
+        return self._journal_entries
+
+    def save(self, compact: bool = False) -> Any:
+        """Persist the backing lister to disk and return the lister object.
+
+        Appends the changes to the journal when it is on and has room, unless compact
+        is set; otherwise writes the file whole and deletes the journal.
+        """
         logger.info(f"writing to {self.save_path}")
         # Ensure directory exists
         self.save_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.save_path, "w", encoding="utf8") as f:
-            json.dump(self.obj.data, f, cls=MtnTrackerJSONEncoder, indent=4)
+        with data_lock(self.save_path.parent, exclusive=True):
+            with (
+                profiling.span(f"save {self.filename}"),
+                metrics.timed(f"{self.kind}.save"),
+            ):
+                self.merge_if_changed()
+                written = None
+                if self.journal and not compact and self._snapshot is not None:
+                    written = self._append_journal(*self._delta())
+                if written is None:
+                    written = self._write_whole()
+                if written:
+                    self._invalidate_report_cache()
+            self._remember_version()
+        metrics.count(f"{self.kind}.bytes_written", written)
         return self.obj
 
-    def load(self) -> Any:
-        """Load persisted data into the backing lister and return it (TaskLister/ActionLister)."""
-        if not self.save_path.exists():
-            # create an empty file with current object
-            self.save()
-
-        with open(self.save_path, "r", encoding="utf8") as f:
-            loaded_data = json.load(f, cls=MtnTrackerJSONDecoder)
+    def compact(self) -> int:
+        """Folds the journal into the file, keeping only the live items, and returns
+        the number of journal entries folded"""
+        with data_lock(self.save_path.parent, exclusive=True):
+            self.merge_if_changed()
+            folded = self._journal_entries
+            self.save(compact=True)
+        metrics.count(f"{self.kind}.compactions")
+        return folded
+
+    def _write_whole(self) -> int:
+        with profiling.span("json encode"):
+            text = json.dumps(self.obj.data, cls=MtnTrackerJSONEncoder, indent=4)
+        raw = text.encode("utf8")
+        self._write_atomic(raw)
+        # the journal applied to the previous version of the file: once that is
+        # replaced the journal is ignored, even if deleting it fails
+        self.journal_path.unlink(missing_ok=True)
+        self._snapshot = _snapshot_id(raw) if self.journal else None
+        self._journal_size = self._journal_entries = 0
+        return len(raw)
+
+    def _append_journal(self, removed: Counter, added: list) -> int | None:
+        """Appends the changes to the journal, and returns the bytes written, or None
+        when the journal is full and the file must be written whole instead"""
+        entries = [
+            json.dumps({"op": "remove", "item": item}, cls=MtnTrackerJSONEncoder)
+            for item in removed.elements()
+        ] + [
+            json.dumps({"op": "add", "item": item}, cls=MtnTrackerJSONEncoder)
+            for item in added
+        ]
+        room = max(JOURNAL_MIN_ENTRIES, int(JOURNAL_MAX_RATIO * len(self.obj.data)))
+        if self._journal_entries + len(entries) > room:
+            return None
+        if not entries:
+            return 0
+
+        raw = "".join(entry + "\n" for entry in entries).encode("utf8")
+        if self._journal_size == 0:
+            # a new journal, replacing any left over for another version of the file
+            raw = (json.dumps(self._snapshot) + "\n").encode("utf8") + raw
+            f = open(self.journal_path, "wb")
+        else:
+            # drops a partly written entry left by a crash
+            f = open(self.journal_path, "r+b")
+            f.truncate(self._journal_size)
+            f.seek(self._journal_size)
+        with f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        if self._journal_size == 0:
+            _fsync_dir(self.save_path.parent)
+        self._journal_size += len(raw)
+        self._journal_entries += len(entries)
+        metrics.count(f"{self.kind}.journal_entries", len(entries))
+        return len(raw)
+
+    def _file_version(self) -> tuple:
+        return (_stat_version(self.save_path), _stat_version(self.journal_path))
+
+    def _remember_version(self) -> None:
+        self._version = self._file_version()
+        self._baseline = list(self.obj.data)
+
+    def _delta(self) -> tuple[Counter, list]:
+        """The items removed and added since the last load or save. The items are
+        immutable, so changes replace them: they are compared by identity."""
+        current = self.obj.data
+        current_ids = {id(item) for item in current}
+        baseline_ids = {id(item) for item in self._baseline}
+        removed = Counter(
+            item for item in self._baseline if id(item) not in current_ids
+        )
+        added = [item for item in current if id(item) not in baseline_ids]
+        return removed, added
+
+    def merge_if_changed(self) -> bool:
+        """Re-applies the changes made since the last load or save on top of the file,
+        if another process replaced it in the meantime. Returns whether it did."""
+        version = self._file_version()
+        if self._version is None or version == self._version:
+            return False
+        logger.info(f"{self.save_path} changed since it was read, merging the changes")
+        removed, added = self._delta()
+        on_disk = self._read() if self.save_path.exists() else []
+        merged = _without(on_disk, removed)
+        merged.extend(self._new_items(merged, added))
+        self.obj.data = merged
+        # what is on disk now, so the next _delta() is the changes made here
+        self._version, self._baseline = version, on_disk
+        metrics.count(f"{self.kind}.merges")
+        if self.on_merge is not None:
+            self.on_merge()
+        return True
+
+    def _new_items(self, items: list, added: list) -> list:
+        """The added items to append to the merged items"""
+        return added
+
+    def _write_atomic(self, raw: bytes) -> None:
+        """Replaces the file with raw in one step, keeping its mode and backups"""
+        _write_atomic(self.save_path, raw, self._before_replace)
+
+    def _before_replace(self, temp_path: Path) -> None:
+        if self.save_path.exists():
+            shutil.copymode(self.save_path, temp_path)
+            if self.keep_backups > 0:
+                self._rotate_backups()
+
+    def backup_path(self, n: int) -> Path:
+        """Path of the nth most recent previous version of the file"""
+        return self.save_path.with_name(f"{self.filename}.{n}")
+
+    def _rotate_backups(self) -> None:
+        """Shifts the backups by one, and keeps the current file as backup 1"""
+        self.backup_path(self.keep_backups).unlink(missing_ok=True)
+        for n in range(self.keep_backups - 1, 0, -1):
+            if self.backup_path(n).exists():
+                os.replace(self.backup_path(n), self.backup_path(n + 1))
+        # a hard link keeps the current file in place until it is replaced
+        try:
+            os.link(self.save_path, self.backup_path(1))
+        except OSError:  # file systems without hard links
+            shutil.copy2(self.save_path, self.backup_path(1))
 
-        self.obj.data = loaded_data
+    def _invalidate_report_cache(self) -> None:
+        """Drops the cached reports computed from the previous contents of this file."""
+        try:
+            self.save_path.parent.joinpath(REPORT_CACHE_FILE).unlink()
+        except FileNotFoundError:
+            pass
 
+    def load(self) -> Any:
+        """Load persisted data into the backing lister and return it (TaskLister/ActionLister)."""
+        with data_lock(self.save_path.parent):
+            if not self.save_path.exists():
+                # create an empty file with current object
+                self.save()
+
+            with (
+                profiling.span(f"load {self.filename}"),
+                metrics.timed(f"{self.kind}.load"),
+            ):
+                self.obj.data = self._read()
+            self._remember_version()
         return self.obj
 
+    def _read(self) -> list:
+        with open(self.save_path, "rb") as f:
+            raw = f.read()
+        with profiling.span("json decode"):
+            loaded_data = json.loads(raw, cls=MtnTrackerJSONDecoder)
+        metrics.count(f"{self.kind}.bytes_read", len(raw))
+        metrics.count(f"{self.kind}.objects_decoded", len(loaded_data))
+        return self._replay_journal(loaded_data, raw)
+
+    def _replay_journal(self, items: list, snapshot: bytes) -> list:
+        """Applies the journal written for the snapshot (the file contents) to its
+        items"""
+        self._snapshot = None
+        self._journal_size = self._journal_entries = 0
+        try:
+            with open(self.journal_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b""
+        if not data and not self.journal:
+            return items
+        self._snapshot = _snapshot_id(snapshot)
+        if not data:
+            return items
+
+        complete, _, torn = data.rpartition(b"\n")
+        if torn:
+            logger.warning(f"ignoring a partly written entry in {self.journal_path}")
+        header, *lines = complete.split(b"\n")
+        try:
+            current = json.loads(header) == self._snapshot
+        except ValueError:
+            current = False
+        if not current:
+            logger.info(f"ignoring {self.journal_path}, left for a previous version")
+            return items
+
+        with profiling.span("journal replay"):
+            decoder = MtnTrackerJSONDecoder()
+            removed: Counter = Counter()
+            for line in lines:
+                entry = decoder.decode(line.decode("utf8"))
+                if entry["op"] == "add":
+                    items.append(entry["item"])
+                else:
+                    removed[entry["item"]] += 1
+            if removed:
+                items = _without(items, removed)
+        self._journal_size = len(complete) + 1
+        self._journal_entries = len(lines)
+        metrics.count(f"{self.kind}.bytes_read", len(data))
+        metrics.count(f"{self.kind}.journal_entries_replayed", len(lines))
+        return items
+
     def _remove_file(self):
         import os
 
@@ -134,8 +554,12 @@ class Persister:
 
 
 class ActionListPersister(Persister):
-    def __init__(self, action_list, dirname=None, filename=None):
-        super().__init__(action_list)
+    kind = "actions"
+
+    def __init__(
+        self, action_list, dirname=None, filename=None, keep_backups=None, journal=None
+    ):
+        super().__init__(action_list, keep_backups, journal)
         if dirname is not None:
             self.dirname = dirname
         if filename is None:
@@ -145,8 +569,10 @@ class ActionListPersister(Persister):
 
 
 class TaskListPersister(Persister):
-    def __init__(self, task_list, dirname=None, filename=None):
-        super().__init__(task_list)
+    kind = "tasks"
+
+    def __init__(self, task_list, dirname=None, filename=None, keep_backups=None):
+        super().__init__(task_list, keep_backups)
         if dirname is not None:
             self.dirname = dirname
         if filename is None:
@@ -154,6 +580,21 @@ class TaskListPersister(Persister):
         self.filename = filename
         self.save_path = Path(self.dirname).joinpath(self.filename)
 
+    def _new_items(self, items: list, added: list) -> list:
+        """Skips the added tasks that the other process added too, and refuses to
+        merge two different tasks with the same name"""
+        by_name = {t.name: t for t in items}
+        new_tasks = []
+        for task in added:
+            existing = by_name.get(task.name)
+            if existing is None:
+                new_tasks.append(task)
+            elif existing != task:
+                raise ConcurrentModificationError(
+                    f"task '{task.name}' was also added or changed by another process"
+                )
+        return new_tasks
+
 
 # --- Repository wrappers to enable dependency injection and a repository pattern ---
 class TaskRepository(ABC):
@@ -205,6 +646,7 @@ class FileTaskRepository(TaskRepository):
         task_list: Optional[core.TaskLister] = None,
         dirname: Optional[str] = None,
         filename: Optional[str] = None,
+        keep_backups: Optional[int] = None,
     ):
         import core
 
@@ -212,7 +654,7 @@ class FileTaskRepository(TaskRepository):
             task_list = core.TaskLister([])
         self.task_list: core.TaskLister = task_list
         self.persister: TaskListPersister = TaskListPersister(
-            self.task_list, dirname, filename
+            self.task_list, dirname, filename, keep_backups
         )
         self.dirname = self.persister.dirname
         self.filename = self.persister.filename
@@ -223,6 +665,7 @@ class FileTaskRepository(TaskRepository):
 
     def get_by_name(self, name: Optional[str]) -> Optional[core.Task]:
         """Return a Task by name or None."""
+        metrics.count("tasks.get_by_name")
         if name is None:
             return None
         return self.task_list.get_task_by_name(name)
@@ -238,6 +681,7 @@ class FileTaskRepository(TaskRepository):
         except Exception as e:
             # Normalize underlying TaskWithSameNameError to DuplicateTaskError
             raise DuplicateTaskError(str(e)) from e
+        metrics.count("tasks.add")
 
     def remove(self, task: core.Task | None) -> None:
         """Remove a task from the internal TaskLister."""
@@ -245,6 +689,7 @@ class FileTaskRepository(TaskRepository):
             # nothing to remove
             return
         self.task_list.remove(task)
+        metrics.count("tasks.remove")
 
     def save(self) -> core.TaskLister:
         """Persist the task list to disk via the persister and return TaskLister."""
@@ -255,6 +700,408 @@ class FileTaskRepository(TaskRepository):
         return self.persister.load()
 
 
+def _month_index(day: date) -> int:
+    return day.year * 12 + day.month - 1
+
+
+def _month_start(index: int) -> date:
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _whole_days(start: datetime, end: datetime) -> tuple[date, date] | None:
+    """The first and last UTC days of an inclusive time range, if it covers whole days
+    (as the ranges of utils.parse_partial_timestamp do), or None."""
+    if start.tzinfo is None or end.tzinfo is None:
+        return None
+    start, end = start.astimezone(timezone.utc), end.astimezone(timezone.utc)
+    if start.time() != time.min or end.time() != time.max:
+        return None
+    return start.date(), end.date()
+
+
+class ActionRollups:
+    """Number of actions per (task name, UTC day) and per (task name, UTC month).
+
+    Kept up to date by FileActionRepository on every add and remove, so the number of
+    actions in whole days, months or years, and which tasks had any, are summed from
+    at most a couple of months of days plus one entry per month, without scanning
+    the actions.
+    """
+
+    def __init__(self, actions: Iterable[core.Action] = ()):
+        self.days: dict[date, Counter[str]] = {}
+        self.months: dict[int, Counter[str]] = {}
+        for action in actions:
+            self.add(action)
+
+    def _keys(self, action: core.Action) -> tuple[date, int]:
+        day = action.timestamp.astimezone(timezone.utc).date()
+        return day, _month_index(day)
+
+    def add(self, action: core.Action) -> None:
+        day, month = self._keys(action)
+        self.days.setdefault(day, Counter())[action.ref_task.name] += 1
+        self.months.setdefault(month, Counter())[action.ref_task.name] += 1
+
+    def add_counts(self, day: date, counts: dict[str, int]) -> None:
+        """Adds the number of actions of each task in a UTC day, eg: archived ones"""
+        month = _month_index(day)
+        self.days.setdefault(day, Counter()).update(counts)
+        self.months.setdefault(month, Counter()).update(counts)
+
+    def remove(self, action: core.Action) -> None:
+        day, month = self._keys(action)
+        for table, key in ((self.days, day), (self.months, month)):
+            counts = table[key]
+            counts[action.ref_task.name] -= 1
+            if counts[action.ref_task.name] <= 0:
+                del counts[action.ref_task.name]
+            if not counts:
+                del table[key]
+
+    def _period(self, first: date, last: date) -> Iterator[Counter[str]]:
+        """The counters covering the days from first to last (included)"""
+        whole_from = _month_index(first) + (first.day != 1)
+        last_of_month = last == date.max or (last + timedelta(days=1)).day == 1
+        whole_to = _month_index(last) + last_of_month  # excluded
+
+        if whole_from >= whole_to:
+            day_ranges = [(first, last)]
+        else:
+            yield from (
+                counts
+                for month, counts in self.months.items()
+                if whole_from <= month < whole_to
+            )
+            day_ranges = []
+            if first.day != 1:
+                day_ranges.append((first, _month_start(whole_from) - timedelta(days=1)))
+            if not last_of_month:
+                day_ranges.append((_month_start(whole_to), last))
+
+        for day, end in day_ranges:
+            while day <= end:
+                if day in self.days:
+                    yield self.days[day]
+                if day == date.max:
+                    break
+                day += timedelta(days=1)
+
+    def count(self, first: date, last: date, task_name: str | None = None) -> int:
+        """Number of actions (of a task, or of all) from the first to the last UTC day
+        (included)"""
+        if task_name is not None:
+            return sum(counts[task_name] for counts in self._period(first, last))
+        return sum(counts.total() for counts in self._period(first, last))
+
+    def task_names(self, first: date, last: date) -> set[str]:
+        """Names of the tasks with actions from the first to the last UTC day (included)"""
+        names: set[str] = set()
+        for counts in self._period(first, last):
+            names.update(counts)
+        return names
+
+
+@dataclass(frozen=True)
+class ArchiveSegment:
+    """One compressed file of archived actions, as listed in the archive manifest"""
+
+    filename: str
+    compression: str
+    first: datetime  # timestamps of the earliest and latest actions in the file
+    last: datetime
+    count: int
+    # number of actions per UTC day (ISO date) and task name, as stored in the file
+    days: dict[str, dict[str, int]] = field(default_factory=dict, compare=False)
+    # current version of the tasks edited (eg: renamed) since they were archived, by
+    # the task name stored in the file
+    tasks: dict[str, core.Task] = field(default_factory=dict, compare=False)
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        return start <= self.last and self.first <= end
+
+    def task_name(self, stored_name: str) -> str:
+        """Current name of the task stored as stored_name"""
+        task = self.tasks.get(stored_name)
+        return stored_name if task is None else task.name
+
+    def has_task(self, task_name: str) -> bool:
+        return any(
+            self.task_name(name) == task_name
+            for counts in self.days.values()
+            for name in counts
+        )
+
+    def with_task_replaced(self, task_name: str, task: core.Task) -> ArchiveSegment:
+        """The segment with the actions of the task currently named task_name
+        pointing to task"""
+        stored_names = {name for counts in self.days.values() for name in counts}
+        tasks = dict(self.tasks)
+        for name in stored_names:
+            if self.task_name(name) == task_name:
+                tasks[name] = task
+        return replace(self, tasks=tasks)
+
+    def to_dict(self) -> dict:
+        return {
+            "filename": self.filename,
+            "compression": self.compression,
+            "first": self.first.isoformat(),
+            "last": self.last.isoformat(),
+            "count": self.count,
+            "days": self.days,
+            "tasks": self.tasks,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "ArchiveSegment":
+        return cls(
+            **d
+            | {
+                "first": datetime.fromisoformat(d["first"]),
+                "last": datetime.fromisoformat(d["last"]),
+            }
+        )
+
+
+def _may_hold_later(
+    segment: ArchiveSegment, latest: dict[str, core.Action], when: datetime
+) -> bool:
+    """Whether the segment can hold an action at or before when that is later than
+    the one of its task in latest, from its counts per day"""
+    for day, counts in segment.days.items():
+        day_start = datetime.combine(date.fromisoformat(day), time.min, timezone.utc)
+        if day_start > when:
+            continue
+        day_end = datetime.combine(day_start.date(), time.max, timezone.utc)
+        for name in counts:
+            current = latest.get(segment.task_name(name))
+            if current is None or current.timestamp < day_end:
+                return True
+    return False
+
+
+class ActionArchive:
+    """Old actions moved out of the action file into compressed, read-only segments.
+
+    Each archiving run writes one segment to <data dir>/archive/, compressed with
+    gzip or lzma, then lists it in the manifest with the time range of its actions
+    and their number per day and task. Loading only reads the manifest: a segment
+    is decompressed the first time a range query reaches into its time range (and
+    kept decoded), and the counts per day keep the rollups whole without opening
+    any segment.
+
+    The segments are never rewritten: when a task with archived actions is edited
+    (eg: renamed), the manifest records the new task for the segments holding its
+    actions, and reading them points those actions to it. Such replacements are
+    kept in memory until save().
+    """
+
+    def __init__(self, dirname: str | Path, compression: str | None = None):
+        if compression is None:
+            compression = DEFAULT_ARCHIVE_COMPRESSION
+        if compression not in ARCHIVE_COMPRESSIONS:
+            raise ValueError(
+                f"unknown archive compression '{compression}', "
+                f"expected one of {', '.join(ARCHIVE_COMPRESSIONS)}"
+            )
+        self.compression = compression
+        self.path = Path(dirname) / ARCHIVE_DIR
+        self.manifest_path = self.path / ARCHIVE_MANIFEST
+        # the segments as listed in the manifest, and with the pending replacements
+        self._saved: list[ArchiveSegment] = []
+        self.segments: list[ArchiveSegment] = []
+        # task replacements not saved yet: (task name, new task, segment files)
+        self._pending: list[tuple[str, core.Task, frozenset[str]]] = []
+        self._version: tuple | None = None  # of the manifest when last read
+        self._decoded: dict[str, list[core.Action]] = {}
+
+    def load(self) -> list[ArchiveSegment]:
+        """Reads the manifest, dropping the task replacements not saved yet"""
+        if self._pending:
+            self._pending = []
+            self._apply_pending()
+        return self.refresh()
+
+    def refresh(self) -> list[ArchiveSegment]:
+        """Reads the manifest, if it changed since it was last read, keeping the task
+        replacements not saved yet"""
+        version = _stat_version(self.manifest_path)
+        if version == self._version:
+            return self.segments
+        if version is None:
+            self._saved = []
+        else:
+            with open(self.manifest_path, "rb") as f:
+                manifest = json.loads(f.read(), cls=MtnTrackerJSONDecoder)
+            self._saved = [ArchiveSegment.from_dict(d) for d in manifest["segments"]]
+        self._version = version
+        self._apply_pending()
+        return self.segments
+
+    def _apply_pending(self) -> None:
+        segments = list(self._saved)
+        for task_name, task, filenames in self._pending:
+            segments = [
+                s.with_task_replaced(task_name, task) if s.filename in filenames else s
+                for s in segments
+            ]
+        # decoded segments keep the tasks they were decoded with
+        current = {s.filename: s.tasks for s in segments}
+        previous = {s.filename: s.tasks for s in self.segments}
+        self._decoded = {
+            name: actions
+            for name, actions in self._decoded.items()
+            if name in current and current[name] == previous.get(name)
+        }
+        self.segments = segments
+
+    def replace_task(self, old: core.Task, new: core.Task) -> bool:
+        """Points the archived actions of old to new, until save() records it in the
+        manifest. Returns False when old has no archived actions."""
+        filenames = frozenset(s.filename for s in self.segments if s.has_task(old.name))
+        if not filenames:
+            return False
+        self._pending.append((old.name, new, filenames))
+        self._apply_pending()
+        return True
+
+    def undo_replace_task(self) -> None:
+        """Drops the last replacement not saved yet"""
+        self._pending.pop()
+        self._apply_pending()
+
+    def save(self) -> None:
+        """Records the pending replacements in the manifest"""
+        if not self._pending:
+            return
+        with data_lock(self.path.parent, exclusive=True):
+            # on top of the segments added by other processes meanwhile
+            self.refresh()
+            self._write_manifest(self.segments)
+
+    def _write_manifest(self, segments: list[ArchiveSegment]) -> None:
+        manifest = {"segments": [s.to_dict() for s in segments]}
+        # not indented: the counts per day are most of it, and it is read on load
+        text = json.dumps(manifest, cls=MtnTrackerJSONEncoder, separators=(",", ":"))
+        _write_atomic(self.manifest_path, text.encode("utf8"))
+        self._saved = self.segments = segments
+        self._pending = []
+        self._version = _stat_version(self.manifest_path)
+
+    def read(self, segment: ArchiveSegment) -> list[core.Action]:
+        """The actions of a segment, oldest first"""
+        actions = self._decoded.get(segment.filename)
+        if actions is None:
+            _, _, decompress = ARCHIVE_COMPRESSIONS[segment.compression]
+            with (
+                profiling.span(f"read {segment.filename}"),
+                metrics.timed("archive.read"),
+            ):
+                with open(self.path / segment.filename, "rb") as f:
+                    raw = decompress(f.read())
+                actions = json.loads(raw, cls=MtnTrackerJSONDecoder)
+            metrics.count("archive.bytes_read", len(raw))
+            metrics.count("archive.objects_decoded", len(actions))
+            if segment.tasks:
+                actions = [
+                    (
+                        a.replace({"ref_task": segment.tasks[a.ref_task.name]})
+                        if a.ref_task.name in segment.tasks
+                        else a
+                    )
+                    for a in actions
+                ]
+            self._decoded[segment.filename] = actions
+        return actions
+
+    def get_by_time(
+        self,
+        start_time: datetime | None = None,
+        end_time: datetime | None = None,
+        task_name: str | None = None,
+    ) -> list[core.Action]:
+        """The archived actions (of a task, or of all) from start_time to end_time
+        (included, unbounded when None), opening only the segments they can be in"""
+        start = start_time or datetime.min.replace(tzinfo=timezone.utc)
+        end = end_time or datetime.max.replace(tzinfo=timezone.utc)
+        found = []
+        for segment in self.segments:
+            if not segment.overlaps(start, end):
+                continue
+            if task_name is not None and not segment.has_task(task_name):
+                continue
+            found.extend(
+                a
+                for a in self.read(segment)
+                if start <= a.timestamp <= end
+                and (task_name is None or a.ref_task.name == task_name)
+            )
+        return found
+
+    def update_latest(self, latest: dict[str, core.Action], when: datetime) -> None:
+        """Replaces the actions in latest (by task name) with later archived actions
+        at or before when. A segment is only read when its counts per day show it
+        can hold one."""
+        for segment in self.segments:
+            if segment.first <= when and _may_hold_later(segment, latest, when):
+                for a in self.read(segment):
+                    if a.timestamp > when:
+                        continue
+                    current = latest.get(a.ref_task.name)
+                    if current is None or a.timestamp > current.timestamp:
+                        latest[a.ref_task.name] = a
+
+    def contains(self, action: core.Action) -> bool:
+        return action in self.get_by_time(action.timestamp, action.timestamp)
+
+    def add(
+        self, actions: list[core.Action], compression: str | None = None
+    ) -> ArchiveSegment:
+        """Writes the actions to a new segment, then lists it in the manifest"""
+        compression = compression or self.compression
+        suffix, compress, _ = ARCHIVE_COMPRESSIONS[compression]
+        actions = sorted(actions, key=lambda a: a.timestamp)
+        first, last = actions[0].timestamp, actions[-1].timestamp
+        filename = (
+            f"actions-{len(self.segments) + 1:04d}-"
+            f"{first.astimezone(timezone.utc):%Y%m%d}-"
+            f"{last.astimezone(timezone.utc):%Y%m%d}{suffix}"
+        )
+        days: dict[str, Counter[str]] = {}
+        for a in actions:
+            day = a.timestamp.astimezone(timezone.utc).date().isoformat()
+            days.setdefault(day, Counter())[a.ref_task.name] += 1
+
+        with profiling.span("json encode"):
+            text = json.dumps(actions, cls=MtnTrackerJSONEncoder)
+        raw = compress(text.encode("utf8"))
+        self.path.mkdir(parents=True, exist_ok=True)
+        _write_atomic(self.path / filename, raw)
+        metrics.count("archive.bytes_written", len(raw))
+
+        segment = ArchiveSegment(
+            filename,
+            compression,
+            first,
+            last,
+            len(actions),
+            {day: dict(counts) for day, counts in days.items()},
+        )
+        self._write_manifest(self.segments + [segment])
+        self._decoded[filename] = actions
+        return segment
+
+    def add_counts_to(self, rollups: ActionRollups) -> None:
+        """Adds the number of archived actions per day and task to rollups"""
+        for segment in self.segments:
+            for day, counts in segment.days.items():
+                current: Counter[str] = Counter()
+                for name, count in counts.items():
+                    current[segment.task_name(name)] += count
+                rollups.add_counts(date.fromisoformat(day), current)
+
+
 class ActionRepository(ABC):
     """Repository interface for actions.
 
@@ -298,6 +1145,68 @@ class ActionRepository(ABC):
         """Return an ActionLister of actions within a time range."""
         pass
 
+    def insert(self, index: int, action: core.Action) -> None:
+        """Put an Action back at a given position (used to undo a removal)."""
+        self.list().insert(index, action)
+
+    def remove_many(
+        self, actions: Iterable[core.Action]
+    ) -> list[tuple[int, core.Action]]:
+        """Remove several Actions (the same objects as in the repository) in one pass.
+
+        Returns the removed actions with their former positions, for restore_many().
+        Raises ValueError if any of them is not in the repository.
+        """
+        targets = {id(a) for a in actions}
+        lister = self.list()
+        kept: list[core.Action] = []
+        removed: list[tuple[int, core.Action]] = []
+        for index, action in enumerate(lister.data):
+            if id(action) in targets:
+                removed.append((index, action))
+            else:
+                kept.append(action)
+        if len(removed) != len(targets):
+            raise ValueError("some of the actions to remove are not in the repository")
+        lister.data[:] = kept
+        return removed
+
+    def restore_many(self, removed: list[tuple[int, core.Action]]) -> None:
+        """Put back the actions returned by remove_many(), at their former positions."""
+        lister = self.list()
+        remaining = iter(lister.data)
+        restored: list[core.Action] = []
+        for index, action in removed:
+            restored.extend(itertools.islice(remaining, index - len(restored)))
+            restored.append(action)
+        restored.extend(remaining)
+        lister.data[:] = restored
+
+    def count_by_time(
+        self, start_time: datetime, end_time: datetime, task_name: str | None = None
+    ) -> int:
+        """Return the number of actions (optionally of one task) within a time range."""
+        actions = self.get_by_time(start_time, end_time)
+        if task_name is not None:
+            return sum(1 for a in actions if a.ref_task.name == task_name)
+        return len(actions)
+
+    def task_names_by_time(self, start_time: datetime, end_time: datetime) -> set[str]:
+        """Return the names of the tasks with actions within a time range."""
+        return {a.ref_task.name for a in self.get_by_time(start_time, end_time)}
+
+    def get_latest_by_task(self, when: datetime) -> dict[str, core.Action]:
+        """Return the latest action at or before when of every task with one, by task
+        name, in a single pass."""
+        latest: dict[str, core.Action] = {}
+        for a in self.list():
+            if a.timestamp > when:
+                continue
+            current = latest.get(a.ref_task.name)
+            if current is None or a.timestamp > current.timestamp:
+                latest[a.ref_task.name] = a
+        return latest
+
     @abstractmethod
     def save(self) -> core.ActionLister:
         """Persist repository contents to storage and return ActionLister."""
@@ -312,7 +1221,13 @@ class ActionRepository(ABC):
 class FileActionRepository(ActionRepository):
     """File-backed ActionRepository using ActionListPersister internally.
 
-    Methods return ActionLister to match the repository contract.
+    Methods return ActionLister to match the repository contract. Keeps ActionRollups
+    of the actions, so counts and task names over whole days, months or years are
+    answered without scanning them.
+
+    Old actions can be moved to an ActionArchive with archive_before(). list() only
+    holds the actions of the action file, while get_by_time(), get_for_task() and the
+    counts include the archived ones. Archived actions cannot be removed.
     """
 
     def __init__(
@@ -320,6 +1235,9 @@ class FileActionRepository(ActionRepository):
         action_list: Optional[core.ActionLister] = None,
         dirname: Optional[str] = None,
         filename: Optional[str] = None,
+        keep_backups: Optional[int] = None,
+        journal: Optional[bool] = None,
+        archive_compression: Optional[str] = None,
     ):
         import core
 
@@ -327,10 +1245,17 @@ class FileActionRepository(ActionRepository):
             action_list = core.ActionLister([])
         self.action_list: core.ActionLister = action_list
         self.persister: ActionListPersister = ActionListPersister(
-            self.action_list, dirname, filename
+            self.action_list, dirname, filename, keep_backups, journal
         )
         self.dirname = self.persister.dirname
         self.filename = self.persister.filename
+        self.archive = ActionArchive(self.dirname, archive_compression)
+        self.rollups = ActionRollups(self.action_list)
+        self.persister.on_merge = self._rebuild_rollups
+
+    def _rebuild_rollups(self) -> None:
+        self.rollups = ActionRollups(self.action_list)
+        self.archive.add_counts_to(self.rollups)
 
     def list(self) -> core.ActionLister:
         """Return the ActionLister backing this repository."""
@@ -339,13 +1264,70 @@ class FileActionRepository(ActionRepository):
     def add(self, action: core.Action) -> None:
         """Append an action to the internal ActionLister."""
         self.action_list.append(action)
+        self.rollups.add(action)
+        metrics.count("actions.add")
+
+    def insert(self, index: int, action: core.Action) -> None:
+        """Insert an action in the internal ActionLister at a given position."""
+        self.action_list.insert(index, action)
+        self.rollups.add(action)
+        metrics.count("actions.add")
 
     def remove(self, action: core.Action | None) -> None:
         """Remove an action from the internal ActionLister."""
         if action is None:
             return
-        self.action_list.remove(action)
-
+        try:
+            self.action_list.remove(action)
+        except ValueError:
+            self._refuse_archived([action])
+            raise
+        self.rollups.remove(action)
+        metrics.count("actions.remove")
+
+    def remove_many(
+        self, actions: Iterable[core.Action]
+    ) -> list[tuple[int, core.Action]]:
+        """Remove several actions from the internal ActionLister in one pass."""
+        actions = list(actions)
+        try:
+            removed = super().remove_many(actions)
+        except ValueError:
+            self._refuse_archived(actions)
+            raise
+        for _, action in removed:
+            self.rollups.remove(action)
+        metrics.count("actions.remove", len(removed))
+        return removed
+
+    def restore_many(self, removed: list[tuple[int, core.Action]]) -> None:
+        """Put back actions returned by remove_many() at their former positions."""
+        super().restore_many(removed)
+        for _, action in removed:
+            self.rollups.add(action)
+        metrics.count("actions.add", len(removed))
+
+    @metrics.timed("actions.count_by_time")
+    def count_by_time(
+        self, start_time: datetime, end_time: datetime, task_name: str | None = None
+    ) -> int:
+        """Return the number of actions (optionally of one task) within a time range,
+        from the rollups when the range covers whole UTC days."""
+        days = _whole_days(start_time, end_time)
+        if days is None:
+            return super().count_by_time(start_time, end_time, task_name)
+        return self.rollups.count(*days, task_name)
+
+    @metrics.timed("actions.task_names_by_time")
+    def task_names_by_time(self, start_time: datetime, end_time: datetime) -> set[str]:
+        """Return the names of the tasks with actions within a time range, from the
+        rollups when the range covers whole UTC days."""
+        days = _whole_days(start_time, end_time)
+        if days is None:
+            return super().task_names_by_time(start_time, end_time)
+        return self.rollups.task_names(*days)
+
+    @metrics.timed("actions.get_for_task")
     def get_for_task(
         self,
         task: core.Task,
@@ -356,6 +1338,9 @@ class FileActionRepository(ActionRepository):
         """Return an ActionLister filtered by task and optional time range/order."""
         # replicate existing filtering semantics
         result_list = [a for a in self.action_list if a.ref_task.name == task.name]
+        archived = self.archive.get_by_time(start_time, end_time, task.name)
+        if archived:
+            result_list = archived + result_list
         if start_time or end_time:
             if start_time is None:
                 start_time = datetime.min.replace(tzinfo=timezone.utc)
@@ -380,6 +1365,7 @@ class FileActionRepository(ActionRepository):
 
         return _ActionLister(result_list)
 
+    @metrics.timed("actions.get_by_time")
     def get_by_time(
         self, start_time: datetime, end_time: Optional[datetime] = None
     ) -> core.ActionLister:
@@ -389,13 +1375,112 @@ class FileActionRepository(ActionRepository):
         from core import ActionLister as _ActionLister
 
         return _ActionLister(
-            [a for a in self.action_list if start_time <= a.timestamp <= end_time]
+            self.archive.get_by_time(start_time, end_time)
+            + [a for a in self.action_list if start_time <= a.timestamp <= end_time]
         )
 
+    @metrics.timed("actions.get_latest_by_task")
+    def get_latest_by_task(self, when: datetime) -> dict[str, core.Action]:
+        """Return the latest action at or before when of every task with one, by task
+        name, opening only the archive segments that can hold a later one than the
+        actions in the list."""
+        latest = super().get_latest_by_task(when)
+        self.archive.update_latest(latest, when)
+        return latest
+
     def save(self) -> core.ActionLister:
-        """Persist the action list to disk via the persister and return ActionLister."""
-        return self.persister.save()
+        """Persist the action list to disk via the persister, and the task
+        replacements to the archive manifest, and return ActionLister."""
+        with data_lock(self.persister.save_path.parent, exclusive=True):
+            action_list = self.persister.save()
+            self.archive.save()
+        return action_list
 
     def load(self) -> core.ActionLister:
         """Load persisted action list via the persister and return ActionLister."""
-        return self.persister.load()
+        with data_lock(self.persister.save_path.parent):
+            action_list = self.persister.load()
+            self.archive.load()
+        self._rebuild_rollups()
+        return action_list
+
+    def compact(self) -> int:
+        """Fold the journal of changes into the action file, returning the number of
+        journal entries folded."""
+        return self.persister.compact()
+
+    def archive_before(
+        self,
+        cutoff: datetime,
+        min_actions: int = 1,
+        compression: Optional[str] = None,
+    ) -> int:
+        """Move the actions older than cutoff to a new archive segment, except the
+        latest action of each task, and rewrite the action file without them.
+
+        Nothing is moved when fewer than min_actions are due. Returns the number of
+        actions moved.
+        """
+        with data_lock(self.persister.save_path.parent, exclusive=True):
+            self.persister.merge_if_changed()
+            self.archive.refresh()
+
+            latest: dict[str, core.Action] = {}
+            for a in self.action_list:
+                current = latest.get(a.ref_task.name)
+                if current is None or a.timestamp >= current.timestamp:
+                    latest[a.ref_task.name] = a
+            kept_ids = {id(a) for a in latest.values()}
+            due = [
+                a
+                for a in self.action_list
+                if a.timestamp < cutoff and id(a) not in kept_ids
+            ]
+            if not due or len(due) < min_actions:
+                return 0
+
+            # a crash after writing a segment, before rewriting the action file,
+            # leaves its actions in both: those are only dropped from the file
+            already = Counter(
+                self.archive.get_by_time(
+                    min(a.timestamp for a in due), max(a.timestamp for a in due)
+                )
+            )
+            new = _without(due, already)
+            if new:
+                self.archive.add(new, compression)
+            due_ids = {id(a) for a in due}
+            self.action_list.data[:] = [
+                a for a in self.action_list if id(a) not in due_ids
+            ]
+            self.persister.save(compact=True)
+            self._rebuild_rollups()
+        metrics.count("actions.archived", len(due))
+        return len(due)
+
+    def replace_task(self, old: core.Task, new: core.Task) -> bool:
+        """Point the archived actions of old to new, until save(). The hot actions
+        are left to the caller. Returns False when old has no archived actions."""
+        if not self.archive.replace_task(old, new):
+            return False
+        self._rebuild_rollups()
+        return True
+
+    def undo_replace_task(self) -> None:
+        """Revert the last replace_task() not saved yet."""
+        self.archive.undo_replace_task()
+        self._rebuild_rollups()
+
+    def is_archived(self, action: core.Action) -> bool:
+        """Whether the action was moved to the archive"""
+        return self.archive.contains(action)
+
+    def _refuse_archived(self, actions: Iterable[core.Action]) -> None:
+        hot_ids = {id(a) for a in self.action_list}
+        archived = [
+            a for a in actions if id(a) not in hot_ids and self.archive.contains(a)
+        ]
+        if archived:
+            raise ArchivedActionError(
+                f"{len(archived)} of the action(s) are archived and cannot be changed"
+            )
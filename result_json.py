@@ -0,0 +1,88 @@
+"""JSON encoding of the results returned by app.py operations.
+
+Extends the data file encoder with the listers, result enums and result dataclasses
+the app layer returns, so they can be sent to a daemon client or kept in the report
+cache and decoded back into the same objects.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+from collections import UserList
+from datetime import date
+from enum import Enum
+from typing import Any, Iterator
+
+import core
+import maintenance_tracker
+from repository import MtnTrackerJSONDecoder, MtnTrackerJSONEncoder
+
+# enums that can be encoded, by class name
+_ENUMS: dict[str, type[Enum]] = {
+    e.__name__: e
+    for e in (
+        maintenance_tracker.ActionRecordResults,
+        maintenance_tracker.TaskRecordResults,
+        core.Ordering,
+    )
+}
+_LISTERS: dict[str, type[UserList]] = {
+    "TaskLister": core.TaskLister,
+    "ActionLister": core.ActionLister,
+}
+# result dataclasses that hold Tasks and Actions; the data file encoder would flatten
+# those into plain dicts, so these are encoded one level at a time
+_RESULTS: dict[str, type] = {
+    "TaskStatus": core.TaskStatus,
+    "OverdueStatus": core.OverdueStatus,
+    "ComplianceStats": core.ComplianceStats,
+    "ActivityCount": core.ActivityCount,
+    "DeletedActions": core.DeletedActions,
+}
+
+
+class ResultJSONEncoder(MtnTrackerJSONEncoder):
+    """Adds the listers, result enums and result dataclasses returned by app.py to the
+    data file encoder."""
+
+    def default(self, o: Any) -> Any:
+        if isinstance(o, UserList):
+            return {"__type__": type(o).__name__, "items": o.data}
+        elif isinstance(o, Enum):
+            return {"__type__": "enum", "enum": type(o).__name__, "name": o.name}
+        elif type(o) is date:
+            # the data file encoder handles datetimes, but not plain dates
+            return {"__type__": "date", "iso": o.isoformat()}
+        elif isinstance(o, Iterator):
+            # lazy results (eg: the agenda) are sent as a list
+            return list(o)
+        elif type(o).__name__ in _RESULTS:
+            fields = {f.name: getattr(o, f.name) for f in dataclasses.fields(o)}
+            return {"__type__": type(o).__name__} | fields
+        return super().default(o)
+
+
+class ResultJSONDecoder(MtnTrackerJSONDecoder):
+    """Decodes objects serialized by ResultJSONEncoder."""
+
+    def dict_to_object(self, d: dict) -> Any:
+        type_name = d.get("__type__")
+        if type_name in _LISTERS:
+            return _LISTERS[type_name](d["items"])
+        elif type_name == "enum":
+            return _ENUMS[d["enum"]][d["name"]]
+        elif type_name == "date":
+            return date.fromisoformat(d["iso"])
+        elif type_name in _RESULTS:
+            del d["__type__"]
+            return _RESULTS[type_name](**d)
+        return super().dict_to_object(d)
+
+
+def dumps(result: Any) -> str:
+    return json.dumps(result, cls=ResultJSONEncoder)
+
+
+def loads(text: str) -> Any:
+    return json.loads(text, cls=ResultJSONDecoder)
@@ -1,3 +1,4 @@
+import json
 import pytest
 from unittest.mock import patch
 import logging
@@ -8,16 +9,19 @@ import app
 from core import (
     Action,
     ActionLister,
+    DeletedActions,
     Task,
     TaskLister,
     TaskWithSameNameError,
 )
 from maintenance_tracker import (
+    ActivityPeriod,
     MaintenanceTracker,
     Ordering,
     ActionRecordResults,
     TaskRecordResults,
 )
+from repository import MtnTrackerJSONEncoder
 
 logging.basicConfig(level=logging.DEBUG)
 
@@ -305,7 +309,7 @@ def test_delete_action(task1, action1_t1, action2_t1):
     start = datetime(2024, 1, 1, 0, 0, tzinfo=UTC)
     end = datetime(2024, 1, 2, 0, 0, tzinfo=UTC)
     deleted_count = app.delete_action(task1.name, start_time=start, end_time=end)
-    assert deleted_count == 1
+    assert deleted_count == DeletedActions(1)
     assert len(app.tracker.action_list) == 1
     assert a2 in app.tracker.action_list
 
@@ -389,6 +393,7 @@ def test_get_all_actions(task1, action1_t1):
 def test_edit_task_failure(task1):
     app.register_task(task1)
     t1 = app.get_task_by_name(task1.name)
+    app.record_run(t1.name, timestamp=datetime(2024, 1, 1, tzinfo=UTC))
     from errors import DanglingActionsError
 
     with patch(
@@ -397,6 +402,26 @@ def test_edit_task_failure(task1):
         with pytest.raises(DanglingActionsError):
             app.edit_task(t1, {"name": "NewName"})
 
+    # the half-done rename was rolled back, in memory and on disk
+    assert app.get_task_by_name("NewName") is None
+    assert [a.ref_task.name for a in app.tracker.action_list] == [task1.name]
+    new_tracker = MaintenanceTracker(
+        load=True, save_dir=app.tracker.task_list_saver.dirname
+    )
+    assert [t.name for t in new_tracker.task_list] == [task1.name]
+    assert [a.ref_task.name for a in new_tracker.action_list] == [task1.name]
+
+
+def test_edit_task_saves_once(task1):
+    app.register_task(task1)
+    for day in range(1, 4):
+        app.record_run(task1.name, timestamp=datetime(2024, 1, day, tzinfo=UTC))
+
+    with patch.object(app.tracker, "save", wraps=app.tracker.save) as mock_save:
+        app.edit_task(app.get_task_by_name(task1.name), {"name": "renamed"})
+
+    mock_save.assert_called_once()
+
 
 def test_get_actions_for_task_filtered_start_only_and_end_only(task1, action1_t1):
     app.register_task(task1)
@@ -445,7 +470,7 @@ def test_delete_action_with_no_matches_does_not_save(task1):
     with patch("app.tracker.save") as mock_save:
         deleted = app.delete_action(task1.name, action_name="missing")
 
-    assert deleted == 0
+    assert deleted == DeletedActions(0)
     mock_save.assert_not_called()
 
 
@@ -479,7 +504,7 @@ def test_delete_action_by_name(task1):
 
     # Delete by action name
     deleted = app.delete_action(task1.name, action_name="weekly watering")
-    assert deleted == 1
+    assert deleted == DeletedActions(1)
     assert len(app.tracker.action_list) == 1
     assert app.tracker.action_list[0].name == "second watering"
 
@@ -501,10 +526,181 @@ def test_delete_action_when_actor_and_actionname_swapped(task1):
 
     # Attempting to delete by the intended action name should not match the swapped entry.
     deleted = app.delete_action(task1.name, action_name="weekly watering")
-    assert deleted == 0
+    assert deleted == DeletedActions(0)
     assert len(app.tracker.action_list) == 1
 
     # Deleting by the actual recorded action name should succeed.
     deleted2 = app.delete_action(task1.name, action_name="Alex")
-    assert deleted2 == 1
+    assert deleted2 == DeletedActions(1)
     assert len(app.tracker.action_list) == 0
+
+
+def test_get_tracker_creates_tracker_lazily_once(tmp_path, task1):
+    app.configure_tracker(save_dir=str(tmp_path))
+    assert app.tracker is None
+
+    first = app.get_tracker()
+    assert first is app.get_tracker()
+    assert first.task_list_saver.dirname == str(tmp_path)
+
+    app.register_task(task1)
+    assert task1 in first.task_list
+
+
+def test_configure_tracker_drops_previous_tracker(tmp_path, task1):
+    app.register_task(task1)
+
+    app.configure_tracker(load=True, save_dir=str(tmp_path))
+    reloaded = app.get_tracker()
+
+    # the new tracker was created from the configured options and loaded the saved task
+    assert reloaded.task_list.get_task_by_name(task1.name) == task1
+
+
+def test_use_tracker_routes_operations_and_restores(tmp_path, task1, task2):
+    default_tracker = app.get_tracker()
+    other_tracker = MaintenanceTracker(save_dir=str(tmp_path / "other"))
+
+    with app.use_tracker(other_tracker):
+        app.register_task(task2)
+        assert app.get_tracker() is other_tracker
+
+    app.register_task(task1)
+    assert app.get_tracker() is default_tracker
+    assert [t.name for t in other_tracker.task_list] == [task2.name]
+    assert [t.name for t in default_tracker.task_list] == [task1.name]
+
+
+def test_batch_saves_once_on_exit(task1, task2):
+    with patch.object(app.tracker, "save", wraps=app.tracker.save) as mock_save:
+        with app.batch():
+            app.register_task(task1)
+            app.register_task(task2)
+            app.record_run(task1.name, timestamp=datetime(2024, 1, 1, tzinfo=UTC))
+            mock_save.assert_not_called()
+
+    mock_save.assert_called_once()
+    new_tracker = MaintenanceTracker(
+        load=True, save_dir=app.tracker.task_list_saver.dirname
+    )
+    assert len(new_tracker.task_list) == 2
+    assert len(new_tracker.action_list) == 1
+
+
+def test_batch_does_not_save_without_changes_or_on_error(task1):
+    with patch.object(app.tracker, "save") as mock_save:
+        with app.batch():
+            app.get_all_tasks()
+        mock_save.assert_not_called()
+
+        with pytest.raises(RuntimeError):
+            with app.batch():
+                app.register_task(task1)
+                raise RuntimeError("boom")
+        mock_save.assert_not_called()
+        # the failed batch was rolled back in memory
+        assert app.get_task_by_name(task1.name) is None
+
+        # outside a batch the operations save right away again
+        app.register_task(task1)
+        mock_save.assert_called_once()
+
+
+def test_reports_are_served_from_cache_until_data_is_saved(tmp_path, task1, task2):
+    saved = MaintenanceTracker(load=True, save_dir=str(tmp_path))
+    saved.register_task(task1)
+    saved.save()
+    at = datetime(2024, 1, 2, 6, 33, tzinfo=UTC)
+
+    app.configure_tracker(load=True, save_dir=str(tmp_path))
+    dashboard = app.get_dashboard(at)
+    app.configure_tracker(load=True, save_dir=str(tmp_path))
+    next_runs = app.get_next_runs(at=at)
+    assert (tmp_path / "report_cache.json").exists()
+    assert not list(tmp_path.glob("*.tmp")) and not list(tmp_path.glob(".*.tmp"))
+
+    # a new command: the cached results are returned without loading the tracker
+    app.configure_tracker(load=True, save_dir=str(tmp_path))
+    with patch("app.MaintenanceTracker", side_effect=AssertionError("loaded")):
+        assert app.get_dashboard(at) == dashboard
+        assert app.get_next_runs(at=at) == next_runs
+        assert app.get_overdue_tasks(at) == TaskLister([task1])
+    assert app.tracker is None
+
+    # saving the data files drops the cache
+    saved.register_task(task2)
+    saved.save()
+    assert not (tmp_path / "report_cache.json").exists()
+    app.configure_tracker(load=True, save_dir=str(tmp_path))
+    assert [s.task for s in app.get_dashboard(at)] == [task1, task2]
+
+
+def test_report_cache_ignores_data_changed_by_other_writers(tmp_path, task1):
+    app.configure_tracker(load=True, save_dir=str(tmp_path))
+    assert app.get_dashboard() == []
+
+    # a data file rewritten without going through Persister.save
+    other = MaintenanceTracker(save_dir=str(tmp_path))
+    other.register_task(task1)
+    with open(tmp_path / "task_list.json", "w", encoding="utf8") as f:
+        json.dump(other.task_list.data, f, cls=MtnTrackerJSONEncoder)
+
+    app.configure_tracker(load=True, save_dir=str(tmp_path))
+    assert [s.task for s in app.get_dashboard()] == [task1]
+
+
+def test_reports_skip_cache_once_tracker_is_loaded(tmp_path, task1):
+    app.configure_tracker(load=True, save_dir=str(tmp_path))
+    app.register_task(task1)
+
+    app.get_dashboard()
+
+    assert not (tmp_path / "report_cache.json").exists()
+
+
+def test_get_agenda_streams_and_limits(task1, task2):
+    app.register_task(task1)
+    app.register_task(task2)
+    start = datetime(2024, 1, 1, 10, 0, tzinfo=UTC)
+
+    agenda = app.get_agenda(start, start + timedelta(hours=2))
+    assert [when.minute for _, when in agenda] == [2, 32, 32, 2, 32, 32]
+
+    # no end: only as many runs as requested are produced
+    limited = list(app.get_agenda(start, limit=3))
+    assert [t.name for t, _ in limited] == [task2.name, task1.name, task2.name]
+
+
+def test_delete_action_skips_archived_actions(task1):
+    app.register_task(task1)
+    t = app.get_task_by_name(task1.name)
+    for day in range(1, 6):
+        app.tracker.record_run(Action(datetime(2024, 1, day, 9, 0, tzinfo=UTC), t))
+    app.tracker.save()
+    app.tracker.action_repo.archive_before(datetime(2024, 1, 3, tzinfo=UTC))
+
+    deleted = app.delete_action(
+        task1.name,
+        start_time=datetime(2024, 1, 1, tzinfo=UTC),
+        end_time=datetime(2024, 1, 4, tzinfo=UTC),
+    )
+
+    assert deleted == DeletedActions(deleted=1, archived=2)
+    remaining = app.tracker.get_actions_for_task(t)
+    assert [a.timestamp.day for a in remaining] == [1, 2, 4, 5]
+
+
+def test_get_activity_includes_archived_actions(task1):
+    app.register_task(task1)
+    t = app.get_task_by_name(task1.name)
+    for month in range(1, 7):
+        app.tracker.record_run(Action(datetime(2024, month, 1, 9, 0, tzinfo=UTC), t))
+    app.tracker.save()
+    app.tracker.action_repo.archive_before(datetime(2024, 5, 1, tzinfo=UTC))
+
+    def months(**window) -> list[int]:
+        return [c.start.month for c in app.get_activity(ActivityPeriod.MONTH, **window)]
+
+    assert months() == [1, 2, 3, 4, 5, 6]
+    assert months(end=datetime(2024, 3, 15, tzinfo=UTC)) == [1, 2, 3]
+    assert months(start=datetime(2024, 2, 15, tzinfo=UTC)) == [3, 4, 5, 6]
@@ -0,0 +1,51 @@
+import json
+
+from benchmarks import generate, run
+
+
+def test_generated_data_is_deterministic_and_loads(tmp_path):
+    generate.generate(str(tmp_path / "a"), 5, 200, seed=3)
+    generate.generate(str(tmp_path / "b"), 5, 200, seed=3)
+    for name in ("task_list.json", "action_list.json"):
+        a, b = tmp_path / "a" / name, tmp_path / "b" / name
+        assert a.read_bytes() == b.read_bytes()
+
+    from maintenance_tracker import MaintenanceTracker
+
+    tracker = MaintenanceTracker(load=True, save_dir=str(tmp_path / "a"))
+    assert len(tracker.task_list) == 5
+    assert len(tracker.action_list) == 200
+    timestamps = [a.timestamp for a in tracker.action_list]
+    assert timestamps == sorted(timestamps) and timestamps[-1] < generate.NOW
+
+
+def test_run_emits_timings_for_every_operation(tmp_path, capsys):
+    baseline = tmp_path / "baseline.json"
+    run.main(["--tasks", "5", "--actions", "200", "--repeat", "2", "-o", str(baseline)])
+    results = json.loads(baseline.read_text())
+    assert results["scale"] == {"tasks": 5, "actions": 200, "seed": 0}
+    assert set(results["results"]) == {
+        "load",
+        "save",
+        "get_overdue_tasks",
+        "get_next_runs",
+        "get_actions_by_time",
+        "record_run",
+        "edit_task_rename",
+        "delete_action_range",
+    }
+    for timing in results["results"].values():
+        assert len(timing["times"]) == 2
+        assert timing["min"] <= timing["median"]
+
+    generate.main(["--tasks", "5", "--actions", "200", str(tmp_path / "data")])
+    before = sorted(p.name for p in (tmp_path / "data").iterdir())
+    run.main(
+        ["--data-dir", str(tmp_path / "data"), "--repeat", "1"]
+        + ["--compare", str(baseline)]
+    )
+    out, err = capsys.readouterr()
+    assert json.loads(out)["data_dir"].endswith("data")
+    assert len(err.splitlines()) == len(results["results"])
+    # the data folder is only read through a scratch copy
+    assert sorted(p.name for p in (tmp_path / "data").iterdir()) == before
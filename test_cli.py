@@ -10,9 +10,26 @@ import pytest
 from typer.testing import CliRunner
 
 from main import typer_app
-from core import Task, TaskLister, Action
-from maintenance_tracker import ActionRecordResults, TaskRecordResults, ActionLister
+from core import (
+    Action,
+    ActivityCount,
+    ActivityPeriod,
+    ComplianceStats,
+    DeletedActions,
+    OverdueRank,
+    OverdueStatus,
+    Task,
+    TaskLister,
+    TaskStatus,
+)
+from maintenance_tracker import (
+    ActionRecordResults,
+    TaskRecordResults,
+    ActionLister,
+    MaintenanceTracker,
+)
 import config as config_module
+from errors import TaskNotFoundError
 
 import cli as cli_mod
 import typer
@@ -203,6 +220,65 @@ def test_list_actions_csv_output(mock_app, tmp_config_dir):
     ]
 
 
+def test_list_actions_ndjson_output(mock_app, tmp_config_dir):
+    """Action lists can be emitted as one JSON object per line."""
+    task = Task("Task1")
+    mock_app.get_all_actions.return_value = ActionLister(
+        [
+            Action(datetime.datetime(2024, 1, 2, 10, 0, tzinfo=UTC), task, "first"),
+            Action(datetime.datetime(2024, 1, 3, 10, 0, tzinfo=UTC), task, "second"),
+        ]
+    )
+
+    result = invoke_app(["list", "actions", "-o", "ndjson"], tmp_config_dir)
+
+    assert result.exit_code == 0
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [r["action_name"] for r in records] == ["first", "second"]
+    assert records[0]["timestamp"] == "2024-01-02T10:00:00+00:00"
+
+
+def test_list_actions_limit_and_sort(mock_app, tmp_config_dir):
+    """Action lists can be paged and sorted without changing the app calls."""
+    task = Task("Task1")
+    mock_app.get_actions_for_task_filtered.return_value = ActionLister(
+        [
+            Action(datetime.datetime(2024, 1, d, 10, 0, tzinfo=UTC), task, f"run {d}")
+            for d in (3, 1, 4, 2, 5)
+        ]
+    )
+
+    result = invoke_app(
+        [
+            "list",
+            "actions",
+            "Task1",
+            "-o",
+            "ndjson",
+            "--sort",
+            "timestamp",
+            "--reverse",
+            "--limit",
+            "2",
+        ],
+        tmp_config_dir,
+    )
+
+    assert result.exit_code == 0
+    mock_app.get_actions_for_task_filtered.assert_called_once_with("Task1")
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [r["action_name"] for r in records] == ["run 5", "run 4"]
+
+    result = invoke_app(
+        ["list", "actions", "Task1", "-o", "ndjson", "--offset", "3"], tmp_config_dir
+    )
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [r["action_name"] for r in records] == ["run 2", "run 5"]
+
+    result = invoke_app(["list", "actions", "--limit", "0"], tmp_config_dir)
+    assert result.exit_code == 2
+
+
 def test_list_rejects_unknown_output_format(mock_app, tmp_config_dir):
     """Output format values are constrained to the documented formats."""
     result = invoke_app(["list", "tasks", "--output", "yaml"], tmp_config_dir)
@@ -227,20 +303,32 @@ def test_no_args_shows_dashboard_when_database_exists(mock_app, tmp_config_dir):
     (tmp_config_dir / "task_list.json").write_text("[]", encoding="utf8")
     overdue_task = Task("OverdueTask")
     next_task = Task("NextTask")
-    mock_app.get_overdue_tasks.return_value = TaskLister([overdue_task])
-    mock_app.get_next_runs.return_value = [
-        (next_task, datetime.datetime(2024, 1, 2, 10, 0, tzinfo=UTC))
+    mock_app.get_dashboard.return_value = [
+        TaskStatus(
+            overdue_task, None, datetime.datetime(2024, 1, 1, tzinfo=UTC), None, True
+        ),
+        TaskStatus(
+            next_task,
+            None,
+            None,
+            datetime.datetime(2024, 1, 2, 10, 0, tzinfo=UTC),
+            False,
+        ),
     ]
 
     result = invoke_app([], tmp_config_dir)
 
     assert result.exit_code == 0
-    assert "overdue tasks" in result.stdout
-    assert "OverdueTask" in result.stdout
-    assert "next expected tasks" in result.stdout
-    assert "NextTask" in result.stdout
-    mock_app.get_overdue_tasks.assert_called_once_with()
-    mock_app.get_next_runs.assert_called_once_with(None, None)
+    overdue_section, next_section = result.stdout.split("next expected tasks")
+    assert "overdue tasks" in overdue_section
+    assert "OverdueTask" in overdue_section
+    assert "NextTask" not in overdue_section
+    assert "NextTask" in next_section
+    assert "OverdueTask" not in next_section
+    # both sections are rendered from a single status computation
+    mock_app.get_dashboard.assert_called_once_with()
+    mock_app.get_overdue_tasks.assert_not_called()
+    mock_app.get_next_runs.assert_not_called()
 
 
 def test_list_actions_all(mock_app, tmp_config_dir):
@@ -373,7 +461,7 @@ def test_delete_task_failure(mock_app, tmp_config_dir):
 
 def test_delete_action_success(mock_app, tmp_config_dir):
     """Test deleting actions successfully."""
-    mock_app.delete_action.return_value = 5
+    mock_app.delete_action.return_value = DeletedActions(5)
 
     result = invoke_app(
         ["delete", "action", "TaskName", "--action-name", "ActionName"], tmp_config_dir
@@ -383,6 +471,19 @@ def test_delete_action_success(mock_app, tmp_config_dir):
     assert "Successfully deleted 5 action(s)" in result.stdout
 
 
+def test_delete_action_reports_archived_actions(mock_app, tmp_config_dir):
+    """Test deleting actions when some of the matches are archived."""
+    mock_app.delete_action.return_value = DeletedActions(1, archived=2)
+
+    result = invoke_app(
+        ["delete", "action", "TaskName", "--action-name", "ActionName"], tmp_config_dir
+    )
+
+    assert result.exit_code == 0
+    assert "Successfully deleted 1 action(s)" in result.stdout
+    assert "2 matching action(s) are archived and were kept" in result.stdout
+
+
 def test_delete_action_no_criteria(mock_app, tmp_config_dir):
     """Test delete action without criteria."""
     result = invoke_app(["delete", "action", "TaskName"], tmp_config_dir)
@@ -400,6 +501,234 @@ def test_report_overdue(mock_app, tmp_config_dir):
     mock_app.get_overdue_tasks.assert_called_once()
 
 
+def test_report_overdue_top_ranks_tasks(mock_app, tmp_config_dir):
+    """--top and --by switch to the ranked report."""
+    due = datetime.datetime(2024, 1, 1, tzinfo=UTC)
+    mock_app.get_overdue_ranking.return_value = [
+        OverdueStatus(Task("Worst"), due, datetime.timedelta(days=3), 3),
+        OverdueStatus(Task("Second"), due, datetime.timedelta(days=1), 12),
+    ]
+
+    result = invoke_app(["report", "overdue", "--top", "2"], tmp_config_dir)
+
+    assert result.exit_code == 0
+    assert result.stdout.index("Worst") < result.stdout.index("Second")
+    mock_app.get_overdue_ranking.assert_called_once_with(None, 2, OverdueRank.LATENESS)
+    mock_app.get_overdue_tasks.assert_not_called()
+
+    result = invoke_app(["report", "overdue", "--by", "missed"], tmp_config_dir)
+    assert result.exit_code == 0
+    mock_app.get_overdue_ranking.assert_called_with(None, None, OverdueRank.MISSED)
+
+
+def test_report_compliance(mock_app, tmp_config_dir):
+    """Compliance statistics are shown per task for the requested period."""
+    mock_app.get_compliance.return_value = [
+        ComplianceStats(
+            Task("Task1"),
+            4,
+            3,
+            0,
+            1,
+            datetime.timedelta(hours=1),
+            datetime.timedelta(hours=2),
+        ),
+        ComplianceStats(Task("Task2"), 2, 0, 0, 2, None, None),
+    ]
+
+    result = invoke_app(
+        [
+            "report",
+            "compliance",
+            "--from",
+            "2024-01-01",
+            "--to",
+            "2024-02-01",
+            "--grace",
+            "2 hours",
+            "--for",
+            "Task1",
+        ],
+        tmp_config_dir,
+    )
+
+    assert result.exit_code == 0
+    rows = [line.split() for line in result.stdout.splitlines()[3:]]
+    assert [r[:6] for r in rows] == [
+        ["Task1", "4", "3", "0", "1", "75%"],
+        ["Task2", "2", "0", "0", "2", "0%"],
+    ]
+    start, end, grace, task_name = mock_app.get_compliance.call_args.args
+    assert (start.date(), end.date()) == (
+        datetime.date(2024, 1, 1),
+        datetime.date(2024, 2, 1),
+    )
+    assert (grace, task_name) == (datetime.timedelta(hours=2), "Task1")
+
+    mock_app.get_compliance.side_effect = TaskNotFoundError("Task 'x' not found")
+    result = invoke_app(["report", "compliance", "--for", "x"], tmp_config_dir)
+    assert result.exit_code == 1
+    assert "not found" in result.stdout
+
+
+def test_report_overdue_history(mock_app, tmp_config_dir):
+    """The overdue history is shown per step, as a table or as data."""
+    day = datetime.datetime(2024, 1, 1, tzinfo=UTC)
+    mock_app.get_overdue_history.return_value = [
+        (day, TaskLister([])),
+        (day + datetime.timedelta(days=1), TaskLister([Task("A"), Task("B")])),
+    ]
+
+    result = invoke_app(
+        ["report", "overdue-history", "--from", "2024-01-01", "--to", "2024-01-02"],
+        tmp_config_dir,
+    )
+    assert result.exit_code == 0
+    assert result.stdout.splitlines()[-1].split() == [
+        "2024-01-02",
+        "00:00",
+        "UTC",
+        "2",
+        "A,",
+        "B",
+    ]
+    start, end, step = mock_app.get_overdue_history.call_args.args
+    assert step == datetime.timedelta(days=1)
+
+    result = invoke_app(
+        [
+            "report",
+            "overdue-history",
+            "--from",
+            "2024-01-01",
+            "--step",
+            "12h",
+            "-o",
+            "ndjson",
+        ],
+        tmp_config_dir,
+    )
+    assert result.exit_code == 0
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [r["overdue"] for r in records] == [0, 2]
+    assert records[1]["tasks"] == ["A", "B"]
+    assert mock_app.get_overdue_history.call_args.args[2] == datetime.timedelta(
+        hours=12
+    )
+
+
+def test_report_activity(mock_app, tmp_config_dir):
+    """Activity counts are shown per period, with actor/task columns on request."""
+    week = datetime.date(2024, 1, 1)
+    mock_app.get_activity.return_value = [
+        ActivityCount(ActivityPeriod.WEEK, week, 3, actor="ann"),
+        ActivityCount(
+            ActivityPeriod.WEEK, week + datetime.timedelta(weeks=1), 1, actor="bob"
+        ),
+    ]
+
+    result = invoke_app(
+        ["report", "activity", "--by", "week", "--actor"], tmp_config_dir
+    )
+    assert result.exit_code == 0
+    lines = result.stdout.splitlines()
+    assert lines[1].split() == ["Period", "Actor", "Actions"]
+    assert [line.split() for line in lines[-2:]] == [
+        ["2024-W01", "ann", "3"],
+        ["2024-W02", "bob", "1"],
+    ]
+    assert mock_app.get_activity.call_args.args == (
+        ActivityPeriod.WEEK,
+        True,
+        False,
+        None,
+        None,
+    )
+
+    result = invoke_app(
+        [
+            "report",
+            "activity",
+            "--by",
+            "week",
+            "--actor",
+            "--from",
+            "2024-01-01",
+            "-o",
+            "csv",
+        ],
+        tmp_config_dir,
+    )
+    assert result.exit_code == 0
+    assert result.stdout.splitlines() == [
+        "Period,Actor,Actions",
+        "2024-W01,ann,3",
+        "2024-W02,bob,1",
+    ]
+    assert mock_app.get_activity.call_args.args[3] is not None
+
+
+def test_compact(mock_app, tmp_config_dir):
+    mock_app.compact_actions.return_value = 12
+
+    result = invoke_app(["compact"], tmp_config_dir)
+    assert result.exit_code == 0
+    assert "folded 12 journal entries" in result.stdout
+
+
+def test_archive(mock_app, tmp_config_dir):
+    mock_app.archive_actions.return_value = 30
+
+    result = invoke_app(
+        ["archive", "--older-than", "30d", "--compression", "lzma"], tmp_config_dir
+    )
+    assert result.exit_code == 0
+    assert "archived 30 action(s)" in result.stdout
+    assert mock_app.archive_actions.call_args.args == (
+        datetime.timedelta(days=30),
+        "lzma",
+    )
+
+
+def test_stats(mock_app, tmp_config_dir, monkeypatch):
+    """Counters and latencies are shown in two tables, slowest operation first."""
+    import metrics
+
+    # the command installs an in-memory sink for its run
+    monkeypatch.setattr(metrics, "_sink", metrics.NULL_SINK)
+    latency = {
+        "count": 2,
+        "total": 0.004,
+        "mean": 0.002,
+        "p50": 0.001,
+        "p95": 0.005,
+        "max": 0.003,
+        "buckets": [],
+    }
+    mock_app.get_stats.return_value = {
+        "counters": {"tasks.bytes_read": 120},
+        "latencies": {
+            "tasks.load": latency,
+            "actions.load": {**latency, "total": 0.01},
+        },
+    }
+
+    result = invoke_app(["stats"], tmp_config_dir)
+    assert result.exit_code == 0
+    lines = result.stdout.splitlines()
+    assert lines[0] == "Counters"
+    assert lines[3].split() == ["tasks.bytes_read", "120"]
+    assert lines[4] == "Latencies"
+    assert [line.split()[0] for line in lines[-2:]] == ["actions.load", "tasks.load"]
+    assert lines[-1].split()[1:4] == ["2", "2.00", "ms"]
+
+    result = invoke_app(["stats", "-o", "ndjson"], tmp_config_dir)
+    assert result.exit_code == 0
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert records[0] == {"metric": "tasks.bytes_read", "type": "counter", "value": 120}
+    assert records[1]["type"] == "latency" and records[1]["p95"] == 0.005
+
+
 def test_report_next(mock_app, tmp_config_dir):
     """Test report next command."""
     from datetime import datetime, UTC
@@ -414,6 +743,45 @@ def test_report_next(mock_app, tmp_config_dir):
     mock_app.get_next_runs.assert_called_once()
 
 
+def test_report_agenda(mock_app, tmp_config_dir):
+    """The agenda lists the task runs in order, in the requested window."""
+    task_a, task_b = Task("TaskA"), Task("TaskB")
+    mock_app.get_agenda.return_value = iter(
+        [
+            (task_a, datetime.datetime(2024, 1, 2, 10, 0, tzinfo=UTC)),
+            (task_b, datetime.datetime(2024, 1, 2, 11, 0, tzinfo=UTC)),
+        ]
+    )
+
+    result = invoke_app(
+        ["report", "agenda", "--from", "2024-01-02", "--to", "2024-01-03", "-n", "5"],
+        tmp_config_dir,
+    )
+
+    assert result.exit_code == 0
+    lines = result.stdout.splitlines()
+    assert lines[0] == "Agenda"
+    assert lines[3].startswith("2024-01-02 10:00 UTC  TaskA")
+    assert lines[4].startswith("2024-01-02 11:00 UTC  TaskB")
+    start, end, limit = mock_app.get_agenda.call_args.args
+    assert (start.date(), end.date(), limit) == (
+        datetime.date(2024, 1, 2),
+        datetime.date(2024, 1, 3),
+        5,
+    )
+
+
+def test_report_agenda_defaults_to_one_week(mock_app, tmp_config_dir):
+    mock_app.get_agenda.return_value = iter([])
+
+    result = invoke_app(["report", "agenda"], tmp_config_dir)
+
+    assert result.exit_code == 0
+    start, end, limit = mock_app.get_agenda.call_args.args
+    assert end - start == datetime.timedelta(weeks=1)
+    assert limit is None
+
+
 def test_report_tasks(mock_app, tmp_config_dir):
     """Test report tasks command with --at and --between."""
     mock_app.get_tasks_by_time.return_value = TaskLister([Task("ReportTask")])
@@ -445,6 +813,15 @@ def test_report_actions(mock_app, tmp_config_dir):
     result_default = invoke_app(["report", "actions"], tmp_config_dir)
     assert result_default.exit_code == 0
 
+    mock_app.count_actions_by_time.return_value = 12
+    result = invoke_app(
+        ["report", "actions", "--at", "2024", "--count"], tmp_config_dir
+    )
+    assert result.exit_code == 0
+    assert result.stdout.strip() == "12"
+    start, end, task_name = mock_app.count_actions_by_time.call_args.args
+    assert (start.year, end.year, task_name) == (2024, 2024, None)
+
 
 def test_edit_task_interactive_and_partial(mock_app, tmp_config_dir):
     """Test interactive task editing and partial field updates."""
@@ -475,7 +852,7 @@ def test_edit_task_interactive_and_partial(mock_app, tmp_config_dir):
 
 def test_delete_action_zero_deleted(mock_app, tmp_config_dir):
     """Test delete action output when 0 actions are deleted."""
-    mock_app.delete_action.return_value = 0
+    mock_app.delete_action.return_value = DeletedActions(0)
     result = invoke_app(
         ["delete", "action", "TaskName", "--action-name", "ActionName"], tmp_config_dir
     )
@@ -677,3 +1054,35 @@ def test_edit_action_success_and_not_found(monkeypatch, capsys):
     cli_mod.edit_action("Tedit", a.timestamp.isoformat(), new_actor="newactor")
     out = capsys.readouterr().out
     assert "Action updated successfully" in out
+
+
+def test_batch_runs_commands_and_saves_once(tmp_config_dir):
+    """A batch runs every line in one process and writes the data files once."""
+    commands = "\n".join(
+        [
+            "# set up a task and record two runs",
+            'add task "Water plants" 2024-01-01 "7 days"',
+            'record run "Water plants" Alex --timestamp 2024-01-02',
+            '["record", "run", "Water plants", "Sam", "--timestamp", "2024-01-09"]',
+            "record run missing",
+            "bogus command",
+        ]
+    )
+
+    with patch.object(
+        MaintenanceTracker, "save", autospec=True, side_effect=MaintenanceTracker.save
+    ) as mock_save:
+        result = invoke_app(["batch"], tmp_config_dir, input=commands)
+
+    assert result.exit_code == 1
+    assert "line 2 ok" in result.stdout
+    assert "line 4 ok" in result.stdout
+    assert "line 5 failed" in result.stdout
+    assert "line 6 failed" in result.stdout
+    assert "ran 5 command(s), 2 failed" in result.stdout
+    mock_save.assert_called_once()
+
+    saved_actions = json.loads(
+        (tmp_config_dir / "action_list.json").read_text(encoding="utf8")
+    )
+    assert [a["actor"] for a in saved_actions] == ["Alex", "Sam"]
@@ -0,0 +1,149 @@
+"""Catches operations that become quadratic (or worse) in the number of tasks/actions.
+
+Each operation runs at N and 4N; a linear one takes about 4 times longer at 4N, a
+quadratic one about 16 times. The bound leaves room for n log n and timing noise, and
+every measurement is the best of a few runs (retried a few times) to stay reliable on
+a busy machine.
+"""
+
+import gc
+import time
+from datetime import UTC, datetime, timedelta
+from typing import Any, Callable
+from unittest.mock import patch
+
+import pytest
+
+import app
+import utils
+from core import Action, Task, TaskLister
+from maintenance_tracker import MaintenanceTracker
+
+N = 2000
+IO_N = N // 4  # for writing and reading the data files
+SCALE = 4
+MAX_RATIO = 9  # 4 for linear, about 4.7 for n log n at this N, 16 for quadratic
+REPEAT = 3
+ATTEMPTS = 3
+
+START = datetime(2024, 1, 1, tzinfo=UTC)
+
+
+def _best_time(setup: Callable[[int], Any], operation: Callable[[Any], Any], n: int):
+    best = float("inf")
+    for _ in range(REPEAT):
+        state = setup(n)
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            operation(state)
+            best = min(best, time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return best
+
+
+def assert_scales_linearly(
+    setup: Callable[[int], Any], operation: Callable[[Any], Any], n: int = N
+) -> None:
+    """Asserts that operation(setup(SCALE * n)) is at most MAX_RATIO times slower
+    than operation(setup(n))"""
+    ratios = []
+    for _ in range(ATTEMPTS):
+        ratio = _best_time(setup, operation, SCALE * n) / _best_time(
+            setup, operation, n
+        )
+        if ratio < MAX_RATIO:
+            return
+        ratios.append(ratio)
+    pytest.fail(f"{SCALE}x the data took {min(ratios):.1f}x longer (max {MAX_RATIO}x)")
+
+
+def _tasks(n: int) -> list[Task]:
+    return [
+        Task(f"task {i}", start_time=START, interval=timedelta(days=1 + i % 7))
+        for i in range(n)
+    ]
+
+
+def _tracker(n: int, save_dir=None) -> MaintenanceTracker:
+    """n tasks with n actions in total, half of them on the first task"""
+    tracker = MaintenanceTracker(save_dir=save_dir)
+    tasks = _tasks(n)
+    tracker.task_list.extend(tasks)
+    for i in range(n):
+        task = tasks[0] if i % 2 else tasks[i]
+        tracker.action_repo.add(Action(START + timedelta(minutes=i), task))
+    return tracker
+
+
+def test_task_lister_append_and_lookup():
+    def fill(tasks: list[Task]) -> None:
+        lister = TaskLister()
+        for t in tasks:
+            lister.append(t)
+        for t in tasks:
+            assert lister.get_task_by_name(t.name) is t
+
+    assert_scales_linearly(_tasks, fill)
+
+
+def test_record_run():
+    def setup(n: int) -> tuple[MaintenanceTracker, list[Action]]:
+        tracker = MaintenanceTracker()
+        tasks = _tasks(n)
+        tracker.task_list.extend(tasks)
+        actions = [Action(START + timedelta(minutes=i), t) for i, t in enumerate(tasks)]
+        return tracker, actions
+
+    def record(state) -> None:
+        tracker, actions = state
+        for a in actions:
+            tracker.record_run(a)
+
+    assert_scales_linearly(setup, record)
+
+
+@pytest.mark.parametrize(
+    "period",
+    [
+        utils.parse_partial_timestamp("2024"),  # whole days, from the rollups
+        (START + timedelta(seconds=1), START + timedelta(days=30)),  # scanned
+    ],
+)
+def test_get_tasks_by_time(period):
+    assert_scales_linearly(_tracker, lambda tracker: tracker.get_tasks_by_time(*period))
+
+
+def test_dashboard():
+    assert_scales_linearly(
+        _tracker, lambda tracker: tracker.dashboard(START + timedelta(days=10))
+    )
+
+
+def test_edit_task_rename_moves_actions():
+    def rename(tracker: MaintenanceTracker) -> None:
+        tracker.edit_task(tracker.task_list[0], {"name": "renamed"})
+
+    assert_scales_linearly(_tracker, rename)
+
+
+def test_delete_action_range():
+    def delete(tracker: MaintenanceTracker) -> None:
+        # writing the files is timed by test_save_and_load
+        with app.use_tracker(tracker), patch.object(tracker, "save"):
+            deleted = app.delete_action("task 0", START, START + timedelta(days=365))
+        assert deleted.deleted == len(tracker.task_list) // 2 + 1
+
+    assert_scales_linearly(_tracker, delete)
+
+
+def test_save_and_load(tmp_path):
+    def round_trip(tracker: MaintenanceTracker) -> None:
+        tracker.save()
+        MaintenanceTracker(load=True, save_dir=str(tmp_path))
+
+    assert_scales_linearly(
+        lambda n: _tracker(n, save_dir=str(tmp_path)), round_trip, IO_N
+    )
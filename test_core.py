@@ -1,3 +1,4 @@
+import itertools
 from pathlib import Path
 from core import *
 from repository import (
@@ -331,6 +332,42 @@ def test_action_list_equality_order_independent(action1_t1: Action, action2_t1:
     ), "ActionLister equality should be order-independent."
 
 
+def test_action_list_page_slices_in_list_order(task1: Task):
+    actions = [
+        Action(datetime(2024, 1, d, tzinfo=UTC), task1, f"run {d}") for d in range(1, 8)
+    ]
+    action_lst = ActionLister(actions)
+
+    assert action_lst.page() is action_lst
+    assert list(action_lst.page(limit=3)) == actions[:3]
+    assert list(action_lst.page(offset=2, limit=2)) == actions[2:4]
+    assert list(action_lst.page(offset=5)) == actions[5:]
+    # without a sort field, reverse walks the list from the end
+    assert list(action_lst.page(reverse=True, limit=2)) == [actions[6], actions[5]]
+
+
+def test_action_list_page_sorted_matches_full_sort(task1: Task, task2: Task):
+    actions = [
+        Action(
+            datetime(2024, 1, (d * 5) % 11 + 1, tzinfo=UTC), t, actor=f"actor {d % 3}"
+        )
+        for d in range(10)
+        for t in (task1, task2)
+    ]
+    action_lst = ActionLister(actions)
+
+    by_time = sorted(actions, key=lambda a: a.timestamp)
+    assert list(action_lst.page(ActionSort.TIMESTAMP, limit=4)) == by_time[:4]
+    assert list(action_lst.page("timestamp", offset=4, limit=4)) == by_time[4:8]
+    newest = sorted(actions, key=lambda a: a.timestamp, reverse=True)
+    newest_page = action_lst.page(ActionSort.TIMESTAMP, reverse=True, limit=5)
+    assert list(newest_page) == newest[:5]
+
+    by_actor = sorted(actions, key=lambda a: (a.actor, a.timestamp))
+    assert list(action_lst.page(ActionSort.ACTOR)) == by_actor
+    assert list(action_lst.page(ActionSort.ACTOR, offset=3, limit=100)) == by_actor[3:]
+
+
 def test_task_replace_single_field(task1: Task):
     updated_task = task1.replace(changes={"description": "new description"})
     assert updated_task.description == "new description"
@@ -448,3 +485,65 @@ def test_task_get_all_programmed_times_break(task1):
 def test_task_lister_get_task_by_name_not_found(task1):
     lister = TaskLister([task1])
     assert lister.get_task_by_name("non-existent task") is None
+
+
+def test_task_lister_name_index_follows_changes(task1, task2):
+    import copy
+
+    lister = TaskLister([task1])
+    lister.insert(0, task2)
+    assert lister.get_task_by_name(task2.name) is task2
+    with pytest.raises(TaskWithSameNameError):
+        lister.insert(0, task2)
+
+    lister.remove(task1)
+    assert lister.get_task_by_name(task1.name) is None
+    lister.append(task1)  # the name is free again
+
+    copied = copy.copy(lister)
+    copied.pop()
+    assert lister.get_task_by_name(task1.name) is task1
+    assert copied.get_task_by_name(task1.name) is None
+
+    lister.data = [task1]  # as when loading from a file
+    assert lister.get_task_by_name(task2.name) is None
+    lister[0] = task2
+    assert lister.get_task_by_name(task1.name) is None
+    assert lister.get_task_by_name(task2.name) is task2
+    del lister[0]
+    assert lister.get_task_by_name(task2.name) is None
+
+
+def test_iter_programmed_times_matches_get_programmed_time(task1: Task):
+    start = datetime(2024, 1, 1, 10, 0, tzinfo=UTC)
+    end = datetime(2024, 1, 1, 13, 32, tzinfo=UTC)
+
+    times = list(task1.iter_programmed_times(start, end))
+
+    assert times == [datetime(2024, 1, 1, h, 32, tzinfo=UTC) for h in (10, 11, 12, 13)]
+    assert times[0] == task1.get_programmed_time(1, when=start)
+    # before the task starts, the first time is the start time
+    early = task1.iter_programmed_times(datetime(2020, 1, 1, tzinfo=UTC))
+    assert next(early) == task1.start_time
+
+
+def test_iter_programmed_times_single_run_and_unscheduled():
+    one_off = Task("once", start_time=datetime(2024, 1, 5, tzinfo=UTC), interval=None)
+    start = datetime(2024, 1, 1, tzinfo=UTC)
+
+    assert list(one_off.iter_programmed_times(start)) == [one_off.start_time]
+    assert list(one_off.iter_programmed_times(start, start)) == []
+    assert list(Task("never").iter_programmed_times(start)) == []
+
+
+def test_iter_agenda_merges_tasks_in_time_order(task1: Task, task2: Task):
+    tasks = TaskLister([task1, task2])
+    start = datetime(2024, 1, 1, 10, 0, tzinfo=UTC)
+
+    agenda = tasks.iter_agenda(start)  # without an end, the agenda is endless
+    first = list(itertools.islice(agenda, 6))
+
+    assert [t for t, _ in first] == [task2, task1, task2, task2, task1, task2]
+    assert [when for _, when in first] == sorted(when for _, when in first)
+    # same instant: task list order
+    assert first[1][1] == first[2][1] == datetime(2024, 1, 1, 10, 32, tzinfo=UTC)
@@ -0,0 +1,167 @@
+import threading
+from datetime import datetime, timedelta, UTC
+
+import pytest
+from typer.testing import CliRunner
+
+import app
+import cli
+import daemon
+from core import Action, ActionLister, Task, TaskLister, TaskWithSameNameError
+from errors import DaemonError, TaskNotFoundError
+from main import typer_app
+from maintenance_tracker import ActionRecordResults, MaintenanceTracker
+
+pytestmark = pytest.mark.skipif(
+    not daemon.unix_sockets_supported(), reason="needs Unix-domain sockets"
+)
+
+
+@pytest.fixture(scope="function")
+def task1():
+    return Task(
+        name="my first task",
+        description="a description for my task1",
+        start_time=datetime(2023, 12, 24, 17, 32, tzinfo=UTC),
+        interval=timedelta(minutes=60),
+    )
+
+
+def _start_server(data_dir):
+    """Starts a daemon for data_dir in a background thread and returns it."""
+    app.tracker = MaintenanceTracker(load=True, save_dir=str(data_dir))
+    server = daemon.TrackerServer(daemon.default_socket_path(data_dir))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = _start_server(tmp_path)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(server):
+    client = daemon.connect(server.socket_path)
+    assert client is not None
+    yield client
+    client.close()
+
+
+def test_connect_without_daemon_returns_none(tmp_path):
+    assert daemon.connect(daemon.default_socket_path(tmp_path)) is None
+
+    # a stale socket file left behind by a crashed daemon is not a running daemon
+    (tmp_path / daemon.DEFAULT_SOCKET_FILE).write_text("")
+    assert daemon.connect(daemon.default_socket_path(tmp_path)) is None
+
+
+def test_client_round_trips_domain_objects(client, task1):
+    client.register_task(task1)
+
+    assert client.get_task_by_name(task1.name) == task1
+    all_tasks = client.get_all_tasks()
+    assert isinstance(all_tasks, TaskLister)
+    assert list(all_tasks) == [task1]
+
+    timestamp = datetime(2024, 1, 1, 10, 0, tzinfo=UTC)
+    result = client.record_run(task1.name, timestamp, "first", "me")
+    assert result == ActionRecordResults.SUCCESS
+
+    actions = client.get_actions_for_task_filtered(task1.name)
+    assert isinstance(actions, ActionLister)
+    assert actions[0] == Action(timestamp, task1, "first", actor="me")
+
+    next_runs = client.get_next_runs(at=timestamp)
+    assert next_runs[0][0] == task1
+
+    agenda = client.get_agenda(timestamp, limit=2)
+    assert [tuple(o) for o in agenda] == list(app.get_agenda(timestamp, limit=2))
+
+    (status,) = client.get_dashboard(timestamp)
+    assert status == app.get_dashboard(timestamp)[0]
+    assert status.last_run == actions[0]
+
+
+def test_daemon_saves_to_its_data_dir(client, tmp_path, task1):
+    client.register_task(task1)
+    client.record_run(task1.name, datetime(2024, 1, 1, tzinfo=UTC))
+
+    reloaded = MaintenanceTracker(load=True, save_dir=str(tmp_path))
+    assert reloaded.task_list.get_task_by_name(task1.name) == task1
+    assert len(reloaded.action_list) == 1
+
+
+def test_client_reraises_operation_errors(client):
+    with pytest.raises(TaskNotFoundError):
+        client.record_run("missing task")
+
+    with pytest.raises(AttributeError):
+        client.not_an_operation
+
+    with pytest.raises(DaemonError):
+        client.call("save")
+
+    error = daemon._rebuild_exception("TaskWithSameNameError", "'a' already exist")
+    assert isinstance(error, TaskWithSameNameError)
+
+
+def test_idle_connection_does_not_block_other_clients(server, task1):
+    idle = daemon.connect(server.socket_path)
+    assert idle is not None
+    try:
+        # idle keeps its connection open while another client is served
+        other = daemon.connect(server.socket_path)
+        assert other is not None
+        other.register_task(task1)
+        assert idle.get_task_by_name(task1.name) == task1
+        other.close()
+    finally:
+        idle.close()
+
+
+def test_daemon_keeps_repository_stats(client, task1):
+    client.register_task(task1)
+    client.record_run(task1.name, datetime(2024, 1, 1, tzinfo=UTC))
+
+    stats = client.get_stats()
+    assert stats["counters"]["tasks.add"] == 1
+    assert stats["counters"]["actions.add"] == 1
+    assert stats["latencies"]["tasks.save"]["count"] == 2
+    assert stats["latencies"]["actions.save"]["count"] == 2
+
+
+def test_daemon_reloads_files_changed_by_other_processes(client, tmp_path, task1):
+    assert len(client.get_all_tasks()) == 0
+
+    other = MaintenanceTracker(load=True, save_dir=str(tmp_path))
+    other.register_task(task1)
+    other.save()
+
+    assert client.get_task_by_name(task1.name) == task1
+
+
+def test_cli_uses_running_daemon(tmp_path, monkeypatch, task1):
+    monkeypatch.setattr(cli, "app", app)
+    config_dir = tmp_path / "config"
+    config_dir.mkdir()
+    server = _start_server(config_dir)
+    try:
+        app.register_task(task1)
+
+        result = CliRunner().invoke(
+            typer_app, ["--config-dir", str(config_dir), "list", "tasks"]
+        )
+
+        assert result.exit_code == 0
+        assert task1.name in result.stdout
+        assert isinstance(cli.app, daemon.DaemonClient)
+    finally:
+        if isinstance(cli.app, daemon.DaemonClient):
+            cli.app.close()
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,93 @@
+"""Memory budgets of the loaded data: fails when a change makes every Task or Action
+take noticeably more memory once MaintenanceTracker(load=True) is done."""
+
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+import footprint
+from benchmarks.generate import generate
+from main import typer_app
+
+N_TASKS = 50
+N_ACTIONS = 5_000
+# measured at 200-230 bytes per action and 350-370 per task (Python 3.13, 64 bits)
+BYTES_PER_ACTION_BUDGET = 300
+BYTES_PER_TASK_BUDGET = 600
+
+
+@pytest.fixture(scope="module")
+def data_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp("data")
+    generate(str(path), N_TASKS, N_ACTIONS, seed=1)
+    return path
+
+
+@pytest.fixture
+def default_config():
+    """Resets the global DEFAULT_CONFIG_ENTRIES left over by other tests."""
+    import config as config_module
+
+    config_module.DEFAULT_CONFIG_ENTRIES["data_dir"] = "."
+    config_module.DEFAULT_CONFIG_ENTRIES["debug_logging"] = False
+
+
+def test_loaded_objects_stay_within_budget(data_dir):
+    measured = footprint.measure_load(str(data_dir))
+
+    assert (measured.tasks, measured.actions) == (N_TASKS, N_ACTIONS)
+    assert measured.peak_bytes >= measured.task_bytes + measured.action_bytes
+    assert measured.bytes_per_action <= BYTES_PER_ACTION_BUDGET
+    assert measured.bytes_per_task <= BYTES_PER_TASK_BUDGET
+
+
+def test_loaded_actions_share_their_tasks(data_dir):
+    from maintenance_tracker import MaintenanceTracker
+
+    tracker = MaintenanceTracker(load=True, save_dir=str(data_dir))
+    assert len({id(a.ref_task) for a in tracker.action_list}) <= N_TASKS
+    assert len({id(a.timestamp.tzinfo) for a in tracker.action_list}) == 1
+
+
+def test_dev_memory_command(data_dir, tmp_path, default_config):
+    result = CliRunner().invoke(
+        typer_app,
+        [
+            "--config-dir",
+            str(tmp_path / "config"),
+            "dev",
+            "memory",
+            "--data-dir",
+            str(data_dir),
+            "--top",
+            "3",
+            "-o",
+            "json",
+        ],
+    )
+
+    assert result.exit_code == 0
+    record = json.loads(result.stdout)
+    assert record["actions"] == N_ACTIONS
+    assert record["bytes_per_action"] > 0
+    assert len(record["top"]) == 3
+
+
+def test_dev_memory_does_not_create_missing_data_files(tmp_path, default_config):
+    missing = tmp_path / "typo"
+    result = CliRunner().invoke(
+        typer_app,
+        [
+            "--config-dir",
+            str(tmp_path / "config"),
+            "dev",
+            "memory",
+            "--data-dir",
+            str(missing),
+        ],
+    )
+
+    assert result.exit_code == 1
+    assert "no data files" in result.stdout
+    assert not missing.exists()
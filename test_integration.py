@@ -120,3 +120,35 @@ def test_edit_action_failure_branch(monkeypatch, task1):
 
     res = mt.edit_action(task1.name, a.timestamp.isoformat(), new_actor="nobody")
     assert res is None
+
+
+def test_concurrent_processes_recording_runs_keep_every_action(tmp_path):
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    root = Path(__file__).parent
+    config_dir = tmp_path / "config"
+
+    def mtnt(*args: str) -> subprocess.Popen:
+        return subprocess.Popen(
+            [
+                sys.executable,
+                str(root / "main.py"),
+                "--config-dir",
+                str(config_dir),
+                "--no-daemon",
+                *args,
+            ],
+            cwd=root,
+            stdout=subprocess.DEVNULL,
+        )
+
+    assert mtnt("add", "task", "shared", "2024-01-01", "1 day").wait() == 0
+    recorders = [mtnt("record", "run", "shared", f"actor{i}") for i in range(8)]
+    assert [p.wait() for p in recorders] == [0] * 8
+
+    tracker = MaintenanceTracker(load=True, save_dir=str(config_dir))
+    assert sorted(a.actor for a in tracker.action_list) == [
+        f"actor{i}" for i in range(8)
+    ]
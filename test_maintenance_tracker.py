@@ -1,7 +1,17 @@
 import pytest
 from core import *
 from maintenance_tracker import *
-from datetime import datetime, timedelta, UTC
+from datetime import datetime, timedelta, timezone, UTC
+from unittest.mock import patch
+
+from errors import (
+    ArchivedActionError,
+    ConcurrentModificationError,
+    DanglingActionsError,
+    DuplicateTaskError,
+)
+from repository import ActionRollups
+import utils
 
 
 # Local fixtures (each test file owns the fixtures it needs)
@@ -118,6 +128,61 @@ def test_check_overdue_has_action_is_overdue(task1, action1_t1, action2_t1):
     assert mtnt.check_overdue(task1, when=when) is True
 
 
+def test_dashboard_matches_per_task_checks(task1, task2, task3, action1_t1, action2_t1):
+    mtnt = MaintenanceTracker()
+    for t in (task1, task2, task3):
+        mtnt.register_task(t)
+    mtnt.record_run(action1_t1)
+    mtnt.record_run(action2_t1)
+    mtnt.record_run(Action(datetime(2024, 1, 2, 6, 20, tzinfo=UTC), task3, "t3"))
+    # an action after "when" is ignored
+    mtnt.record_run(Action(datetime(2024, 1, 5, tzinfo=UTC), task2, "later"))
+
+    when = datetime(2024, 1, 2, 6, 33, tzinfo=UTC)
+    statuses = mtnt.dashboard(when)
+
+    assert [s.task for s in statuses] == [task1, task2, task3]
+    for status in statuses:
+        assert status.overdue == mtnt.check_overdue(status.task, when)
+        assert status.last_run == mtnt.get_latest_task_run(status.task, when)
+        assert status.next_run == status.task.get_programmed_time(1, when)
+        assert status.last_programmed == status.task.get_programmed_time(-1, when)
+    assert [s.overdue for s in statuses] == [True, True, False]
+    assert statuses[1].last_run is None
+
+
+def test_rank_overdue_by_lateness_and_missed_runs():
+    start = datetime(2024, 1, 1, tzinfo=UTC)
+    hourly = Task("hourly", start_time=start, interval=timedelta(hours=1))
+    daily = Task("daily", start_time=start, interval=timedelta(days=1))
+    once = Task("once", start_time=start + timedelta(hours=3), interval=None)
+    on_time = Task("on time", start_time=start, interval=timedelta(days=7))
+    mtnt = MaintenanceTracker()
+    for t in (hourly, daily, once, on_time):
+        mtnt.register_task(t)
+    mtnt.record_run(Action(start + timedelta(hours=20), hourly))
+    mtnt.record_run(Action(start + timedelta(hours=1), on_time))
+
+    when = start + timedelta(days=1, hours=4, minutes=30)
+    ranking = mtnt.rank_overdue(when)
+
+    assert [o.task for o in ranking] == [daily, once, hourly]
+    daily_status, once_status, hourly_status = ranking
+    assert daily_status.first_missed == start
+    assert daily_status.missed_runs == 2
+    assert daily_status.lateness == when - start
+    assert once_status.missed_runs == 1
+    assert hourly_status.first_missed == start + timedelta(hours=21)
+    assert hourly_status.missed_runs == 8  # 21:00 to 04:00 the next day
+
+    by_missed = mtnt.rank_overdue(when, top=2, by=OverdueRank.MISSED)
+    assert [o.task for o in by_missed] == [hourly, daily]
+    assert mtnt.rank_overdue(when, top=1) == ranking[:1]
+    assert {o.task for o in ranking} == {
+        t for t in mtnt.task_list if mtnt.check_overdue(t, when)
+    }
+
+
 def test_time_since_last_exec_with_runs(task1, action1_t1, action2_t1):
     mtnt = MaintenanceTracker()
     mtnt.register_task(task1)
@@ -237,3 +302,444 @@ def test_get_actions_for_task_time_filter(task1, action1_t1, action2_t1):
     actions = mtnt.get_actions_for_task(task1, start_time=start_time, end_time=end_time)
     assert len(actions) == 1
     assert actions[0] == action2_t1
+
+
+def test_transaction_defers_and_coalesces_saves(task1, task2, action1_t1):
+    mt = MaintenanceTracker()
+    with (
+        patch.object(mt, "task_list_saver") as task_saver,
+        patch.object(mt, "action_list_saver") as action_saver,
+    ):
+        with mt.transaction():
+            mt.register_task(task1)
+            mt.save()
+            with mt.transaction():
+                mt.register_task(task2)
+                mt.record_run(action1_t1)
+                mt.save()
+            task_saver.save.assert_not_called()
+
+        task_saver.save.assert_called_once()
+        action_saver.save.assert_called_once()
+
+        # a transaction without changes does not write anything
+        with mt.transaction():
+            mt.get_actions_for_task(task1)
+        task_saver.save.assert_called_once()
+
+
+def test_transaction_rolls_back_on_exception(task1, task2, action1_t1, action2_t1):
+    mt = MaintenanceTracker()
+    mt.register_task(task1)
+    mt.register_task(task2)
+    mt.record_run(action1_t1)
+    mt.record_run(action2_t1)
+    tasks_before = list(mt.task_list)
+    actions_before = list(mt.action_list)
+
+    with patch.object(mt, "task_list_saver") as task_saver:
+        with pytest.raises(RuntimeError):
+            with mt.transaction():
+                mt.delete_run(action1_t1)
+                mt.record_run(
+                    Action(datetime(2024, 2, 1, tzinfo=UTC), Task("brand new"), "x")
+                )
+                mt.delete_run(action2_t1)
+                mt.delete_task(task1)
+                raise RuntimeError("boom")
+        task_saver.save.assert_not_called()
+
+    # same contents, in the same order
+    assert list(mt.task_list) == tasks_before
+    assert list(mt.action_list) == actions_before
+    assert mt.action_repo.rollups.days == ActionRollups(actions_before).days
+
+
+def test_delete_runs_removes_in_one_pass_and_rolls_back_in_place(task1, task2):
+    mt = MaintenanceTracker()
+    actions = [
+        Action(datetime(2024, 1, 1, i, tzinfo=UTC), task1 if i % 2 else task2)
+        for i in range(6)
+    ]
+    for a in actions:
+        mt.record_run(a)
+
+    with pytest.raises(RuntimeError):
+        with mt.transaction(), patch.object(mt, "save"):
+            assert mt.delete_runs(mt.get_actions_for_task(task1)) == 3
+            assert list(mt.action_list) == actions[::2]
+            raise RuntimeError("boom")
+
+    assert list(mt.action_list) == actions
+    assert mt.action_repo.rollups.days == ActionRollups(actions).days
+    with pytest.raises(ValueError):
+        mt.delete_runs([Action(datetime(2024, 1, 1, tzinfo=UTC), task2)])
+
+
+def test_nested_transaction_failure_only_rolls_back_inner_changes(task1, task2):
+    mt = MaintenanceTracker()
+    with (
+        patch.object(mt, "task_list_saver") as task_saver,
+        patch.object(mt, "action_list_saver"),
+    ):
+        with mt.transaction():
+            mt.register_task(task1)
+            with pytest.raises(DuplicateTaskError):
+                with mt.transaction():
+                    mt.register_task(task2)
+                    mt.register_task(task1)
+        task_saver.save.assert_called_once()
+
+    assert [t.name for t in mt.task_list] == [task1.name]
+
+
+def test_edit_task_rolls_back_half_moved_task(task1, action1_t1, action2_t1):
+    mt = MaintenanceTracker()
+    mt.register_task(task1)
+    mt.record_run(action1_t1)
+    mt.record_run(action2_t1)
+
+    with patch.object(
+        MaintenanceTracker,
+        "delete_task",
+        side_effect=DanglingActionsError("cannot delete"),
+    ):
+        with pytest.raises(DanglingActionsError):
+            mt.edit_task(task1, {"name": "renamed"})
+
+    assert [t.name for t in mt.task_list] == [task1.name]
+    assert list(mt.action_list) == [action1_t1, action2_t1]
+
+
+def test_compliance_matches_runs_to_programmed_times():
+    start = datetime(2024, 1, 1, tzinfo=UTC)
+    daily = Task("daily", start_time=start, interval=timedelta(days=1))
+    never_run = Task("never run", start_time=start, interval=timedelta(days=2))
+    later = Task(
+        "later", start_time=start + timedelta(days=30), interval=timedelta(days=1)
+    )
+    mtnt = MaintenanceTracker()
+    for t in (daily, never_run, later):
+        mtnt.register_task(t)
+    # recorded out of order; two runs in the same slot only satisfy it once
+    for days, hours in [(4, 23), (0, 1), (1, 5), (3, 2), (3, 0)]:
+        mtnt.record_run(Action(start + timedelta(days=days, hours=hours), daily))
+
+    end = start + timedelta(days=6, hours=1)
+    stats = mtnt.compliance(start, end, grace=timedelta(hours=2))
+
+    # tasks without programmed times in the period are left out
+    assert [s.task for s in stats] == [daily, never_run]
+    daily_stats, never_stats = stats
+    # days 0 to 5; day 6 is still open at the end of the period
+    assert (daily_stats.due, daily_stats.on_time, daily_stats.late) == (6, 2, 2)
+    assert daily_stats.missed == 2  # days 2 and 5
+    assert daily_stats.on_time_rate == pytest.approx(2 / 6)
+    assert daily_stats.mean_lateness == timedelta(hours=(1 + 5 + 0 + 23) / 4)
+    assert daily_stats.p95_lateness == timedelta(hours=23)
+
+    assert (never_stats.due, never_stats.missed) == (3, 3)
+    assert never_stats.mean_lateness is None
+
+    # without grace, any run before the next programmed time is on time
+    (lenient,) = mtnt.compliance(start, end, tasks=[daily])
+    assert (lenient.on_time, lenient.late) == (4, 0)
+
+
+def test_overdue_history_matches_check_overdue_at_every_step(task1, task2, task3):
+    mtnt = MaintenanceTracker()
+    start = datetime(2024, 1, 1, tzinfo=UTC)
+    once = Task("once", start_time=start + timedelta(hours=3), interval=None)
+    for t in (task1, task2, task3, once):
+        mtnt.register_task(t)
+    for hours in (0.5, 1.5, 2, 4.25):
+        mtnt.record_run(Action(start + timedelta(hours=hours), task1))
+    mtnt.record_run(Action(datetime(2024, 1, 1, 2, 2, tzinfo=UTC), task2))
+    mtnt.record_run(Action(datetime(2024, 1, 1, 5, 0, tzinfo=UTC), once))
+    # before the period: sets the state at the start
+    mtnt.record_run(Action(datetime(2023, 12, 31, 23, 55, tzinfo=UTC), task3))
+
+    end = datetime(2024, 1, 1, 6, 0, tzinfo=UTC)
+    # a step of 1 minute lands on programmed times and on runs
+    history = mtnt.overdue_history(start, end, timedelta(minutes=1))
+
+    assert len(history) == 6 * 60 + 1
+    assert history[0][0] == start and history[-1][0] == end
+    for at, tasks in history:
+        expected = [t for t in mtnt.task_list if mtnt.check_overdue(t, at)]
+        assert list(tasks) == expected, at
+
+    with pytest.raises(ValueError):
+        mtnt.overdue_history(start, end, timedelta(0))
+
+
+def _activity_tracker(task1, task2) -> MaintenanceTracker:
+    mtnt = MaintenanceTracker()
+    mtnt.register_task(task1)
+    mtnt.register_task(task2)
+    # Mon 2024-01-01 .. Thu 2024-02-01, the last one on the previous UTC day
+    for when, task, actor in (
+        (datetime(2024, 1, 1, 8, 0, tzinfo=UTC), task1, "ann"),
+        (datetime(2024, 1, 1, 9, 0, tzinfo=UTC), task2, "bob"),
+        (datetime(2024, 1, 3, 9, 0, tzinfo=UTC), task1, "ann"),
+        (datetime(2024, 1, 8, 9, 0, tzinfo=UTC), task1, "bob"),
+        (datetime(2024, 2, 1, 1, 0, tzinfo=timezone(timedelta(hours=3))), task2, "ann"),
+    ):
+        mtnt.record_run(Action(when, task, actor=actor))
+    return mtnt
+
+
+def test_activity_counts_actions_per_period(task1, task2):
+    mtnt = _activity_tracker(task1, task2)
+
+    days = mtnt.activity(ActivityPeriod.DAY)
+    assert [(c.label, c.count) for c in days] == [
+        ("2024-01-01", 2),
+        ("2024-01-03", 1),
+        ("2024-01-08", 1),
+        ("2024-01-31", 1),
+    ]
+    weeks = mtnt.activity(ActivityPeriod.WEEK)
+    assert [(c.label, c.count) for c in weeks] == [
+        ("2024-W01", 3),
+        ("2024-W02", 1),
+        ("2024-W05", 1),
+    ]
+    months = mtnt.activity(ActivityPeriod.MONTH, by_actor=True, by_task=True)
+    assert [(c.label, c.actor, c.task, c.count) for c in months] == [
+        ("2024-01", "ann", task1.name, 2),
+        ("2024-01", "ann", task2.name, 1),
+        ("2024-01", "bob", task1.name, 1),
+        ("2024-01", "bob", task2.name, 1),
+    ]
+    assert MaintenanceTracker().activity() == []
+
+
+def test_activity_numpy_path_matches_python_path(task1, task2):
+    pytest.importorskip("numpy")
+    import maintenance_tracker
+
+    mtnt = _activity_tracker(task1, task2)
+    for by in ActivityPeriod:
+        expected = mtnt.activity(by, by_actor=True, by_task=True)
+        with patch.object(maintenance_tracker, "NUMPY_MIN_ACTIONS", 1):
+            assert mtnt.activity(by, by_actor=True, by_task=True) == expected
+
+
+def test_period_queries_follow_edits(task1, task2, action1_t1, action2_t1):
+    mtnt = MaintenanceTracker()
+    mtnt.register_task(task1)
+    mtnt.register_task(task2)
+    mtnt.record_run(action1_t1)
+    mtnt.record_run(action2_t1)
+    year = utils.parse_partial_timestamp("2024")
+
+    assert mtnt.count_actions_by_time(*year) == 2
+    assert [t.name for t in mtnt.get_tasks_by_time(*year)] == [task1.name]
+
+    mtnt.edit_action(
+        task1.name, action1_t1.timestamp.isoformat(), new_task_name=task2.name
+    )
+    assert mtnt.count_actions_by_time(*year, task=task2) == 1
+    assert [t.name for t in mtnt.get_tasks_by_time(*year)] == [task1.name, task2.name]
+
+    renamed = mtnt.edit_task(task1, {"name": "renamed"})
+    assert mtnt.count_actions_by_time(*year, task=renamed) == 1
+    assert [t.name for t in mtnt.get_tasks_by_time(*year)] == [task2.name, "renamed"]
+
+
+def test_tracker_keeps_backups_of_its_files(tmp_path, task1, task2):
+    tracker = MaintenanceTracker(save_dir=str(tmp_path), keep_backups=1)
+    tracker.register_task(task1)
+    tracker.save()
+    tracker.register_task(task2)
+    tracker.save()
+
+    for saver in (tracker.task_list_saver, tracker.action_list_saver):
+        assert saver.keep_backups == 1
+        assert saver.backup_path(1).exists()
+    previous = MaintenanceTracker(
+        load=True, save_dir=str(tmp_path), save_task_file="task_list.json.1"
+    )
+    assert list(previous.task_list) == [task1]
+
+
+def test_concurrent_trackers_do_not_lose_each_others_actions(tmp_path, task1):
+    MaintenanceTracker(save_dir=str(tmp_path)).save()
+    first = MaintenanceTracker(load=True, save_dir=str(tmp_path))
+    second = MaintenanceTracker(load=True, save_dir=str(tmp_path))
+    when = datetime(2024, 1, 1, 8, tzinfo=UTC)
+
+    first.record_run(Action(when, task1, actor="first"))
+    first.save()
+    second.record_run(Action(when + timedelta(hours=1), task1, actor="second"))
+    second.save()
+
+    day = utils.parse_partial_timestamp("2024-01-01")
+    assert second.count_actions_by_time(*day) == 2
+    reloaded = MaintenanceTracker(load=True, save_dir=str(tmp_path))
+    assert list(reloaded.task_list) == [task1]
+    assert sorted(a.actor for a in reloaded.action_list) == ["first", "second"]
+
+
+def test_recording_a_run_for_a_task_deleted_by_another_tracker_fails(tmp_path, task1):
+    setup = MaintenanceTracker(load=True, save_dir=str(tmp_path))
+    setup.register_task(task1)
+    setup.save()
+    deleting = MaintenanceTracker(load=True, save_dir=str(tmp_path))
+    recording = MaintenanceTracker(load=True, save_dir=str(tmp_path))
+
+    deleting.delete_task(task1)
+    deleting.save()
+    recording.record_run(Action(datetime(2024, 1, 1, tzinfo=UTC), task1))
+    with pytest.raises(ConcurrentModificationError):
+        recording.save()
+
+    reloaded = MaintenanceTracker(load=True, save_dir=str(tmp_path))
+    assert list(reloaded.task_list) == []
+    assert list(reloaded.action_list) == []
+
+
+def test_journaled_tracker_appends_actions_and_compacts(tmp_path, task1):
+    tracker = MaintenanceTracker(
+        load=True, save_dir=str(tmp_path), journal_actions=True
+    )
+    tracker.register_task(task1)
+    tracker.save()
+    snapshot = tracker.action_list_saver.save_path.read_bytes()
+
+    when = datetime(2024, 1, 1, tzinfo=UTC)
+    for hours in range(3):
+        tracker.record_run(Action(when + timedelta(hours=hours), task1))
+    tracker.save()
+    tracker.delete_run(tracker.action_list[0])
+    tracker.save()
+    assert tracker.action_list_saver.save_path.read_bytes() == snapshot
+
+    reloaded = MaintenanceTracker(load=True, save_dir=str(tmp_path))
+    assert len(reloaded.action_list) == 2
+    assert reloaded.count_actions_by_time(*utils.parse_partial_timestamp("2024")) == 2
+
+    assert tracker.compact() == 4
+    assert not tracker.action_list_saver.journal_path.exists()
+    assert len(MaintenanceTracker(load=True, save_dir=str(tmp_path)).action_list) == 2
+
+
+def test_retention_policy_archives_old_actions_when_saving(tmp_path, task1):
+    tracker = MaintenanceTracker(
+        load=True, save_dir=str(tmp_path), archive_after=timedelta(days=365)
+    )
+    tracker.register_task(task1)
+    now = datetime.now(UTC)
+    for days in range(0, 1000, 100):
+        tracker.record_run(Action(now - timedelta(days=days), task1))
+
+    with patch("maintenance_tracker.ARCHIVE_MIN_ACTIONS", 7):
+        tracker.save()
+        assert len(tracker.action_list) == 10  # 6 due, fewer than 7
+        tracker.record_run(Action(now - timedelta(days=1500), task1))
+        tracker.save()
+    assert len(tracker.action_list) == 4
+
+    reloaded = MaintenanceTracker(load=True, save_dir=str(tmp_path))
+    assert len(reloaded.get_actions_for_task(task1)) == 11
+    assert reloaded.get_latest_task_run(task1).timestamp == now
+    oldest = reloaded.get_actions_for_task(task1, ordered=Ordering.ASC)[0]
+    with pytest.raises(ArchivedActionError):
+        reloaded.delete_run(oldest)
+
+
+def _archived_history(tmp_path, task1) -> MaintenanceTracker:
+    """A tracker with 10 runs of task1, 100 days apart, all but the latest archived"""
+    tracker = MaintenanceTracker(load=True, save_dir=str(tmp_path))
+    tracker.register_task(task1)
+    now = datetime.now(UTC)
+    for days in range(0, 1000, 100):
+        tracker.record_run(Action(now - timedelta(days=days), task1))
+    tracker.save()
+    assert tracker.archive(timedelta(days=1)) == 9
+    return tracker
+
+
+def test_renaming_a_task_keeps_its_archived_actions(tmp_path, task1):
+    tracker = _archived_history(tmp_path, task1)
+    segments = {
+        p.name: p.read_bytes() for p in tracker.action_repo.archive.path.glob("*.gz")
+    }
+
+    renamed = tracker.edit_task(task1, {"name": "renamed"})
+    assert len(tracker.get_actions_for_task(renamed)) == 10
+    # whole days, counted from the rollups
+    everything = (
+        datetime(1970, 1, 1, tzinfo=UTC),
+        datetime(2099, 12, 31, 23, 59, 59, 999999, tzinfo=UTC),
+    )
+    assert tracker.count_actions_by_time(*everything, renamed) == 10
+    assert tracker.count_actions_by_time(*everything, task1) == 0
+    tracker.save()
+
+    reloaded = MaintenanceTracker(load=True, save_dir=str(tmp_path))
+    assert reloaded.task_list.get_task_by_name(task1.name) is None
+    actions = reloaded.get_actions_for_task(renamed)
+    assert len(actions) == 10
+    assert all(a.ref_task == renamed for a in actions)
+    # the segments are not rewritten, the manifest records the new task
+    assert {
+        p.name: p.read_bytes() for p in tracker.action_repo.archive.path.glob("*.gz")
+    } == segments
+
+    # renaming again goes through the recorded task
+    again = reloaded.edit_task(renamed, {"name": "again"})
+    reloaded.save()
+    final = MaintenanceTracker(load=True, save_dir=str(tmp_path))
+    assert len(final.get_actions_for_task(again)) == 10
+
+
+def test_failed_rename_restores_the_archived_actions(tmp_path, task1):
+    tracker = _archived_history(tmp_path, task1)
+
+    with pytest.raises(RuntimeError):
+        with tracker.transaction():
+            tracker.edit_task(task1, {"name": "renamed"})
+            raise RuntimeError("boom")
+
+    assert len(tracker.get_actions_for_task(task1)) == 10
+    assert tracker.task_list.get_task_by_name("renamed") is None
+    assert not tracker.action_repo.archive._pending
+
+
+def test_reports_include_archived_actions(tmp_path):
+    tracker = MaintenanceTracker(load=True, save_dir=str(tmp_path))
+    weekly = Task(
+        "weekly", start_time=datetime(2020, 1, 1, tzinfo=UTC), interval=timedelta(7)
+    )
+    tracker.register_task(weekly)
+    # every third week is missed, every fourth run is a day late
+    for week in range(104):
+        if week % 3:
+            delay = timedelta(days=1 if week % 4 == 0 else 0, hours=1)
+            tracker.record_run(
+                Action(weekly.start_time + timedelta(7 * week) + delay, weekly)
+            )
+    tracker.save()
+
+    def reports(tracker: MaintenanceTracker) -> tuple:
+        in_2020 = (datetime(2020, 1, 1, tzinfo=UTC), datetime(2020, 12, 31, tzinfo=UTC))
+        return (
+            tracker.compliance(*in_2020, grace=timedelta(hours=2)),
+            tracker.activity(ActivityPeriod.MONTH),
+            tracker.overdue_history(*in_2020, timedelta(days=10)),
+            tracker.get_latest_runs(datetime(2020, 7, 1, tzinfo=UTC)),
+            tracker.dashboard(datetime(2020, 7, 1, tzinfo=UTC)),
+        )
+
+    before = reports(tracker)
+    assert tracker.archive(datetime.now(UTC) - datetime(2021, 1, 1, tzinfo=UTC)) > 0
+    assert all(a.timestamp.year == 2021 for a in tracker.action_list)
+
+    assert reports(tracker) == before
+    reloaded = MaintenanceTracker(load=True, save_dir=str(tmp_path))
+    # the latest runs are never archived: the current status reads no segment
+    reloaded.dashboard()
+    assert reloaded.action_repo.archive._decoded == {}
+    assert reports(reloaded) == before
@@ -0,0 +1,108 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+import metrics
+from core import Action, ActionLister, Task, TaskLister
+from metrics import Histogram, InMemorySink
+from repository import FileActionRepository, FileTaskRepository
+
+
+@pytest.fixture
+def sink():
+    sink = InMemorySink()
+    previous = metrics.set_sink(sink)
+    yield sink
+    metrics.set_sink(previous)
+
+
+def test_default_sink_drops_everything():
+    assert metrics.get_sink() is metrics.NULL_SINK
+    metrics.count("ignored")
+    with metrics.timed("ignored"):
+        pass
+    assert metrics.get_sink().snapshot() == {"counters": {}, "latencies": {}}
+
+
+def test_set_sink_returns_the_previous_one():
+    sink = InMemorySink()
+    assert metrics.set_sink(sink) is metrics.NULL_SINK
+    assert metrics.set_sink(None) is sink
+    assert metrics.get_sink() is metrics.NULL_SINK
+
+
+def test_histogram_percentiles_are_bucket_bounds():
+    histogram = Histogram()
+    for seconds in [0.0002] * 90 + [0.02] * 9 + [2.0]:
+        histogram.observe(seconds)
+
+    summary = histogram.summary()
+    assert summary["count"] == 100
+    assert summary["p50"] == 0.0005
+    assert summary["p95"] == 0.05
+    assert summary["max"] == 2.0
+    assert summary["mean"] == pytest.approx(summary["total"] / 100)
+    assert sum(summary["buckets"]) == 100
+
+
+def test_histogram_slowest_bucket_reports_the_max():
+    histogram = Histogram()
+    histogram.observe(7.5)
+    assert histogram.percentile(0.5) == 7.5
+    assert Histogram().percentile(0.5) == 0.0
+
+
+def test_timed_works_as_decorator_and_context_manager(sink):
+    @metrics.timed("decorated")
+    def work():
+        return 42
+
+    assert work() == 42
+    assert work() == 42
+    with metrics.timed("block"):
+        metrics.count("calls", 3)
+
+    stats = sink.snapshot()
+    assert stats["counters"] == {"calls": 3}
+    assert stats["latencies"]["decorated"]["count"] == 2
+    assert stats["latencies"]["block"]["count"] == 1
+
+    sink.reset()
+    assert sink.snapshot() == {"counters": {}, "latencies": {}}
+
+
+def test_repositories_report_operations_bytes_and_latencies(sink, tmp_path):
+    start = datetime(2024, 1, 1, tzinfo=UTC)
+    task = Task("t", start_time=start)
+    actions = [Action(start + timedelta(hours=i), task) for i in range(3)]
+    FileTaskRepository(TaskLister([task]), dirname=tmp_path).save()
+    FileActionRepository(ActionLister(actions), dirname=tmp_path).save()
+
+    task_repo = FileTaskRepository(TaskLister(), dirname=tmp_path)
+    task_repo.load()
+    action_repo = FileActionRepository(ActionLister(), dirname=tmp_path)
+    action_repo.load()
+    task_repo.get_by_name("t")
+    action_repo.get_for_task(task)
+    action_repo.get_by_time(start, start + timedelta(days=1))
+    action_repo.remove(action_repo.list()[0])
+
+    stats = sink.snapshot()
+    counters, latencies = stats["counters"], stats["latencies"]
+    assert counters["tasks.objects_decoded"] == 1
+    assert counters["actions.objects_decoded"] == 3
+    assert counters["actions.bytes_written"] == counters["actions.bytes_read"]
+    assert (
+        counters["actions.bytes_read"] == (tmp_path / "action_list.json").stat().st_size
+    )
+    assert counters["tasks.get_by_name"] == 1
+    assert counters["actions.remove"] == 1
+    for name in [
+        "tasks.save",
+        "tasks.load",
+        "actions.save",
+        "actions.load",
+        "actions.get_for_task",
+        "actions.get_by_time",
+    ]:
+        assert latencies[name]["count"] == 1
@@ -1,4 +1,5 @@
 import csv
+import io
 import json
 import datetime
 from datetime import UTC
@@ -83,3 +84,97 @@ def test_print_task_and_action_tables(capsys):
     out2 = capsys.readouterr().out
     assert "doit" in out2
     assert "TableTask" in out2
+
+
+def test_json_output_streams_same_document_as_json_dumps(capsys):
+    task = Task("Task1")
+    actions = [
+        Action(
+            timestamp=datetime.datetime(2024, 1, day, tzinfo=UTC),
+            ref_task=task,
+            name=f"run {day}",
+            actor="me",
+        )
+        for day in range(1, 4)
+    ]
+
+    # any iterable works, not only listers
+    presenters._output_action_list_json(a for a in actions)
+    out = capsys.readouterr().out
+    expected = [presenters._action_record(a) for a in actions]
+    assert out == json.dumps(expected, indent=2) + "\n"
+
+    presenters._output_task_list_json(iter([]))
+    assert capsys.readouterr().out == "[]\n"
+
+
+def test_output_ndjson(capsys):
+    t = Task(
+        "TaskNd",
+        start_time=datetime.datetime(2024, 1, 1, tzinfo=UTC),
+        interval=datetime.timedelta(days=1),
+    )
+    presenters._output_task_list_ndjson(TaskLister([t]))
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line)["name"] for line in lines] == ["TaskNd"]
+
+    actions = (
+        Action(datetime.datetime(2024, 1, day, tzinfo=UTC), t, f"a{day}")
+        for day in (1, 2)
+    )
+    presenters._output_action_list_ndjson(actions)
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line)["action_name"] for line in lines] == ["a1", "a2"]
+
+
+class _FakeTerminal:
+    def isatty(self):
+        return True
+
+
+def test_plain_table_is_used_off_terminal_and_for_large_tables(monkeypatch):
+    monkeypatch.setattr(presenters, "PLAIN_TABLE_ROW_THRESHOLD", 3)
+
+    assert presenters._use_plain_table([1], io.StringIO())
+    assert not presenters._use_plain_table([1, 2, 3], _FakeTerminal())
+    assert presenters._use_plain_table([1, 2, 3, 4], _FakeTerminal())
+    assert presenters._use_plain_table(iter([1]), _FakeTerminal())
+
+
+def test_plain_table_aligns_columns_and_streams_rows(monkeypatch):
+    monkeypatch.setattr(presenters, "WIDTH_SAMPLE_ROWS", 2)
+    rows = iter([["a", "1"], ["bbb", "22"], ["a much longer cell", "3"]])
+    out = io.StringIO()
+
+    presenters._write_plain_table("Title", ["Name", "N"], [False, True], rows, out)
+
+    assert out.getvalue().splitlines() == [
+        "Title",
+        "Name   N",
+        "----  --",
+        "a      1",
+        "bbb   22",
+        # widths come from the sample, later cells overflow instead of being cut
+        "a much longer cell   3",
+    ]
+
+
+def test_action_table_plain_output_matches_rich_cells(capsys):
+    task = Task("Task1")
+    actions = ActionLister(
+        [
+            Action(
+                datetime.datetime(2024, 1, d, tzinfo=UTC), task, f"run {d}", "", "me"
+            )
+            for d in range(1, 4)
+        ]
+    )
+
+    presenters._print_action_list_table(actions)
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == "Action List"
+    assert lines[1].split() == ["Task", "Actor", "Timestamp", "Action", "Name"]
+    assert len(lines) == 3 + len(actions)
+    assert lines[3].startswith("Task1  me")
+    assert lines[3].endswith("run 1")
@@ -0,0 +1,80 @@
+import io
+import pstats
+import time
+
+import pytest
+from typer.testing import CliRunner
+
+import profiling
+from profiling import Profiler
+
+
+@pytest.fixture(autouse=True)
+def profiling_disabled():
+    yield
+    profiling.disable()
+
+
+@pytest.fixture
+def default_config():
+    """Resets the global DEFAULT_CONFIG_ENTRIES left over by other tests."""
+    import config as config_module
+
+    config_module.DEFAULT_CONFIG_ENTRIES["data_dir"] = "."
+    config_module.DEFAULT_CONFIG_ENTRIES["debug_logging"] = False
+
+
+def test_nested_spans_are_charged_their_own_time():
+    profiler = Profiler()
+    with profiler.span("outer"):
+        time.sleep(0.02)
+        with profiler.span("inner"):
+            time.sleep(0.03)
+        with profiler.span("inner"):
+            pass
+
+    outer_seconds, outer_calls = profiler.phases["outer"]
+    inner_seconds, inner_calls = profiler.phases["inner"]
+    assert (outer_calls, inner_calls) == (1, 2)
+    assert 0.02 <= outer_seconds < 0.03
+    assert inner_seconds >= 0.03
+
+    out = io.StringIO()
+    profiler.report(out)
+    lines = out.getvalue().splitlines()
+    assert [line.split()[0] for line in lines] == [
+        "phase",
+        "inner",
+        "outer",
+        "other",
+        "total",
+    ]
+
+
+def test_span_does_nothing_unless_enabled():
+    assert profiling.span("anything") is profiling.span("something else")
+
+    profiler = profiling.enable()
+    with profiling.span("phase"):
+        pass
+    assert profiling.disable() is profiler
+    assert list(profiler.phases) == ["phase"]
+
+
+def test_profile_option_prints_the_breakdown(tmp_path, default_config):
+    from main import typer_app
+
+    prof_file = tmp_path / "mtnt.prof"
+    result = CliRunner().invoke(
+        typer_app,
+        ["--config-dir", str(tmp_path / "config"), "--profile-output", str(prof_file)]
+        + ["list", "tasks"],
+    )
+
+    assert result.exit_code == 0
+    phases = [line.split()[0] for line in result.stderr.splitlines()]
+    for phase in ("startup", "config", "json", "render", "command", "total"):
+        assert phase in phases
+    assert "load task_list.json" in result.stderr
+    assert pstats.Stats(str(prof_file)).total_calls > 0
+    assert profiling.span("after") is profiling.span("the command")
@@ -1,5 +1,7 @@
+import json
 import pytest
 from pathlib import Path
+from unittest.mock import patch
 from datetime import datetime
 
 from core import Task, Action, TaskLister, ActionLister
@@ -12,8 +14,13 @@ from repository import (
     DEFAULT_ACTION_LIST_FILE,
     FileTaskRepository,
     FileActionRepository,
+    LOCK_FILE,
+    ActionArchive,
+    data_lock,
+    fcntl,
 )
-from datetime import UTC, datetime
+from errors import ArchivedActionError, ConcurrentModificationError
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
 import pytest
 
@@ -186,3 +193,423 @@ def test_get_by_name_returns_none_when_missing(tmp_path):
     """get_by_name should return None for missing task names."""
     repo = FileTaskRepository(dirname=str(tmp_path))
     assert repo.get_by_name("nope") is None
+
+
+def test_file_action_repository_rollups_match_a_scan(tmp_path: Path):
+    import random
+    from datetime import timedelta
+
+    import utils
+
+    rng = random.Random(41)
+    tasks = [Task(name=f"t{i}") for i in range(3)]
+    start = datetime(2023, 11, 20, tzinfo=UTC)
+    actions = [
+        Action(start + timedelta(hours=rng.randrange(24 * 500)), rng.choice(tasks))
+        for _ in range(300)
+    ]
+    repo = FileActionRepository(ActionLister(actions[:200]), dirname=str(tmp_path))
+    for a in actions[200:]:
+        repo.add(a)
+    for a in actions[:50]:
+        repo.remove(a)
+    repo.insert(0, actions[0])
+
+    periods = [
+        utils.parse_partial_timestamp(p)
+        for p in ("2024", "2025", "2023-12", "2024-02", "2024-02-29", "2025-03-31")
+    ]
+    periods += [
+        (datetime.min.replace(tzinfo=UTC), datetime.max.replace(tzinfo=UTC)),
+        # not whole days, counted from the actions
+        (datetime(2024, 1, 15, 12, tzinfo=UTC), datetime(2024, 5, 2, tzinfo=UTC)),
+    ]
+    for day in range(0, 500, 7):  # whole days spanning partial and whole months
+        first = start + timedelta(days=day)
+        periods.append((first, first + timedelta(days=day % 90, microseconds=-1)))
+
+    for first, last in periods:
+        scanned = repo.get_by_time(first, last)
+        assert repo.count_by_time(first, last) == len(scanned), (first, last)
+        assert repo.count_by_time(first, last, "t1") == sum(
+            1 for a in scanned if a.ref_task.name == "t1"
+        )
+        assert repo.task_names_by_time(first, last) == {
+            a.ref_task.name for a in scanned
+        }
+
+    repo.save()
+    loaded = FileActionRepository(dirname=str(tmp_path))
+    loaded.load()
+    assert loaded.rollups.days == repo.rollups.days
+    assert loaded.rollups.months == repo.rollups.months
+
+
+def _saved_names(tmp_path: Path) -> list[str]:
+    return sorted(p.name for p in tmp_path.iterdir() if p.name != LOCK_FILE)
+
+
+def test_save_replaces_the_file_atomically(tmp_path: Path):
+    saver = TaskListPersister(TaskLister([Task(name="old")]), dirname=tmp_path)
+    saver.save()
+    saver.save_path.chmod(0o600)
+    reader = saver.save_path.open("rb")  # opened by a concurrent reader
+
+    saver.obj.append(Task(name="new"))
+    saver.save()
+
+    # the reader still gets the previous version, whole
+    assert [t.name for t in json.loads(reader.read(), cls=MtnTrackerJSONDecoder)] == [
+        "old"
+    ]
+    reader.close()
+    assert _saved_names(tmp_path) == [DEFAULT_TASK_LIST_FILE]
+    assert saver.save_path.stat().st_mode & 0o777 == 0o600
+    reloaded = TaskListPersister(TaskLister([]), dirname=tmp_path).load()
+    assert [t.name for t in reloaded] == ["old", "new"]
+
+
+@pytest.mark.parametrize("interruption", [KeyboardInterrupt, OSError])
+def test_interrupted_save_keeps_the_previous_file(tmp_path: Path, interruption):
+    saver = TaskListPersister(TaskLister([Task(name="old")]), dirname=tmp_path)
+    saver.save()
+    before = saver.save_path.read_bytes()
+
+    saver.obj.append(Task(name="new"))
+    with patch("repository.os.fsync", side_effect=interruption):
+        with pytest.raises(interruption):
+            saver.save()
+
+    assert saver.save_path.read_bytes() == before
+    assert _saved_names(tmp_path) == [DEFAULT_TASK_LIST_FILE]
+
+
+def test_save_keeps_the_last_backups(tmp_path: Path):
+    saver = TaskListPersister(TaskLister([]), dirname=tmp_path, keep_backups=2)
+    for name in ["v1", "v2", "v3", "v4"]:
+        saver.obj.append(Task(name=name))
+        saver.save()
+
+    assert _saved_names(tmp_path) == [
+        DEFAULT_TASK_LIST_FILE,
+        f"{DEFAULT_TASK_LIST_FILE}.1",
+        f"{DEFAULT_TASK_LIST_FILE}.2",
+    ]
+    for n, last in [(1, "v3"), (2, "v2")]:
+        backup = json.loads(saver.backup_path(n).read_text(), cls=MtnTrackerJSONDecoder)
+        assert backup[-1].name == last
+    assert (
+        json.loads(saver.save_path.read_text(), cls=MtnTrackerJSONDecoder)[-1].name
+        == "v4"
+    )
+
+
+def test_save_merges_the_changes_of_other_processes(tmp_path: Path):
+    task = Task(name="t")
+    x, y, z, w = (
+        Action(datetime(2024, 1, day, tzinfo=UTC), task, name)
+        for day, name in [(1, "x"), (2, "y"), (3, "z"), (4, "w")]
+    )
+    ActionListPersister(ActionLister([x, y]), dirname=tmp_path).save()
+    first = ActionListPersister(ActionLister(), dirname=tmp_path)
+    second = ActionListPersister(ActionLister(), dirname=tmp_path)
+    first.load()
+    second.load()
+
+    first.obj.remove(first.obj[0])
+    first.obj.append(z)
+    first.save()
+    second.obj.append(w)
+    second.save()
+
+    assert [a.name for a in second.obj] == ["y", "z", "w"]
+    reloaded = ActionListPersister(ActionLister(), dirname=tmp_path).load()
+    assert [a.name for a in reloaded] == ["y", "z", "w"]
+
+
+def test_merging_tasks_keeps_one_copy_and_refuses_name_clashes(tmp_path: Path):
+    TaskListPersister(TaskLister([Task(name="a")]), dirname=tmp_path).save()
+    first = TaskListPersister(TaskLister(), dirname=tmp_path)
+    second = TaskListPersister(TaskLister(), dirname=tmp_path)
+    first.load()
+    second.load()
+
+    first.obj.append(Task(name="b"))
+    first.save()
+    second.obj.append(Task(name="b"))
+    second.save()
+    assert [t.name for t in second.obj] == ["a", "b"]
+
+    first.obj.append(Task(name="c", description="first"))
+    first.save()
+    before = first.save_path.read_bytes()
+    second.obj.append(Task(name="c", description="second"))
+    with pytest.raises(ConcurrentModificationError):
+        second.save()
+    assert first.save_path.read_bytes() == before
+
+
+@pytest.mark.skipif(fcntl is None, reason="needs fcntl")
+def test_data_lock_is_shared_for_reads_and_exclusive_for_writes(tmp_path: Path):
+    def can_lock(mode: int) -> bool:
+        with (tmp_path / LOCK_FILE).open("a+b") as other:  # another open file
+            try:
+                fcntl.flock(other, mode | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            return True
+
+    with data_lock(tmp_path):
+        assert can_lock(fcntl.LOCK_SH)
+        assert not can_lock(fcntl.LOCK_EX)
+        with data_lock(tmp_path, exclusive=True):
+            with data_lock(tmp_path):
+                assert not can_lock(fcntl.LOCK_SH)
+        # back to shared
+        assert can_lock(fcntl.LOCK_SH)
+    assert can_lock(fcntl.LOCK_EX)
+
+
+def _journaled(tmp_path: Path) -> ActionListPersister:
+    persister = ActionListPersister(ActionLister(), dirname=tmp_path, journal=True)
+    persister.load()
+    return persister
+
+
+def _actions(n: int, name: str = "a") -> list[Action]:
+    task = Task(name="t")
+    return [
+        Action(datetime(2024, 1, 1 + i, tzinfo=UTC), task, f"{name}{i}")
+        for i in range(n)
+    ]
+
+
+def test_journal_appends_changes_and_replays_them(tmp_path: Path):
+    persister = _journaled(tmp_path)
+    persister.obj.extend(_actions(3))
+    persister.save()
+    snapshot = persister.save_path.read_bytes()
+
+    persister.obj.remove(persister.obj[1])
+    persister.obj.append(_actions(1, "b")[0])
+    persister.save()
+    persister.save()  # nothing changed, nothing written
+
+    assert persister.save_path.read_bytes() == snapshot
+    lines = persister.journal_path.read_text().splitlines()
+    assert [json.loads(line)["op"] for line in lines[1:]] == ["add"] * 3 + [
+        "remove",
+        "add",
+    ]
+    assert persister.journal_entries == 5
+    # replayed even when this process does not journal its own saves
+    loaded = ActionListPersister(ActionLister(), dirname=tmp_path).load()
+    assert [a.name for a in loaded] == ["a0", "a2", "b0"]
+
+
+def test_compact_folds_the_journal_into_live_actions(tmp_path: Path):
+    persister = _journaled(tmp_path)
+    persister.obj.extend(_actions(3))
+    persister.save()
+    persister.obj.remove(persister.obj[0])
+    persister.save()
+
+    assert persister.compact() == 4
+    assert not persister.journal_path.exists()
+    snapshot = json.loads(persister.save_path.read_text(), cls=MtnTrackerJSONDecoder)
+    assert [a.name for a in snapshot] == ["a1", "a2"]
+    assert persister.compact() == 0
+
+
+def test_journal_is_compacted_when_full(tmp_path: Path):
+    persister = _journaled(tmp_path)
+    with patch("repository.JOURNAL_MIN_ENTRIES", 4):
+        for action in _actions(6):
+            persister.obj.append(action)
+            persister.save()
+            assert persister.journal_entries <= 4
+
+    assert persister.journal_entries == 1  # written whole when the 5th did not fit
+    loaded = ActionListPersister(ActionLister(), dirname=tmp_path).load()
+    assert len(loaded) == 6
+
+
+def test_stale_or_torn_journals_are_ignored(tmp_path: Path):
+    persister = _journaled(tmp_path)
+    persister.obj.extend(_actions(2))
+    persister.save()
+    stale = persister.journal_path.read_bytes()
+    persister.compact()
+    # as if the process crashed between rewriting the file and deleting the journal
+    persister.journal_path.write_bytes(stale)
+    assert len(ActionListPersister(ActionLister(), dirname=tmp_path).load()) == 2
+
+    persister = _journaled(tmp_path)
+    persister.obj.append(_actions(1, "b")[0])
+    persister.save()
+    with persister.journal_path.open("ab") as f:
+        f.write(b'{"op": "add", "item": {"__ty')  # crashed mid-append
+    persister = _journaled(tmp_path)
+    assert [a.name for a in persister.obj] == ["a0", "a1", "b0"]
+    persister.obj.append(_actions(1, "c")[0])
+    persister.save()
+    loaded = ActionListPersister(ActionLister(), dirname=tmp_path).load()
+    assert [a.name for a in loaded] == ["a0", "a1", "b0", "c0"]
+
+
+def test_concurrent_journaled_saves_keep_both_changes(tmp_path: Path):
+    first, second = _journaled(tmp_path), _journaled(tmp_path)
+    first.obj.append(_actions(1, "first")[0])
+    first.save()
+    second.obj.append(_actions(1, "second")[0])
+    second.save()
+
+    assert [a.name for a in second.obj] == ["first0", "second0"]
+    loaded = ActionListPersister(ActionLister(), dirname=tmp_path).load()
+    assert [a.name for a in loaded] == ["first0", "second0"]
+
+
+def _with_history(
+    tmp_path: Path, compression: str | None = None
+) -> FileActionRepository:
+    """Actions of tasks t and u every 30 days in 2020-2023, archived before 2023"""
+    repo = FileActionRepository(dirname=str(tmp_path), archive_compression=compression)
+    repo.load()
+    t, u = Task(name="t"), Task(name="u")
+    start = datetime(2020, 1, 1, tzinfo=UTC)
+    for i in range(48):
+        repo.add(Action(start + timedelta(days=30 * i), t if i % 2 else u, f"a{i}"))
+    repo.save()
+    return repo
+
+
+@pytest.mark.parametrize("compression", ["gzip", "lzma"])
+def test_archive_moves_old_actions_to_a_compressed_segment(tmp_path: Path, compression):
+    repo = _with_history(tmp_path, compression)
+
+    assert repo.archive_before(datetime(2023, 1, 1, tzinfo=UTC)) == 37
+    (segment,) = repo.archive.segments
+    assert segment.compression == compression and segment.count == 37
+    assert (repo.archive.path / segment.filename).exists()
+    on_disk = json.loads(
+        repo.persister.save_path.read_text(), cls=MtnTrackerJSONDecoder
+    )
+    assert len(on_disk) == len(repo.list()) == 11
+
+    reloaded = FileActionRepository(dirname=str(tmp_path))
+    reloaded.load()
+    assert len(reloaded.list()) == 11
+    assert (
+        len(
+            reloaded.get_by_time(
+                datetime(2019, 1, 1, tzinfo=UTC), datetime(2030, 1, 1, tzinfo=UTC)
+            )
+        )
+        == 48
+    )
+    assert len(reloaded.get_for_task(Task(name="t"))) == 24
+
+
+def test_archive_keeps_the_latest_action_of_each_task(tmp_path: Path):
+    repo = _with_history(tmp_path)
+    v = Task(name="v")
+    repo.add(Action(datetime(2019, 1, 1, tzinfo=UTC), v, "only"))
+
+    repo.archive_before(datetime(2030, 1, 1, tzinfo=UTC))
+
+    assert sorted((a.ref_task.name, a.name) for a in repo.list()) == [
+        ("t", "a47"),
+        ("u", "a46"),
+        ("v", "only"),
+    ]
+
+
+def test_archive_waits_for_min_actions(tmp_path: Path):
+    repo = _with_history(tmp_path)
+
+    assert repo.archive_before(datetime(2023, 1, 1, tzinfo=UTC), min_actions=38) == 0
+    assert not repo.archive.manifest_path.exists()
+    assert len(repo.list()) == 48
+
+
+def test_range_queries_open_only_the_segments_they_reach(tmp_path: Path):
+    repo = _with_history(tmp_path)
+    repo.archive_before(datetime(2021, 1, 1, tzinfo=UTC))
+    repo.archive_before(datetime(2022, 1, 1, tzinfo=UTC))
+    reloaded = FileActionRepository(dirname=str(tmp_path))
+    reloaded.load()
+    old, newer = reloaded.archive.segments
+
+    recent = reloaded.get_by_time(
+        datetime(2022, 6, 1, tzinfo=UTC), datetime(2023, 1, 1, tzinfo=UTC)
+    )
+    assert len(recent) == 7
+    assert reloaded.archive._decoded == {}
+
+    in_2021 = reloaded.get_by_time(
+        datetime(2021, 3, 1, tzinfo=UTC), datetime(2021, 4, 30, tzinfo=UTC)
+    )
+    assert [a.timestamp.month for a in in_2021] == [3, 4]
+    assert list(reloaded.archive._decoded) == [newer.filename]
+
+    # counts over whole days come from the manifest, without opening the segments
+    assert (
+        reloaded.count_by_time(
+            datetime(2020, 1, 1, tzinfo=UTC),
+            datetime(2023, 12, 31, 23, 59, 59, 999999, tzinfo=UTC),
+        )
+        == 48
+    )
+    assert list(reloaded.archive._decoded) == [newer.filename]
+
+
+def test_latest_actions_come_from_the_archive_when_needed(tmp_path: Path):
+    repo = _with_history(tmp_path)
+    repo.archive_before(datetime(2023, 1, 1, tzinfo=UTC))
+    reloaded = FileActionRepository(dirname=str(tmp_path))
+    reloaded.load()
+
+    now = datetime(2030, 1, 1, tzinfo=UTC)
+    assert {n: a.name for n, a in reloaded.get_latest_by_task(now).items()} == {
+        "t": "a47",
+        "u": "a46",
+    }
+    assert reloaded.archive._decoded == {}
+
+    in_2021 = reloaded.get_latest_by_task(datetime(2021, 6, 1, tzinfo=UTC))
+    assert {n: a.name for n, a in in_2021.items()} == {"t": "a17", "u": "a16"}
+    # every hot action of u is gone: its latest is archived
+    reloaded.remove_many([a for a in reloaded.list() if a.ref_task.name == "u"])
+    assert reloaded.get_latest_by_task(now)["u"].name == "a36"
+
+
+def test_archived_actions_cannot_be_removed(tmp_path: Path):
+    repo = _with_history(tmp_path)
+    repo.archive_before(datetime(2023, 1, 1, tzinfo=UTC))
+    archived = repo.get_for_task(Task(name="t"))[0]
+
+    assert repo.is_archived(archived)
+    with pytest.raises(ArchivedActionError):
+        repo.remove(archived)
+    with pytest.raises(ArchivedActionError):
+        repo.remove_many([archived, repo.list()[0]])
+    assert len(repo.list()) == 11
+
+
+def test_archive_after_a_crash_does_not_duplicate_actions(tmp_path: Path):
+    repo = _with_history(tmp_path)
+    # the segment was written, but not the action file without its actions
+    repo.archive.add(list(repo.list())[:10])
+
+    assert repo.archive_before(datetime(2023, 1, 1, tzinfo=UTC)) == 37
+
+    assert [s.count for s in repo.archive.segments] == [10, 27]
+    everything = repo.get_by_time(
+        datetime(2019, 1, 1, tzinfo=UTC), datetime(2030, 1, 1, tzinfo=UTC)
+    )
+    assert len(everything) == 48
+
+
+def test_unknown_archive_compression(tmp_path: Path):
+    with pytest.raises(ValueError):
+        ActionArchive(tmp_path, "zip")
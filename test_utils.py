@@ -5,8 +5,10 @@ from time import sleep
 import pytest
 from freezegun import freeze_time
 
+import utils
 from utils import (
     DateParseError,
+    HumanDateRenderer,
     IntervalParseError,
     _round_datetime,
     _round_interval,
@@ -185,6 +187,34 @@ def test_human_date_str(delta, expected):
         assert human_date_str(test_input, when_now=frozen_time) == expected
 
 
+def test_human_date_renderer_matches_human_date_str_and_caches(monkeypatch):
+    frozen_time = datetime(2025, 3, 23, 19, 14, 00)
+    # pairs of dates less than a second apart, away from now
+    inputs = [
+        frozen_time + timedelta(minutes=m, milliseconds=ms if m > 0 else -ms)
+        for m in (-90, -5, 5, 90)
+        for ms in (0, 250)
+    ]
+    inputs += [frozen_time + timedelta(days=d) for d in (-400, -30, 0, 30, 400)]
+
+    with freeze_time(frozen_time):
+        expected = [human_date_str(i, when_now=frozen_time) for i in inputs]
+
+        calls = []
+        original_date_time = utils.human_readable.date_time
+        monkeypatch.setattr(
+            utils.human_readable,
+            "date_time",
+            lambda *args, **kw: calls.append(args) or original_date_time(*args, **kw),
+        )
+        render = HumanDateRenderer(when_now=frozen_time.replace(tzinfo=UTC))
+        assert [render(i) for i in inputs] == expected
+        assert [render(i) for i in inputs] == expected
+
+    # one library call per distinct delta (in whole seconds) within a day of now
+    assert len(calls) == 5
+
+
 def test_parse_partial_timestamp():
     from utils import parse_partial_timestamp, UTC
 
@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta, UTC
+from datetime import date, datetime, timedelta, UTC
 import dateparser
 import human_readable
 
@@ -143,9 +143,52 @@ def parse_interval(input: str) -> timedelta:
     return _round_interval(parsed - now)
 
 
+class HumanDateRenderer:
+    """Renders many dates as human readable strings against a single 'now'.
+
+    'now' is captured once, when the renderer is created. Dates within a day of it
+    render as a delta ("3 hours ago"), which only depends on the delta in whole seconds;
+    other dates render as a day, which only depends on the date. Both are cached under
+    those keys, so repeated values in a table cost a dictionary lookup.
+    """
+
+    def __init__(self, when_now: datetime | None = None):
+        if when_now is None:
+            when_now = datetime.now().astimezone()
+        self.when_now = when_now.replace(tzinfo=None)
+        self._cache: dict = {}
+
+    def __call__(self, input: datetime | None) -> str:
+        if input is None:
+            return "no date provided"
+
+        if input.tzinfo is not None:
+            input = input.replace(tzinfo=None)
+
+        delta = self.when_now - input
+        if abs(delta) <= timedelta(days=1):
+            distance = abs(delta)
+            key: tuple | date = (delta < timedelta(0), distance.days, distance.seconds)
+        else:
+            key = input.date()
+
+        text = self._cache.get(key)
+        if text is None:
+            if isinstance(key, tuple):
+                text = human_readable.date_time(
+                    input, minimum_unit="SECONDS", when=self.when_now
+                )
+            else:
+                text = human_readable.date(input.date() + timedelta(milliseconds=1))
+            self._cache[key] = text
+        return text
+
+
 def human_date_str(input: datetime | None, when_now: datetime | None = None) -> str:
     """Returns a human readable string representing the date
 
+    Use a HumanDateRenderer instead when rendering many dates.
+
     Args:
         input (datetime | None): the datetime in question
         when_now (datetime | None): the time to consider as 'now'
@@ -153,24 +196,7 @@ def human_date_str(input: datetime | None, when_now: datetime | None = None) ->
     Returns:
         str: a human-readable version of the date time, such as "x hours from now"
     """
-    if input is None:
-        return "no date provided"
-
-    if when_now is None:
-        when_now = datetime.now().astimezone()
-
-    if input.tzinfo is not None:
-        input = input.replace(tzinfo=None)
-    if when_now.tzinfo is not None:
-        when_now = when_now.replace(tzinfo=None)
-
-    if abs(input - when_now) <= timedelta(days=1):
-        return human_readable.date_time(
-            input,
-            minimum_unit="SECONDS",
-        )
-    else:
-        return human_readable.date(input.date() + timedelta(milliseconds=1))
+    return HumanDateRenderer(when_now)(input)
 
 
 def human_interval_str(